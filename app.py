@@ -5,15 +5,20 @@ import os
 os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 
 import cv2
+import curl_detector
 from flask import Flask, render_template, Response, json, request, jsonify, send_file
-from curl_detector import process_frame, init_session, end_current_session
+from curl_detector import process_frame
 from curl_detector import save_posture_data  # Import save_posture_data from the correct module
-from session_tracker import ExerciseSession
+from session_control import SessionController
+from stations import StationManager
+from pose_pool import PosePool, POSE_OPTIONS
+from pose_tuner import PoseTuner, CANDIDATES, sample_frames
+from streaming import AdaptiveStreamer, FrameFeed
 import time
 import atexit
 import logging
+import threading
 
-last_set_metrics = {}
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -38,52 +43,52 @@ def cleanup():
         camera.release()
         logger.info("Camera released")
 
-# Shared container for the latest metrics
-latest_data = {}
-
 # Add frame rate control
 FRAME_RATE = 30
 SKIP_FRAMES = 2  # Process every nth frame for metrics
 frame_count = 0
 
-# Add global variables for session management
-current_session = None
-session_active = False
-
-# Add session state tracking
-SESSION_STATES = {
-    'INACTIVE': 0,
-    'SESSION_STARTED': 1,
-    'SET_IN_PROGRESS': 2,
-    'SET_COMPLETED': 3,
-    'FEEDBACK_REQUIRED': 4
-}
-
-current_state = SESSION_STATES['INACTIVE']
-
-def validate_state_transition(expected_state, next_state, operation):
-    """Validate if the requested operation is allowed in current state"""
-    global current_state
-    if current_state != expected_state:
-        raise ValueError(f"Invalid operation: {operation}. Must complete previous steps first.")
-    current_state = next_state
-    return True
-
-def generate_frames():
-    """Yields MJPEG frames for /video_feed, and updates latest_data."""
-    global latest_data, frame_count
+# Latest processed frame and metrics, shared by every viewer of the camera
+local_feed = FrameFeed()
+capture_thread = None
+capture_lock = threading.Lock()
+live_hub = None  # LiveHub when serving with --async
+station_manager = None  # StationManager when serving with --stations
+pose_pool = None  # PosePool when serving with --pose-workers
+pose_tuner = None  # PoseTuner when serving with --autotune
+
+# Skeleton edges for clients that draw the overlay themselves
+POSE_CONNECTIONS = sorted(tuple(c) for c in curl_detector.mp_pose.POSE_CONNECTIONS)
+
+# Session/set state machine shared by the HTTP routes and the live WebSocket
+controller = SessionController()
+
+def annotation_needed():
+    """
+    True if any viewer is watching server-annotated video. Landmarks-only
+    and raw-video clients draw the skeleton themselves, so with none of the
+    others connected the capture loop skips drawing entirely.
+    """
+    if local_feed.wants_annotation():
+        return True
+    return live_hub is not None and any(c.video for c in list(live_hub.clients))
+
+def capture_frames():
+    """Reads the camera, processes frames and publishes them to local_feed."""
+    global frame_count
     last_time = time.time()
     
     while True:
         current_time = time.time()
         # Control frame rate
         if (current_time - last_time) < 1.0/FRAME_RATE:
+            time.sleep(max(0.0, 1.0/FRAME_RATE - (current_time - last_time)))
             continue
             
         last_time = current_time
         
         if camera is None or not camera.isOpened():
-            logger.error("Camera not available in generate_frames")
+            logger.error("Camera not available in capture_frames")
             time.sleep(0.1)
             continue
 
@@ -94,26 +99,51 @@ def generate_frames():
             continue
 
         # Only process every nth frame for metrics
+        data = None
         if frame_count % SKIP_FRAMES == 0:
-            processed_frame, data = process_frame(frame)
-            latest_data = data
+            processed_frame, data = process_frame(
+                frame, annotate=annotation_needed() or curl_detector.recording_active())
+            curl_detector.record_frame(processed_frame)
         else:
             # Just flip and resize the frame without processing
-            frame = cv2.flip(cv2.resize(frame, (640, 480)), 1)
-            processed_frame = frame
+            processed_frame = curl_detector.preprocessor.display(frame)
 
         frame_count += 1
+        local_feed.publish(processed_frame, data)
 
-        # JPEG-encode with lower quality for faster transmission
-        ret, buffer = cv2.imencode('.jpg', processed_frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        if not ret:
-            continue
+def ensure_capture_thread():
+    """Start the shared capture thread on first use."""
+    global capture_thread
+    with capture_lock:
+        if capture_thread is None or not capture_thread.is_alive():
+            capture_thread = threading.Thread(target=capture_frames, name="capture_frames", daemon=True)
+            capture_thread.start()
+
+def generate_frames(feed, max_fps=None, raw=False):
+    """Yields MJPEG frames for /video_feed, adapted to this client's throughput."""
+    streamer = AdaptiveStreamer(target_fps=FRAME_RATE, max_fps=max_fps, raw=raw)
+    feed.streamers.add(streamer)
+    last_id = 0
+    try:
+        while True:
+            # The frame stays leased (not reused by the capture ring) while encoding
+            with feed.reading(last_id) as (last_id, frame):
+                payload = streamer.encode(frame) if frame is not None else None
+            # None too when nothing changed since the last frame sent
+            if payload is None:
+                continue
 
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+            # The generator resumes once the server has written the chunk,
+            # so the time spent suspended is this client's send time.
+            sent_at = time.perf_counter()
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + payload + b'\r\n')
+            streamer.record_send(len(payload), time.perf_counter() - sent_at)
+    finally:
+        feed.streamers.discard(streamer)
 
-def generate_metrics():
-    """Server-Sent Events stream of the latest_data for /metrics."""
+def generate_metrics(feed):
+    """Server-Sent Events stream of the latest metrics for /metrics."""
     last_time = time.time()
     
     while True:
@@ -124,210 +154,211 @@ def generate_metrics():
             continue
             
         last_time = current_time
-        if latest_data:
-            yield f"data: {json.dumps(latest_data)}\n\n"
+        if feed.data:
+            yield f"data: {json.dumps(feed.data)}\n\n"
+
+def generate_landmarks(feed):
+    """
+    Server-Sent Events stream for /landmarks: every newly processed result
+    (landmarks plus metrics, a few hundred bytes) as soon as it is ready.
+    """
+    last_data = None
+
+    while True:
+        data = feed.wait_data(last_data)
+        if data is last_data or not data:
+            # Keep idle connections open through proxies
+            yield ": keepalive\n\n"
+            continue
+        last_data = data
+        yield f"data: {json.dumps(data, separators=(',', ':'))}\n\n"
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', pose_connections=POSE_CONNECTIONS)
 
 @app.route('/video_feed')
 def video_feed():
+    # ?fps=N caps the frame rate, ?raw=1 asks for frames without the overlay
+    max_fps = request.args.get('fps', type=float)
+    raw = request.args.get('raw') == '1'
+    ensure_capture_thread()
     return Response(
-        generate_frames(),
+        generate_frames(local_feed, max_fps=max_fps, raw=raw),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
+@app.route('/stream_stats')
+def stream_stats():
+    """Current ladder level and throughput of every /video_feed client."""
+    return jsonify([s.stats() for s in list(local_feed.streamers)])
+
+@app.route('/pose_pool_stats')
+def pose_pool_stats():
+    return jsonify(pose_pool.stats() if pose_pool else {})
+
+@app.route('/pose_profile')
+def pose_profile():
+    """Pose model complexity and input size in use, and the tuner's measurements."""
+    if pose_tuner is not None:
+        return jsonify(dict(pose_tuner.stats(), autotune=True))
+    return jsonify({
+        "autotune": False,
+        "profile": {
+            "model_complexity": curl_detector.MODEL_COMPLEXITY,
+            "input_size": list(curl_detector.INPUT_SIZE),
+        },
+    })
+
+@app.route('/admin/profile')
+def admin_profile():
+    """
+    Sample every thread of this process (capture loop, frame generators,
+    pose pool collector, ...) for ?seconds=N and return the aggregate:
+    ?format=text|json|collapsed. Same access rules as the API's /admin.
+    """
+    from app.profiling import MAX_SECONDS, ProfilerBusy, admin_allowed, profile
+
+    try:
+        from app.config import settings
+        admin_token = settings.admin_token
+    except Exception as e:
+        # No API configured (e.g. no .env): loopback clients only
+        logger.warning(f"Admin token unavailable ({e}); profiler limited to loopback")
+        admin_token = None
+    if not admin_allowed(request.headers.get('X-Admin-Token'), request.remote_addr, admin_token):
+        return jsonify({"status": "error", "message": "Admin access required"}), 403
+    seconds = request.args.get('seconds', 5, type=float)
+    if not 0 < seconds <= MAX_SECONDS:
+        return jsonify({"status": "error", "message": f"seconds must be in (0, {MAX_SECONDS}]"}), 400
+    output = request.args.get('format', 'text')
+    try:
+        profiler = profile(seconds, request.args.get('interval_ms', 5, type=float), request.args.get('thread'))
+    except ProfilerBusy as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    if output == 'json':
+        return jsonify(profiler.top())
+    body = profiler.collapsed() if output == 'collapsed' else profiler.text()
+    return Response(body, mimetype='text/plain')
+
+@app.route('/db_pool_stats')
+def db_pool_stats():
+    """Connection pool of the MongoClient save_posture_data uses in this process."""
+    from app.database import pool_stats
+    return jsonify(pool_stats()['sync'])
+
 @app.route('/metrics')
 def metrics():
+    ensure_capture_thread()
     return Response(
-        generate_metrics(),
+        generate_metrics(local_feed),
+        mimetype='text/event-stream'
+    )
+
+@app.route('/landmarks')
+def landmarks():
+    ensure_capture_thread()
+    return Response(
+        generate_landmarks(local_feed),
         mimetype='text/event-stream'
     )
 
 @app.route('/start_session', methods=['POST'])
 def start_session():
-    global current_session, session_active, current_state
-    try:
-        if current_session is not None:
-            raise ValueError("Session already in progress. End current session first.")
-            
-        validate_state_transition(SESSION_STATES['INACTIVE'], 
-                                SESSION_STATES['SESSION_STARTED'], 
-                                'start_session')
-        
-        weight = request.json.get('weight', 0)
-        # Remove weight validation to allow 0
-            
-        user_context = request.json.get('userContext', {
-            "goal": "Technique Improvement",
-            "experienceLevel": "Beginner",
-            "notes": None
-        })
-        equipment = {
-            "type": "Dumbbells",
-            "weight": float(weight),
-            "unit": "lbs"
-        }
-        
-        current_session = ExerciseSession(user_context=user_context, equipment=equipment)
-        init_session(current_session)
-        session_active = True
-        logger.info(f"Session started with weight: {weight}lbs")
-        
-        return jsonify({
-            "status": "success", 
-            "state": "session_started",
-            "message": f"Session started with {weight}lbs"
-        })
-    except (ValueError, TypeError) as ve:
-        current_state = SESSION_STATES['INACTIVE']
-        current_session = None
-        session_active = False
-        logger.error(f"Validation error in start_session: {ve}")
-        return jsonify({"status": "error", "message": str(ve)}), 400
-    except Exception as e:
-        current_state = SESSION_STATES['INACTIVE']
-        current_session = None
-        session_active = False
-        logger.error(f"Error starting session: {e}")
-        return jsonify({"status": "error", "message": f"Failed to start session: {str(e)}"}), 500
+    body, status = controller.start_session(request.get_json(silent=True))
+    return jsonify(body), status
 
 @app.route('/start_set', methods=['POST'])
 def start_set():
     """Start a new set within the current session."""
-    try:
-        validate_state_transition(SESSION_STATES['SESSION_STARTED'], 
-                                SESSION_STATES['SET_IN_PROGRESS'], 
-                                'start_set')
-        
-        if current_session:
-            current_session.start_set()
-            return jsonify({"status": "success", "message": "Set started successfully"})
-        return jsonify({"status": "error", "message": "No active session"}), 400
-    except ValueError as ve:
-        return jsonify({"status": "error", "message": str(ve)}), 400
-    except Exception as e:
-        logger.error(f"Error starting set: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    body, status = controller.start_set()
+    return jsonify(body), status
 
 @app.route('/end_set', methods=['POST'])
 def end_set():
-    global current_state
-    try:
-        if current_state != SESSION_STATES['SET_IN_PROGRESS']:
-            raise ValueError("No active set to end")
-        if not current_session:
-            raise ValueError("No active session found")
-        
-        # Import the end_set function from curl_detector
-        from curl_detector import end_set as detector_end_set
-        
-        # Call the end_set function from curl_detector to reset counters
-        final_metrics = detector_end_set()
-        
-        # Calculate aggregate metrics for the set
-        if hasattr(current_session, 'rep_data') and current_session.rep_data:
-            set_metrics = current_session._calculate_set_metrics()
-        else:
-            set_metrics = {}
-            
-        # Update state
-        current_state = SESSION_STATES['FEEDBACK_REQUIRED']
-        global last_set_metrics
-        last_set_metrics = set_metrics
-        
-        return jsonify({
-            "status": "success",
-            "message": "Set ended. Please provide feedback.",
-            "state": "feedback_required",
-            "metrics": set_metrics,  # Send aggregate metrics
-            "total_reps": final_metrics.get('total_reps', 0)
-        })
-    except ValueError as ve:
-        return jsonify({"status": "error", "message": str(ve)}), 400
-    except Exception as e:
-        logger.error(f"Error ending set: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    body, status = controller.end_set()
+    return jsonify(body), status
 
 @app.route('/submit_set_feedback', methods=['POST'])
 def submit_set_feedback():
-    global current_state, latest_data
-    try:
-        if current_state != SESSION_STATES['FEEDBACK_REQUIRED']:
-            raise ValueError("Cannot submit feedback - no set ended")
-            
-        if not request.is_json:
-            raise ValueError("Feedback must be provided")
-            
-        # Extract feedback from request
-        feedback = {
-            "rpe": request.json.get('rpe'),
-            "rir": request.json.get('rir'),
-            "fatiguePointReason": request.json.get('fatigueReason'),
-            "muscleFeelFocus": request.json.get('muscleFocus', "Biceps"),
-            "painFlag": request.json.get('painFlag', False),
-            "painLocation": request.json.get('painLocation'),
-            "notes": request.json.get('notes'),
-            "metrics": last_set_metrics # Add metrics if available
-        }
-        
-        # Validate required fields
-        if feedback['rpe'] is None or feedback['rir'] is None:
-            raise ValueError("RPE and RIR are required feedback fields")
-            
-        if current_session:
-            current_session.end_set(subjective_feedback=feedback)
-            current_state = SESSION_STATES['SESSION_STARTED']
-            logger.info(f"Set feedback recorded successfully: RPE={feedback['rpe']}, RIR={feedback['rir']}")
-            
-            return jsonify({
-                "status": "success",
-                "message": "Feedback recorded successfully"
-            })
-            
-        raise ValueError("No active session found")
-        
-    except Exception as e:
-        logger.error(f"Error submitting feedback: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    body, status = controller.submit_set_feedback(request.get_json(silent=True))
+    return jsonify(body), status
 
 @app.route('/update_session_notes', methods=['POST'])
 def update_session_notes():
-    try:
-        if current_session and request.is_json:
-            notes = request.json.get('notes')
-            current_session.update_notes(notes)
-            return jsonify({"status": "success"})
-        return jsonify({"status": "error", "message": "No active session"}), 400
-    except Exception as e:
-        logger.error(f"Error updating notes: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    body, status = controller.update_session_notes(request.get_json(silent=True))
+    return jsonify(body), status
 
 @app.route("/end_session", methods=["POST"])
 def end_session():
-    session_data = request.json
-    try:
-        # Ensure numeric fields are properly converted
-        if "feedback" in session_data:
-            if "rpe" in session_data["feedback"]:
-                session_data["feedback"]["rpe"] = float(session_data["feedback"]["rpe"])
-            if "rir" in session_data["feedback"]:
-                session_data["feedback"]["rir"] = int(session_data["feedback"]["rir"])
-            if "totalSets" in session_data["feedback"]:
-                session_data["feedback"]["totalSets"] = int(session_data["feedback"]["totalSets"])
-
-        # Remove duplicate call
-        result = end_current_session(session_data)
-        if result:
-            return {"status": "success", "message": "Session ended successfully"}
-        return {"status": "error", "message": "Failed to end session"}
-    except ValueError as ve:
-        logger.error(f"Error ending session: {ve}")
-        return {"status": "error", "message": str(ve)}, 400
-    except Exception as e:
-        logger.error(f"Error ending session: {e}")
-        return {"status": "error", "message": str(e)}, 500
+    body, status = controller.end_session(request.get_json(silent=True))
+    return body, status
+
+# ——— Multi-station routes (--stations) ———
+# Each station runs in its own worker process; these mirror the routes
+# above with the station id appended.
+
+def get_station(station_id):
+    station = station_manager.get(station_id) if station_manager else None
+    if station is None:
+        return None, (jsonify({"status": "error", "message": f"Unknown station: {station_id}"}), 404)
+    return station, None
+
+@app.route('/stations')
+def stations():
+    return jsonify(station_manager.status() if station_manager else [])
+
+@app.route('/station/<station_id>')
+def station_index(station_id):
+    station, error = get_station(station_id)
+    if error:
+        return error
+    return render_template('index.html', pose_connections=POSE_CONNECTIONS, station=station.id)
+
+@app.route('/video_feed/<station_id>')
+def station_video_feed(station_id):
+    station, error = get_station(station_id)
+    if error:
+        return error
+    max_fps = request.args.get('fps', type=float)
+    raw = request.args.get('raw') == '1'
+    return Response(
+        generate_frames(station.feed, max_fps=max_fps, raw=raw),
+        mimetype='multipart/x-mixed-replace; boundary=frame'
+    )
+
+@app.route('/stream_stats/<station_id>')
+def station_stream_stats(station_id):
+    station, error = get_station(station_id)
+    if error:
+        return error
+    return jsonify([s.stats() for s in list(station.feed.streamers)])
+
+@app.route('/metrics/<station_id>')
+def station_metrics(station_id):
+    station, error = get_station(station_id)
+    if error:
+        return error
+    return Response(generate_metrics(station.feed), mimetype='text/event-stream')
+
+@app.route('/landmarks/<station_id>')
+def station_landmarks(station_id):
+    station, error = get_station(station_id)
+    if error:
+        return error
+    return Response(generate_landmarks(station.feed), mimetype='text/event-stream')
+
+@app.route('/<command>/<station_id>', methods=['POST'])
+def station_command(command, station_id):
+    """start_session, start_set, end_set, ... run by the station's worker."""
+    if command not in SessionController.COMMANDS:
+        return jsonify({"status": "error", "message": f"Unknown command: {command}"}), 404
+    station, error = get_station(station_id)
+    if error:
+        return error
+    body, status = station.command(command, request.get_json(silent=True))
+    return jsonify(body), status
+
 @app.route('/download_session/<filename>')
 def download_session(filename):
     try:
@@ -336,10 +367,69 @@ def download_session(filename):
         return jsonify({"status": "error", "message": str(e)})
 
 if __name__ == '__main__':
-    # Set camera properties for better performance
-    camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    camera.set(cv2.CAP_PROP_FPS, FRAME_RATE)
+    import argparse
+    parser = argparse.ArgumentParser(description="FitForm live posture server")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="Serve with uvicorn and enable the /ws live channel")
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--stations', metavar='CONFIG',
+                        help="JSON station config; serve one worker process per camera/source")
+    parser.add_argument('--pose-workers', type=int, default=0,
+                        help="Run pose inference in this many worker processes (0 = inline)")
+    parser.add_argument('--autotune', action='store_true',
+                        help="Benchmark pose model complexity/input size at startup and keep tuning")
+    parser.add_argument('--target-fps', type=float, default=FRAME_RATE / SKIP_FRAMES,
+                        help="Processed frames per second the auto-tuner aims for")
+    parser.add_argument('--autotune-seconds', type=float, default=1.5,
+                        help="Benchmark time per candidate profile")
+    parser.add_argument('--record-sets', metavar='DIR',
+                        help="Record an annotated video of every set under DIR")
+    parser.add_argument('--archive-landmarks', metavar='DIR',
+                        help="Save every session's per-frame landmarks under DIR (see rescore_archives.py)")
+    args = parser.parse_args()
+
+    if args.archive_landmarks:
+        curl_detector.set_landmark_archive(args.archive_landmarks)
+    if args.record_sets and not args.stations:
+        curl_detector.set_recording(args.record_sets, FRAME_RATE / SKIP_FRAMES)
+        atexit.register(curl_detector.set_recorder.close)
+
+    pose_options = POSE_OPTIONS
+    if args.autotune and not args.stations:
+        # Pool workers take full-size frames, so only the complexity is tunable there
+        candidates = [c for c in CANDIDATES if c['input_size'] == (640, 480)] if args.pose_workers > 0 else None
+        pose_tuner = PoseTuner(args.target_fps, candidates=candidates)
+        pose_tuner.calibrate(sample_frames(camera), seconds=args.autotune_seconds)
+        if args.pose_workers > 0:
+            pose_options = dict(POSE_OPTIONS, model_complexity=pose_tuner.profile['model_complexity'])
+        else:
+            curl_detector.use_pose_tuner(pose_tuner)
+
+    if args.pose_workers > 0 and not args.stations:
+        pose_pool = PosePool(workers=args.pose_workers, pose_options=pose_options).start()
+        curl_detector.use_pose_pool(pose_pool)
+        atexit.register(pose_pool.stop)
+
+    if args.stations:
+        # Stations own their sources; free camera 0 in case one of them uses it
+        cleanup()
+        camera = None
+        station_manager = StationManager.from_config(args.stations)
+        station_manager.start()
+        atexit.register(station_manager.stop)
+    elif camera is not None:
+        # Set camera properties for better performance
+        camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        camera.set(cv2.CAP_PROP_FPS, FRAME_RATE)
     
-    # Disable Flask's auto-reloader to avoid double initialization
-    app.run(debug=True, use_reloader=False, threaded=True)
+    if args.use_async:
+        # One event loop serves every /ws viewer; HTTP routes still run on Flask
+        import uvicorn
+        from live_socket import LiveHub, create_live_app
+        live_hub = LiveHub(lambda: local_feed.snapshot(hold=True), ensure_capture_thread,
+                           frame_rate=FRAME_RATE, release=local_feed.release)
+        uvicorn.run(create_live_app(app, live_hub, controller), host='127.0.0.1', port=args.port)
+    else:
+        # Disable Flask's auto-reloader to avoid double initialization
+        app.run(debug=True, use_reloader=False, threaded=True, port=args.port)
@@ -0,0 +1,213 @@
+# File: app/analytics.py
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, ReplaceOne
+from app.config import settings
+from app.timeseries import period_start
+
+logger = logging.getLogger(__name__)
+
+# ——— Workout analytics ———
+# One document per (user, exercise, week) with volume, set/rep counts and
+# the best estimated 1RM, computed from the nested workouts.sets by an
+# aggregation pipeline and $merge'd into a cache collection. A user's cache
+# is built in full on first read; after that every session write re-runs
+# the pipeline for just that user's week.
+#
+# Sessions written before finished_at was stored on create have none, and
+# older populate_db data stored it as an ISO string. Rather than migrating
+# them, the pipeline dates each session by finished_at when it is a date,
+# else the parsed string, else its ObjectId's creation time (SESSION_TIME);
+# session_time() does the same in Python.
+
+USERS = "analytics_users"   # users whose cache has been built: {_id: user_id, built_at}
+
+SET = "$workouts.sets"
+# Epley: weight * (1 + reps / 30); a single is the 1RM itself, empty sets have none
+E1RM = {"$switch": {
+    "branches": [
+        {"case": {"$lte": [f"{SET}.reps", 0]}, "then": None},
+        {"case": {"$eq": [f"{SET}.reps", 1]}, "then": f"{SET}.weight"},
+    ],
+    "default": {"$multiply": [f"{SET}.weight", {"$add": [1, {"$divide": [f"{SET}.reps", 30]}]}]},
+}}
+
+SESSION_TIME = {"$ifNull": [
+    {"$convert": {"input": "$finished_at", "to": "date", "onError": None, "onNull": None}},
+    {"$convert": {"input": "$_id", "to": "date", "onError": None, "onNull": None}},
+]}
+
+_indexed = False
+
+
+def week_start(ts: datetime) -> datetime:
+    """Start of ts's week (Monday, UTC), matching period_start(..., "week")."""
+    day = datetime(ts.year, ts.month, ts.day)
+    return day - timedelta(days=day.weekday())
+
+
+def session_time(session: dict) -> Optional[datetime]:
+    """When a session happened, in naive UTC, by the same fallbacks as SESSION_TIME."""
+    finished = session.get("finished_at")
+    if isinstance(finished, datetime):
+        return finished
+    if isinstance(finished, str):
+        try:
+            parsed = datetime.fromisoformat(finished.replace("Z", "+00:00"))
+        except ValueError:
+            parsed = None
+        if parsed is not None:
+            return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+    if isinstance(session.get("_id"), ObjectId):
+        return session["_id"].generation_time.replace(tzinfo=None)
+    return None
+
+
+def rollup_pipeline(match: dict, stamp: datetime, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None, merge: bool = True) -> list:
+    """
+    Sessions matching `match` (and dated within [start, end) when given) ->
+    cache documents, merged in place by _id (or returned, with merge=False).
+    """
+    when = {"$ne": None}
+    if start is not None:
+        when = {"$gte": start, "$lt": end}
+    return [
+        {"$match": match},
+        {"$set": {"session_time": SESSION_TIME}},
+        {"$match": {"session_time": when}},
+        {"$project": {
+            "user_id": 1,
+            "workouts": 1,
+            "week": period_start("$session_time", "week"),
+        }},
+        {"$unwind": "$workouts"},
+        {"$unwind": SET},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "exercise": "$workouts.name", "week": "$week"},
+            "sessions": {"$addToSet": "$_id"},
+            "sets": {"$sum": 1},
+            "reps": {"$sum": f"{SET}.reps"},
+            "volume": {"$sum": {"$multiply": [f"{SET}.reps", f"{SET}.weight"]}},
+            "top_weight": {"$max": f"{SET}.weight"},
+            # Documents compare field by field, so this is the set with the highest e1RM
+            "best": {"$max": {"e1rm": E1RM, "weight": f"{SET}.weight", "reps": f"{SET}.reps"}},
+        }},
+        {"$project": {
+            "user_id": "$_id.user_id",
+            "exercise": "$_id.exercise",
+            "week": "$_id.week",
+            "sessions": {"$size": "$sessions"},
+            "sets": 1,
+            "reps": 1,
+            "volume": 1,
+            "top_weight": 1,
+            "best_e1rm": {"$round": ["$best.e1rm", 1]},
+            "best_set": {"weight": "$best.weight", "reps": "$best.reps"},
+            "refreshed_at": {"$literal": stamp},
+        }},
+    ] + ([{"$merge": {
+        "into": settings.analytics_collection,
+        "on": "_id",
+        "whenMatched": "replace",
+        "whenNotMatched": "insert",
+    }}] if merge else [])
+
+
+async def ensure_analytics_indexes(db):
+    global _indexed
+    if _indexed:
+        return
+    await db[settings.analytics_collection].create_indexes([
+        IndexModel([("user_id", ASCENDING), ("exercise", ASCENDING), ("week", ASCENDING)], name="user_exercise_week"),
+        IndexModel([("user_id", ASCENDING), ("week", ASCENDING)], name="user_week"),
+    ])
+    # Incremental refreshes select one user's sessions
+    await db.sessions.create_indexes([
+        IndexModel([("user_id", ASCENDING), ("finished_at", ASCENDING)], name="user_finished_at"),
+    ])
+    _indexed = True
+
+
+async def _run(db, match: dict, scope: dict, start: Optional[datetime] = None,
+               end: Optional[datetime] = None):
+    """
+    Re-aggregate the sessions in `match` and drop cache documents in `scope`
+    it no longer produces (e.g. an exercise removed from the week's only
+    session). Stale documents are those whose _id the run did not produce,
+    so concurrent refreshes of the same week can't delete each other's rows.
+    """
+    stamp = datetime.utcnow()
+    cache = db[settings.analytics_collection]
+    if not scope:
+        # Full rebuild (populate_db): too many rows to list, merged on the server;
+        # it runs offline, so the refresh stamp is enough to find stale rows
+        await db.sessions.aggregate(rollup_pipeline(match, stamp, start, end)).to_list(length=None)
+        await cache.delete_many({"refreshed_at": {"$lt": stamp}})
+        return
+    docs = await db.sessions.aggregate(rollup_pipeline(match, stamp, start, end, merge=False)).to_list(length=None)
+    if docs:
+        await cache.bulk_write([ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs], ordered=False)
+    await cache.delete_many(dict(scope, _id={"$nin": [d["_id"] for d in docs]}))
+
+
+async def rebuild(db, user_id: Optional[str] = None):
+    """Build the cache from scratch for one user, or for everyone."""
+    scope = {"user_id": user_id} if user_id else {}
+    # Marked first: writes from now on refresh their week themselves
+    if user_id:
+        await db[USERS].update_one({"_id": user_id}, {"$set": {"built_at": datetime.utcnow()}}, upsert=True)
+    else:
+        await db.sessions.aggregate([
+            {"$group": {"_id": "$user_id"}},
+            {"$set": {"built_at": "$$NOW"}},
+            {"$merge": {"into": USERS, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ]).to_list(length=None)
+    await _run(db, scope, scope)
+
+
+async def ensure_built(db, user_id: str):
+    """Build the user's cache on first use."""
+    if not await db[USERS].find_one({"_id": user_id}):
+        await rebuild(db, user_id)
+
+
+def week_match(user_id: str, start: datetime, end: datetime) -> dict:
+    """
+    Sessions of one user that can fall in [start, end), selected by the
+    user_finished_at index; undated ones by their ObjectId's time, legacy
+    ISO strings by comparing strings. SESSION_TIME is still checked after.
+    """
+    return {"user_id": user_id, "$or": [
+        {"finished_at": {"$gte": start, "$lt": end}},
+        {"finished_at": {"$gte": start.isoformat(), "$lt": end.isoformat()}},
+        {"finished_at": None, "_id": {"$gte": ObjectId.from_datetime(start), "$lt": ObjectId.from_datetime(end)}},
+    ]}
+
+
+async def refresh_weeks(db, user_id: str, weeks: Iterable[datetime]):
+    """Re-aggregate the given weeks of one user."""
+    for start in sorted(set(weeks)):
+        end = start + timedelta(days=7)
+        await _run(db, week_match(user_id, start, end), {"user_id": user_id, "week": start}, start, end)
+
+
+async def refresh_for_session(db, session: Optional[dict]):
+    """
+    After a session write: refresh its week if the user's cache exists
+    (otherwise it is built in full on the first read). Failures are logged,
+    never raised, so they can't fail the write itself.
+    """
+    when = session_time(session) if session else None
+    if when is None:
+        return
+    user_id = session.get("user_id")
+    try:
+        if user_id and await db[USERS].find_one({"_id": user_id}):
+            await refresh_weeks(db, user_id, [week_start(when)])
+    except Exception as e:
+        logger.warning(f"Could not refresh analytics for {user_id}: {e}")
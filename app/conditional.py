@@ -0,0 +1,45 @@
+# File: app/conditional.py
+
+import hashlib
+from typing import Optional
+
+import orjson
+from fastapi import Request, Response
+
+# ——— ETags and conditional GET ———
+# Documents carry a _rev counter bumped on every write, and each collection
+# has a version in the collection_versions collection bumped on every
+# insert/update/delete. A poll that finds the same revision or version gets
+# 304 Not Modified before the document or page is read or serialized.
+
+CACHE_CONTROL = "no-cache"   # clients may store responses but must revalidate
+
+def document_etag(doc_id: str, rev: int) -> str:
+    return f'"{doc_id}-r{rev}"'
+
+def collection_etag(name: str, version: int, *params) -> str:
+    # Query parameters that change the page (e.g. limit) are part of the tag
+    suffix = "".join(f"-{p}" for p in params)
+    return f'"{name}-v{version}{suffix}"'
+
+def content_etag(content) -> str:
+    """Fallback for documents written before _rev existed."""
+    return '"' + hashlib.blake2b(orjson.dumps(content, default=str), digest_size=12).hexdigest() + '"'
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 specifies for this header)."""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in header.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def set_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
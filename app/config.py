@@ -1,10 +1,50 @@
 # app/config.py
+from typing import Optional
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     mongodb_uri: str
     db_name: str
     gemini_api_key: str     
+    # List endpoints return database documents without re-validating them
+    # against the response model, encoded with orjson. Only for deployments
+    # whose database is written by this API alone (TRUST_DB_OUTPUT=true)
+    trust_db_output: bool = False
+
+    # MongoDB connection pool (per client, i.e. per worker process)
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_max_idle_time_ms: int = 300_000
+    mongo_connect_timeout_ms: int = 10_000
+    mongo_server_selection_timeout_ms: int = 10_000
+    mongo_socket_timeout_ms: Optional[int] = None       # None: no timeout
+    mongo_wait_queue_timeout_ms: Optional[int] = None   # None: wait for a connection indefinitely
+    mongo_compressors: str = ""                         # e.g. "zstd,snappy,zlib"
+
+    # /advice rate limits (token buckets); coalesced duplicate requests are free.
+    # A zero rate would never refill, so it is rejected rather than served as
+    # an infinite Retry-After
+    advice_user_per_minute: float = Field(6, gt=0)
+    advice_user_burst: int = Field(3, ge=1)
+    advice_global_per_minute: float = Field(120, gt=0)
+    advice_global_burst: int = Field(20, ge=1)
+    # Estimated tokens; summaries of the least trained exercises are dropped to fit
+    advice_prompt_token_budget: Optional[int] = 800
+    # Answer clear-cut cases with local rules instead of the LLM (see app/services/rules.py)
+    advice_rules: bool = True
+
+    # Per-rep posture data (see app/timeseries.py)
+    rep_timeseries: bool = True                 # write each finished set's reps
+    rep_collection: str = "rep_metrics"
+    rep_retention_days: Optional[int] = None    # None: keep reps forever
+
+    # Per-(user, exercise, week) workout analytics cache (see app/analytics.py)
+    analytics_collection: str = "workout_analytics"
+
+    # /admin endpoints (e.g. the profiler): X-Admin-Token must match when
+    # set; when unset they only answer requests from localhost
+    admin_token: Optional[str] = None
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -1,50 +1,188 @@
 # File: app/crud.py
 
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from app import analytics, timeseries
+from app.config import settings
 from app.database import db
 
+# Fields the list endpoints return; the database drops everything else
+ENTRY_PROJECTION = {"content": 1, "user_id": 1, "created_at": 1}
+SESSION_PROJECTION = {"user_id": 1, "workouts": 1, "notes": 1, "finished_at": 1}
+
+def _ready(doc: dict, timestamp_field: str) -> dict:
+    """
+    One document made JSON-ready: its ObjectId becomes a string, and a
+    missing timestamp is taken from the ObjectId's creation time (null for
+    other ids). Never the read time, so a body only changes when its _rev
+    and ETag do.
+    """
+    if doc.get(timestamp_field) is None:
+        doc_id = doc["_id"]
+        doc[timestamp_field] = doc_id.generation_time.replace(tzinfo=None) if isinstance(doc_id, ObjectId) else None
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+def _json_ready(docs: List[dict], timestamp_field: str) -> List[dict]:
+    """One pass over a page of documents making them JSON-ready (see _ready)."""
+    for doc in docs:
+        _ready(doc, timestamp_field)
+    return docs
+
+def _time_or_id_time(field: str) -> dict:
+    """Aggregation expression: `field` as a date, else the document's ObjectId creation time."""
+    return {"$ifNull": [
+        {"$convert": {"input": f"${field}", "to": "date", "onError": None, "onNull": None}},
+        {"$convert": {"input": "$_id", "to": "date", "onError": None, "onNull": None}},
+    ]}
+
+def _created_between(start: Optional[datetime], end: Optional[datetime]) -> dict:
+    """
+    Query for entries that can fall in [start, end) by created_at, legacy
+    ISO strings by comparing strings, undated ones by their ObjectId's time.
+    """
+    def bounds(lo, hi):
+        return {**({"$gte": lo} if start else {}), **({"$lt": hi} if end else {})}
+    return {"$or": [
+        {"created_at": bounds(start, end)},
+        {"created_at": bounds(start and start.isoformat(), end and end.isoformat())},
+        {"created_at": None, "_id": bounds(start and ObjectId.from_datetime(start),
+                                           end and ObjectId.from_datetime(end))},
+    ]}
+
+# ——— Revisions ———
+# Every write sets/increments the document's _rev and bumps its collection's
+# version, which is what the ETags in app/conditional.py are built from.
+# Updates that change nothing write nothing, and _rev itself stays internal.
+
+NO_REV = {"_rev": 0}
+
+VERSIONS = "collection_versions"
+
+async def bump_version(collection: str):
+    await db[VERSIONS].update_one({"_id": collection}, {"$inc": {"version": 1}}, upsert=True)
+
+async def collection_version(collection: str) -> int:
+    doc = await db[VERSIONS].find_one({"_id": collection})
+    return doc["version"] if doc else 0
+
+async def _revision(collection: str, query: dict) -> Optional[int]:
+    """The document's _rev without loading it (None if missing or unversioned)."""
+    doc = await db[collection].find_one(query, {"_rev": 1})
+    return doc.get("_rev") if doc else None
+
+def _changed_by(query: dict, data: dict) -> dict:
+    """`query` narrowed to documents that $set-ing `data` would change."""
+    return {**query, "$or": [{field: {"$ne": value}} for field, value in data.items()]}
+
 # ——— JournalEntry CRUD ———
 
 async def create_entry(entry_data: dict) -> dict:
     """
     entry_data: Dict with keys 'content' and optional 'user_id'
     """
+    entry_data.setdefault("created_at", datetime.utcnow())
+    entry_data["_rev"] = 1
     result = await db.entries.insert_one(entry_data)
-    created = await db.entries.find_one({"_id": result.inserted_id})
-    # Convert ObjectId to string
-    created["_id"] = str(created["_id"])
-    return created
+    await bump_version("entries")
+    created = await db.entries.find_one({"_id": result.inserted_id}, NO_REV)
+    return _ready(created, "created_at")
+
+async def entry_revision(id: str) -> Optional[int]:
+    return await _revision("entries", {"_id": ObjectId(id)})
 
 async def get_entry(id: str) -> Optional[dict]:
     doc = await db.entries.find_one({"_id": ObjectId(id)})
     if not doc:
         return None
-    doc["_id"] = str(doc["_id"])
-    return doc
+    return _ready(doc, "created_at")
 
 async def list_entries(limit: int = 100) -> List[dict]:
-    out = []
-    cursor = db.entries.find().limit(limit)
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        out.append(doc)
-    return out
+    cursor = db.entries.find({}, ENTRY_PROJECTION).limit(limit)
+    return _json_ready(await cursor.to_list(length=None), "created_at")
+
+_entry_indexes_ready = False
+
+async def ensure_entry_indexes():
+    """
+    Text index on content for search, plus (user_id, created_at) for
+    filtered and recent-first reads. Idempotent; run once per process.
+    """
+    global _entry_indexes_ready
+    if _entry_indexes_ready:
+        return
+    await db.entries.create_indexes([
+        IndexModel([("content", TEXT)], name="content_text", default_language="english"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created_at"),
+    ])
+    _entry_indexes_ready = True
+
+async def search_entries(q: str, user_id: Optional[str] = None,
+                         start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         limit: int = 20, after: Optional[tuple] = None,
+                         sort: str = "relevance") -> Tuple[List[dict], bool]:
+    """
+    Entries matching a $text query, best match (or newest) first.
+    Entries stored without created_at are dated by their ObjectId, so
+    every hit has one to sort, filter and page by.
+
+    after: (sort key, _id) of the last hit on the previous page. Returns
+    the page and whether more hits follow.
+    """
+    await ensure_entry_indexes()
+    match = {"$text": {"$search": q}}
+    if user_id:
+        match["user_id"] = user_id
+    if start or end:
+        match.update(_created_between(start, end))
+
+    key = "score" if sort == "relevance" else "created_at"
+    pipeline = [
+        {"$match": match},
+        {"$project": {**ENTRY_PROJECTION, "score": {"$meta": "textScore"}}},
+        {"$set": {"created_at": _time_or_id_time("created_at")}},
+    ]
+    if start or end:
+        # Checked again on the filled-in date, e.g. for unparseable strings
+        created = {}
+        if start:
+            created["$gte"] = start
+        if end:
+            created["$lt"] = end
+        pipeline.append({"$match": {"created_at": created}})
+    if after:
+        value, last_id = after
+        pipeline.append({"$match": {"$or": [
+            {key: {"$lt": value}},
+            {key: value, "_id": {"$lt": last_id}},
+        ]}})
+    # One extra document tells us whether there is a next page
+    pipeline += [{"$sort": {key: -1, "_id": -1}}, {"$limit": limit + 1}]
+
+    docs = await db.entries.aggregate(pipeline).to_list(length=None)
+    return docs[:limit], len(docs) > limit
 
 async def update_entry(id: str, data: dict) -> Optional[dict]:
+    """None if the entry is missing or already holds `data`."""
+    if not data:
+        return None
     result = await db.entries.update_one(
-        {"_id": ObjectId(id)}, {"$set": data}
+        _changed_by({"_id": ObjectId(id)}, data), {"$set": data, "$inc": {"_rev": 1}}
     )
     if result.modified_count != 1:
         return None
-    updated = await db.entries.find_one({"_id": ObjectId(id)})
-    updated["_id"] = str(updated["_id"])
-    return updated
+    await bump_version("entries")
+    updated = await db.entries.find_one({"_id": ObjectId(id)}, NO_REV)
+    return _ready(updated, "created_at")
 
 async def delete_entry(id: str) -> bool:
     result = await db.entries.delete_one({"_id": ObjectId(id)})
-    return result.deleted_count == 1
+    if result.deleted_count != 1:
+        return False
+    await bump_version("entries")
+    return True
 
 # ——— Session (Workout) CRUD ———
 
@@ -54,37 +192,140 @@ async def create_session(data: dict) -> dict:
         del data['_id']
         
     # Insert new document
+    data.setdefault("finished_at", datetime.utcnow())
+    data["_rev"] = 1
     result = await db.sessions.insert_one(data)
+    await bump_version("sessions")
     
     # Get the inserted document
-    session = await db.sessions.find_one({"_id": result.inserted_id})
-    if session:
-        session["_id"] = str(session["_id"])
-    return session
+    session = await db.sessions.find_one({"_id": result.inserted_id}, NO_REV)
+    await analytics.refresh_for_session(db, session)
+    return _ready(session, "finished_at") if session else None
 
 async def list_sessions(limit: int = 50) -> List[dict]:
-    out = []
-    cursor = db.sessions.find().limit(limit)
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        out.append(doc)
-    return out
+    cursor = db.sessions.find({}, SESSION_PROJECTION).limit(limit)
+    return _json_ready(await cursor.to_list(length=None), "finished_at")
+
+async def session_revision(id: str) -> Optional[int]:
+    return await _revision("sessions", {"_id": id})
 
 async def get_session(id: str) -> Optional[dict]:
     doc = await db.sessions.find_one({"_id": id})
     if not doc:
         return None
-    doc["_id"] = str(doc["_id"])
-    return doc
+    return _ready(doc, "finished_at")
 
 async def update_session(id: str, data: dict) -> Optional[dict]:
-    result = await db.sessions.update_one({"_id": id}, {"$set": data})
+    """None if the session is missing or already holds `data`."""
+    if not data:
+        return None
+    result = await db.sessions.update_one(_changed_by({"_id": id}, data), {"$set": data, "$inc": {"_rev": 1}})
     if result.modified_count != 1:
         return None
-    updated = await db.sessions.find_one({"_id": id})
-    updated["_id"] = str(updated["_id"])
-    return updated
+    await bump_version("sessions")
+    updated = await db.sessions.find_one({"_id": id}, NO_REV)
+    await analytics.refresh_for_session(db, updated)
+    return _ready(updated, "finished_at")
 
 async def delete_session(id: str) -> bool:
+    # Read first: the analytics refresh needs the deleted session's user and week
+    session = await db.sessions.find_one({"_id": id}, {"user_id": 1, "finished_at": 1})
     result = await db.sessions.delete_one({"_id": id})
-    return result.deleted_count == 1
+    if result.deleted_count != 1:
+        return False
+    await bump_version("sessions")
+    await analytics.refresh_for_session(db, session)
+    return True
+
+# ——— Rep time series (see app/timeseries.py) ———
+
+def _rep_match(user_id: str, start: datetime, end: datetime, exercise: Optional[str]) -> dict:
+    # meta.user_id + ts range: served by the (user, time) index / bucket bounds
+    match = {"meta.user_id": user_id, "ts": {"$gte": start, "$lt": end}}
+    if exercise:
+        match["meta.exercise"] = exercise
+    return match
+
+async def list_reps(user_id: str, start: datetime, end: datetime,
+                    exercise: Optional[str] = None, limit: int = 1000) -> List[dict]:
+    cursor = (db[settings.rep_collection]
+              .find(_rep_match(user_id, start, end, exercise), {"_id": 0})
+              .sort("ts", 1)
+              .limit(limit))
+    return await cursor.to_list(length=None)
+
+async def rep_trend(user_id: str, start: datetime, end: datetime,
+                    unit: str = "day", exercise: Optional[str] = None) -> List[dict]:
+    """Per-day/week/month rep counts and metric averages, computed in the database."""
+    pipeline = [
+        {"$match": _rep_match(user_id, start, end, exercise)},
+        {"$group": {
+            "_id": timeseries.period_start("$ts", unit),
+            "reps": {"$sum": 1},
+            "avg_elbow_flare": {"$avg": "$elbow_flare"},
+            "max_elbow_flare": {"$max": "$elbow_flare"},
+            "avg_torso_lean": {"$avg": "$torso_lean"},
+            "avg_shoulder_elevation": {"$avg": "$shoulder_elevation"},
+            "avg_rom_percentage": {"$avg": "$rom_percentage"},
+            "min_rom_percentage": {"$min": "$rom_percentage"},
+            "avg_duration": {"$avg": "$duration"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+    buckets = await db[settings.rep_collection].aggregate(pipeline).to_list(length=None)
+    for bucket in buckets:
+        bucket["period"] = bucket.pop("_id")
+    return buckets
+
+# ——— Workout analytics (see app/analytics.py) ———
+# Reads come from the per-(user, exercise, week) cache, a few dozen small
+# documents per exercise and year instead of the session history.
+
+ANALYTICS_FIELDS = {"_id": 0, "refreshed_at": 0, "user_id": 0}
+
+def _analytics_match(user_id: str, start: datetime, end: datetime, exercise: Optional[str]) -> dict:
+    match = {"user_id": user_id, "week": {"$gte": analytics.week_start(start), "$lt": end}}
+    if exercise:
+        match["exercise"] = exercise
+    return match
+
+async def weekly_volume(user_id: str, start: datetime, end: datetime,
+                        exercise: Optional[str] = None) -> List[dict]:
+    await analytics.ensure_built(db, user_id)
+    cursor = (db[settings.analytics_collection]
+              .find(_analytics_match(user_id, start, end, exercise),
+                    {**ANALYTICS_FIELDS, "best_e1rm": 0, "best_set": 0})
+              .sort([("week", ASCENDING), ("exercise", ASCENDING)]))
+    return await cursor.to_list(length=None)
+
+async def e1rm_trend(user_id: str, start: datetime, end: datetime,
+                     exercise: Optional[str] = None) -> List[dict]:
+    await analytics.ensure_built(db, user_id)
+    match = _analytics_match(user_id, start, end, exercise)
+    match["best_e1rm"] = {"$ne": None}
+    cursor = (db[settings.analytics_collection]
+              .find(match, {"_id": 0, "exercise": 1, "week": 1, "best_e1rm": 1, "best_set": 1, "top_weight": 1})
+              .sort([("exercise", ASCENDING), ("week", ASCENDING)]))
+    return await cursor.to_list(length=None)
+
+async def pr_history(user_id: str, exercise: Optional[str] = None) -> List[dict]:
+    """
+    Weeks in which an exercise's best e1RM beat every earlier week. The
+    running best is kept here rather than with $setWindowFields (MongoDB
+    5.0): it is one pass over a few dozen cache rows per exercise and year.
+    """
+    await analytics.ensure_built(db, user_id)
+    match = {"user_id": user_id, "best_e1rm": {"$ne": None}}
+    if exercise:
+        match["exercise"] = exercise
+    cursor = (db[settings.analytics_collection]
+              .find(match, {"_id": 0, "exercise": 1, "week": 1, "best_e1rm": 1, "best_set": 1})
+              .sort([("exercise", ASCENDING), ("week", ASCENDING)]))
+    records, best = [], {}
+    for doc in await cursor.to_list(length=None):
+        previous = best.get(doc["exercise"])
+        if previous is None or doc["best_e1rm"] > previous:
+            records.append({"exercise": doc["exercise"], "week": doc["week"], "e1rm": doc["best_e1rm"],
+                            "previous_e1rm": previous, "best_set": doc["best_set"]})
+            best[doc["exercise"]] = doc["best_e1rm"]
+    return records
@@ -1,15 +1,195 @@
 # File: app/database.py
 
+import atexit
+import threading
+from typing import Optional
+
 import certifi
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, monitoring
 from .config import settings
 
-# Use certifi to supply a known-good CA bundle
-_client = AsyncIOMotorClient(
-    settings.mongodb_uri,
-    tlsCAFile=certifi.where()
-)
-db = _client[settings.db_name]
+# ——— Pool telemetry ———
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Connection-pool counters for one client, fed by the driver's CMAP
+    events: open and checked-out connections, operations waiting for a
+    connection, and how long checkouts take.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_ms_total = 0.0
+        self.checkout_ms_max = 0.0
+        self.pools_cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        # duration covers the wait for a free connection (pymongo >= 4.7)
+        ms = (getattr(event, "duration", None) or 0.0) * 1000
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.checkouts += 1
+            self.checkout_ms_total += ms
+            self.checkout_ms_max = max(self.checkout_ms_max, ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": settings.mongo_max_pool_size,
+                "open": self.open,
+                "in_use": self.in_use,
+                "available": self.open - self.in_use,
+                "wait_queue": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checkout_ms_avg": round(self.checkout_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "checkout_ms_max": round(self.checkout_ms_max, 3),
+                "pools_cleared": self.pools_cleared,
+            }
+
+
+async_pool_monitor = PoolMonitor("async")
+sync_pool_monitor = PoolMonitor("sync")
+
+# ——— Clients ———
+
+def client_options() -> dict:
+    """Driver keyword arguments built from the mongo_* settings."""
+    options = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "connectTimeoutMS": settings.mongo_connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+    }
+    if settings.mongo_socket_timeout_ms:
+        options["socketTimeoutMS"] = settings.mongo_socket_timeout_ms
+    if settings.mongo_wait_queue_timeout_ms:
+        options["waitQueueTimeoutMS"] = settings.mongo_wait_queue_timeout_ms
+    if settings.mongo_compressors:
+        options["compressors"] = settings.mongo_compressors
+    # Use certifi to supply a known-good CA bundle for TLS (Atlas) connections;
+    # passing it for a plain mongodb:// URI would force TLS on
+    uri = settings.mongodb_uri.lower()
+    if uri.startswith("mongodb+srv://") or "tls=true" in uri or "ssl=true" in uri:
+        options["tlsCAFile"] = certifi.where()
+    return options
+
+
+class Database:
+    """
+    Stands in for the Motor database object so modules can keep doing
+    `from app.database import db` at import time, while the client itself
+    is opened and closed by the FastAPI lifespan (connect/close).
+    """
+
+    def __init__(self):
+        self.client: Optional[AsyncIOMotorClient] = None
+        self._db = None
+
+    def connect(self):
+        if self.client is None:
+            self.client = AsyncIOMotorClient(
+                settings.mongodb_uri,
+                event_listeners=[async_pool_monitor],
+                **client_options(),
+            )
+            self._db = self.client[settings.db_name]
+        return self._db
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self._db = None
+
+    def __getattr__(self, name):
+        # Used outside the lifespan (scripts, tests), connect on first use
+        return getattr(self._db if self._db is not None else self.connect(), name)
+
+    def __getitem__(self, name):
+        return (self._db if self._db is not None else self.connect())[name]
+
+
+db = Database()
+
+_sync_client: Optional[MongoClient] = None
+_sync_lock = threading.Lock()
+
+def get_sync_db():
+    """
+    Database on a process-wide synchronous MongoClient with the same pool
+    settings, for the Flask/OpenCV side (e.g. save_posture_data). Created
+    on first use and closed at interpreter exit.
+    """
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None:
+            _sync_client = MongoClient(
+                settings.mongodb_uri,
+                event_listeners=[sync_pool_monitor],
+                **client_options(),
+            )
+            atexit.register(close_sync_client)
+    return _sync_client[settings.db_name]
+
+def close_sync_client():
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+def pool_stats() -> dict:
+    return {
+        "async": async_pool_monitor.stats(),
+        "sync": sync_pool_monitor.stats(),
+    }
 
 def get_db():
     return db
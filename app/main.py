@@ -1,6 +1,9 @@
 # File: app/main.py
 
+import asyncio
+import logging
 import os
+from contextlib import asynccontextmanager
 import google.generativeai as genai
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
@@ -8,18 +11,46 @@ from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.database import db
+from app.analytics import ensure_analytics_indexes
+from app.crud import ensure_entry_indexes
+from app.database import db, pool_stats
+from app.services.advice import advice_stats
 from app.routers.journal import router as journal_router
 from app.routers.sessions import router as session_router
 from app.routers.advice import router as advice_router
+from app.routers.reps import router as reps_router
+from app.routers.admin import router as admin_router
+from app.routers.analytics import router as analytics_router
 
 # Configure the Gemini client
 genai.configure(api_key=settings.gemini_api_key)
 
+logger = logging.getLogger(__name__)
+
+async def build_indexes():
+    try:
+        await ensure_entry_indexes()
+        await ensure_analytics_indexes(db)
+    except Exception as e:
+        # Searches retry the index build on their own
+        logger.warning(f"Could not build indexes at startup: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Motor client (and connection pool) per worker process, closed on shutdown
+    db.connect()
+    # In the background so a large index build (or an unreachable server)
+    # doesn't hold up startup
+    index_task = asyncio.create_task(build_indexes())
+    yield
+    index_task.cancel()
+    db.close()
+
 app = FastAPI(
     title="FitForm Journal API",
     version="0.1.0",
     debug=True,
+    lifespan=lifespan,
 )
 #  ── ADD THIS ─────────────────────────────────────────────
 app.add_middleware(
@@ -33,7 +64,8 @@ app.add_middleware(
 # —— API routes —— #
 @app.get("/health", tags=["health"])
 async def health():
-    return {"status": "ok"}
+    # Pool counters for sizing mongo_max_pool_size per worker
+    return {"status": "ok", "mongo_pool": pool_stats(), "advice": advice_stats()}
 
 @app.get("/debug/entries_count", tags=["debug"])
 async def debug_entries_count():
@@ -43,6 +75,9 @@ async def debug_entries_count():
 app.include_router(journal_router)
 app.include_router(session_router)
 app.include_router(advice_router)
+app.include_router(reps_router)
+app.include_router(admin_router)
+app.include_router(analytics_router)
 
 # —— Static files —— #
 ROOT_DIR   = os.path.dirname(os.path.dirname(__file__))
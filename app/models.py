@@ -42,7 +42,8 @@ class JournalEntryUpdate(BaseModel):
 class JournalEntry(JournalEntryBase):
     """This is the full model returned by GET/PUT/POST"""
     id: str = Field(..., alias="_id")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Set on write; older entries get their ObjectId time (see crud._ready)
+    created_at: Optional[datetime] = None
 
     model_config = ConfigDict(
         populate_by_name=True,    # allow passing id via "_id"
@@ -57,6 +58,38 @@ class JournalEntry(JournalEntryBase):
     )
 
 
+class EntrySearchHit(BaseModel):
+    """One search result: the entry plus a highlighted excerpt"""
+    id: str = Field(..., alias="_id")
+    user_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    score: float = Field(..., description="Text relevance score")
+    snippet: str = Field(..., description="HTML-escaped excerpt with matches in <mark> tags")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class EntrySearchPage(BaseModel):
+    results: List[EntrySearchHit]
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as `cursor` to fetch the next page; null on the last page"
+    )
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "results": [{
+                    "_id": "6523a1f8e13f4c001e3a9b4d",
+                    "user_id": "user_12345",
+                    "created_at": "2025-04-27T02:15:00Z",
+                    "score": 1.1,
+                    "snippet": "…curls were fine but my <mark>elbow</mark> <mark>hurt</mark> on the last set…"
+                }],
+                "next_cursor": "WzEuMSwiNjUyM2ExZjhlMTNmNGMwMDFlM2E5YjRkIl0"
+            }
+        }
+    )
+
+
 #
 # —— PostureData Models —— 
 #
@@ -87,7 +120,8 @@ class PostureDataCreate(PostureDataBase):
 class PostureData(PostureDataBase):
     """Returned by GET/POST posture endpoints"""
     id: str = Field(..., alias="_id")
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    # Recorded when the data is stored; never filled in at read time
+    timestamp: Optional[datetime] = None
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -174,7 +208,8 @@ class SessionEntryBase(Session):
 class SessionEntry(SessionEntryBase):
     """Full session returned by GET/PUT/POST"""
     id: str = Field(..., alias="_id")
-    finished_at: datetime = Field(default_factory=datetime.utcnow)
+    # Set on write; older sessions get their ObjectId time (see crud._ready)
+    finished_at: Optional[datetime] = None
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -214,4 +249,100 @@ class AdviceResponse(BaseModel):
                           "and swap in incline presses to shock your chest muscles."
             }
         }
-    )
\ No newline at end of file
+    )
+#
+# —— Rep Time Series Models —— 
+#
+class RepMeta(BaseModel):
+    user_id: str
+    exercise: Optional[str] = None
+    side: Optional[str] = None
+
+class RepPoint(BaseModel):
+    """One stored rep, as returned by GET /reps/{user_id}"""
+    ts: datetime
+    meta: RepMeta
+    session_id: Optional[str] = None
+    set_number: Optional[int] = None
+    rep_number: Optional[int] = None
+    weight: Optional[float] = None
+    duration: Optional[float] = None
+    elbow_flare: Optional[float] = None
+    torso_lean: Optional[float] = None
+    shoulder_elevation: Optional[float] = None
+    rom_percentage: Optional[float] = None
+
+class RepTrendBucket(BaseModel):
+    """Rep metrics aggregated over one day/week/month"""
+    period: datetime
+    reps: int
+    avg_elbow_flare: Optional[float] = None
+    max_elbow_flare: Optional[float] = None
+    avg_torso_lean: Optional[float] = None
+    avg_shoulder_elevation: Optional[float] = None
+    avg_rom_percentage: Optional[float] = None
+    min_rom_percentage: Optional[float] = None
+    avg_duration: Optional[float] = None
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "period": "2025-04-21T00:00:00Z",
+                "reps": 64,
+                "avg_elbow_flare": 9.4,
+                "max_elbow_flare": 18.2,
+                "avg_torso_lean": 4.1,
+                "avg_shoulder_elevation": 0.03,
+                "avg_rom_percentage": 91.5,
+                "min_rom_percentage": 72.0,
+                "avg_duration": 1.8
+            }
+        }
+    )
+
+#
+# —— Workout Analytics Models ——
+#
+class BestSet(BaseModel):
+    weight: Optional[float] = None
+    reps: Optional[int] = None
+
+class WeeklyVolume(BaseModel):
+    """One exercise's training in one week (weeks start on Monday)"""
+    week: datetime
+    exercise: str
+    sessions: int
+    sets: int
+    reps: int
+    volume: float = Field(..., description="Sum of reps x weight")
+    top_weight: Optional[float] = None
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "week": "2025-04-21T00:00:00Z",
+                "exercise": "Bench Press",
+                "sessions": 2,
+                "sets": 6,
+                "reps": 42,
+                "volume": 7980.0,
+                "top_weight": 195.0
+            }
+        }
+    )
+
+class E1RMPoint(BaseModel):
+    """Best estimated one-rep max (Epley) of an exercise in one week"""
+    week: datetime
+    exercise: str
+    best_e1rm: float
+    best_set: BestSet
+    top_weight: Optional[float] = None
+
+class PersonalRecord(BaseModel):
+    """A week whose best e1RM beat every earlier week of the exercise"""
+    week: datetime
+    exercise: str
+    e1rm: float
+    previous_e1rm: Optional[float] = None
+    best_set: BestSet
@@ -0,0 +1,152 @@
+# File: app/profiling.py
+
+import collections
+import hmac
+import ipaddress
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+# ——— On-demand sampling profiler ———
+# Nothing runs until a profile is requested. While one runs, a sampler
+# thread snapshots every thread's stack (sys._current_frames) at a fixed
+# interval, so the capture loop, frame generators, event loop and other
+# background threads all show up, at wall-clock time rather than CPU time.
+
+MAX_SECONDS = 60
+MIN_INTERVAL_MS = 1
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_running = threading.Lock()   # one profile at a time per process
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _label(code):
+    filename = code.co_filename
+    if filename.startswith(ROOT):
+        filename = os.path.relpath(filename, ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, thread_filter: Optional[str] = None):
+        self.interval = interval
+        self.thread_filter = thread_filter
+        self.stacks = collections.Counter()   # (thread name, frames root->leaf) -> samples
+        self.samples = 0
+        self.seconds = 0.0
+        self._labels = {}                     # code object -> label, built once per code
+
+    def _stack(self, frame):
+        stack = []
+        labels = self._labels
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = _label(code)
+            stack.append(label)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def run(self, seconds: float):
+        """Sample all other threads for `seconds` (blocking)."""
+        if not _running.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            me = threading.get_ident()
+            names = {}
+            start = time.perf_counter()
+            deadline = start + seconds
+            while time.perf_counter() < deadline:
+                frames = sys._current_frames()
+                if any(ident not in names for ident in frames):
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident == me:
+                        continue
+                    name = names.get(ident, f"thread-{ident}")
+                    if self.thread_filter and self.thread_filter not in name:
+                        continue
+                    self.stacks[(name, self._stack(frame))] += 1
+                del frames
+                self.samples += 1
+                time.sleep(self.interval)
+            self.seconds = time.perf_counter() - start
+        finally:
+            _running.release()
+        return self
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed stack format, for flamegraph.pl or speedscope."""
+        lines = [
+            ";".join((name,) + stack).replace(" ", "_") + f" {count}"
+            for (name, stack), count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def top(self, limit: int = 30) -> dict:
+        """pstats-style table: samples where a function is running (self) or on the stack (total)."""
+        own = collections.Counter()
+        total = collections.Counter()
+        threads = collections.Counter()
+        for (name, stack), count in self.stacks.items():
+            threads[name] += count
+            if stack:
+                own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        sampled = sum(self.stacks.values()) or 1
+        return {
+            "seconds": round(self.seconds, 2),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "threads": dict(threads.most_common()),
+            "functions": [
+                {
+                    "function": label,
+                    "self": count,
+                    "self_pct": round(100 * count / sampled, 1),
+                    "total": total[label],
+                    "total_pct": round(100 * total[label] / sampled, 1),
+                }
+                for label, count in own.most_common(limit)
+            ],
+        }
+
+    def text(self, limit: int = 30) -> str:
+        report = self.top(limit)
+        lines = [
+            f"{report['samples']} samples over {report['seconds']}s "
+            f"every {report['interval_ms']:g} ms",
+            "",
+            f"{'self%':>7} {'total%':>7}  function",
+        ]
+        for row in report["functions"]:
+            lines.append(f"{row['self_pct']:>7} {row['total_pct']:>7}  {row['function']}")
+        return "\n".join(lines) + "\n"
+
+
+def profile(seconds: float, interval_ms: float = 5, thread: Optional[str] = None) -> SamplingProfiler:
+    seconds = min(max(seconds, 0.1), MAX_SECONDS)
+    interval = max(interval_ms, MIN_INTERVAL_MS) / 1000
+    return SamplingProfiler(interval, thread).run(seconds)
+
+
+def admin_allowed(token: Optional[str], client_host: Optional[str], admin_token: Optional[str]) -> bool:
+    """With an admin token configured it must match; without one, only loopback clients."""
+    if admin_token:
+        # Constant time, so response timing doesn't leak the token prefix
+        return token is not None and hmac.compare_digest(token.encode(), admin_token.encode())
+    try:
+        return client_host is not None and ipaddress.ip_address(client_host).is_loopback
+    except ValueError:
+        return client_host == "localhost"
@@ -0,0 +1,15 @@
+# File: app/responses.py
+
+import orjson
+from fastapi.responses import Response
+
+
+class ORJSONResponse(Response):
+    """
+    JSON response encoded with orjson, for content that is already JSON-ready
+    (strings for ObjectIds; datetimes are encoded natively as ISO 8601).
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
@@ -0,0 +1,37 @@
+# File: app/routers/admin.py
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+from app.config import settings
+from app.profiling import MAX_SECONDS, ProfilerBusy, admin_allowed, profile
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/profile")
+async def cpu_profile(
+    request: Request,
+    seconds: float = Query(5, gt=0, le=MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    format: str = Query("text", pattern="^(text|json|collapsed)$"),
+    thread: Optional[str] = Query(None, description="Only threads whose name contains this"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Sample every thread of this worker process for `seconds` and return
+    the aggregate: a self/total table (text or json), or collapsed stacks
+    for flamegraph.pl / speedscope.
+    """
+    client_host = request.client.host if request.client else None
+    if not admin_allowed(x_admin_token, client_host, settings.admin_token):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    try:
+        # The sampler runs in a worker thread so the event loop keeps serving (and gets sampled)
+        profiler = await asyncio.to_thread(profile, seconds, interval_ms, thread)
+    except ProfilerBusy as e:
+        raise HTTPException(status.HTTP_409_CONFLICT, detail=str(e))
+    if format == "json":
+        return profiler.top()
+    return PlainTextResponse(profiler.collapsed() if format == "collapsed" else profiler.text())
@@ -1,9 +1,10 @@
 # File: app/routers/advice.py
 
-from fastapi import APIRouter, HTTPException, Query
+import math
+from fastapi import APIRouter, HTTPException, Query, status
 from typing import Optional
 from app.models import AdviceResponse
-from app.services.advice import generate_advice   # ← point at advice.py!
+from app.services.advice import advice_flight, advice_limiter, get_advice_shared   # ← point at advice.py!
 
 router = APIRouter(prefix="/advice", tags=["advice"])
 
@@ -21,9 +22,21 @@ async def get_advice(
     """
     Fetches the user's last `limit` workout sessions
     and returns personalized fitness advice.
+
+    Identical requests already in flight are joined rather than sent to
+    the LLM again (and are not rate limited); new generations are limited
+    per user and globally, with 429 and Retry-After when over the limit.
     """
+    if not advice_flight.in_flight((user_id, limit)):
+        retry_after = advice_limiter.acquire(user_id)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Advice requested too often, please try again shortly",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
     try:
-        advice_text = await generate_advice(user_id, limit)
+        advice_text = await get_advice_shared(user_id, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     return {"advice": advice_text}
@@ -0,0 +1,50 @@
+# File: app/routers/analytics.py
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Query
+from app.responses import ORJSONResponse
+from app.config import settings
+from app.crud import e1rm_trend, pr_history, weekly_volume
+from app.models import E1RMPoint, PersonalRecord, WeeklyVolume
+from app.timerange import resolve_range
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+DEFAULT_RANGE = timedelta(weeks=26)
+
+def _respond(rows: List[dict]):
+    if settings.trust_db_output:
+        return ORJSONResponse(rows)
+    return rows
+
+@router.get("/{user_id}/volume", response_model=List[WeeklyVolume])
+async def user_weekly_volume(
+    user_id: str,
+    start: Optional[datetime] = Query(None, description="Defaults to 26 weeks before end"),
+    end: Optional[datetime] = Query(None, description="Exclusive, defaults to now"),
+    exercise: Optional[str] = None,
+):
+    """
+    Sets, reps and volume (reps x weight) per exercise and week, oldest
+    first, from the precomputed weekly rollups.
+    """
+    start, end = resolve_range(start, end, DEFAULT_RANGE)
+    return _respond(await weekly_volume(user_id, start, end, exercise))
+
+@router.get("/{user_id}/e1rm", response_model=List[E1RMPoint])
+async def user_e1rm_trend(
+    user_id: str,
+    start: Optional[datetime] = Query(None, description="Defaults to 26 weeks before end"),
+    end: Optional[datetime] = Query(None, description="Exclusive, defaults to now"),
+    exercise: Optional[str] = None,
+):
+    """Best estimated 1RM (Epley) per exercise and week, with the set it came from."""
+    start, end = resolve_range(start, end, DEFAULT_RANGE)
+    return _respond(await e1rm_trend(user_id, start, end, exercise))
+
+@router.get("/{user_id}/prs", response_model=List[PersonalRecord])
+async def user_pr_history(user_id: str, exercise: Optional[str] = None):
+    """Every week an exercise's best e1RM beat all earlier weeks, over the whole history."""
+    return _respond(await pr_history(user_id, exercise))
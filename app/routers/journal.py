@@ -1,10 +1,23 @@
 # File: app/routers/journal.py
 
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from app.responses import ORJSONResponse
+from typing import List, Optional
 
-from app.crud import create_entry, get_entry, list_entries, update_entry, delete_entry
-from app.models import JournalEntryCreate, JournalEntry as JournalEntryModel, JournalEntryUpdate
+from app.config import settings
+from app.conditional import (
+    collection_etag, content_etag, document_etag, etag_matches, not_modified, set_etag,
+)
+
+from app.crud import (
+    create_entry, get_entry, list_entries, update_entry, delete_entry, search_entries,
+    collection_version, entry_revision,
+)
+from app.models import (
+    JournalEntryCreate, JournalEntry as JournalEntryModel, JournalEntryUpdate, EntrySearchPage,
+)
+from app.services.search import decode_cursor, encode_cursor, query_terms, snippet
 
 
 router = APIRouter(prefix="/entries", tags=["entries"])
@@ -12,25 +25,84 @@ router = APIRouter(prefix="/entries", tags=["entries"])
 # POST: accept a JournalEntryCreate, return a JournalEntryModel
 @router.post("/", response_model=JournalEntryModel, status_code=status.HTTP_201_CREATED)
 async def create_journal_entry(entry: JournalEntryCreate):
-    return await create_entry(entry)
+    return await create_entry(entry.model_dump())
 
 # GET all
 @router.get("/", response_model=List[JournalEntryModel])
-async def read_entries(limit: int = 100):
-    return await list_entries(limit)
+async def read_entries(request: Request, response: Response, limit: int = 100):
+    # 304 while no entry has been written since the client's copy
+    etag = collection_etag("entries", await collection_version("entries"), limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    entries = await list_entries(limit)
+    if settings.trust_db_output:
+        # Already JSON-ready from the CRUD layer: skip response_model re-validation
+        return set_etag(ORJSONResponse(entries), etag)
+    set_etag(response, etag)
+    return entries
+
+# GET search (declared before /{entry_id} so "search" isn't taken for an id)
+@router.get("/search", response_model=EntrySearchPage)
+async def search_journal_entries(
+    q: str = Query(..., min_length=1, max_length=200,
+                   description='Words, "exact phrases" and -excluded words'),
+    user_id: Optional[str] = None,
+    start: Optional[datetime] = Query(None, description="Only entries created at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only entries created before this time"),
+    sort: str = Query("relevance", pattern="^(relevance|recent)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+):
+    """
+    Full-text search over journal entries using the text index on content,
+    ranked by relevance (or newest first), with highlighted snippets.
+    Pages are keyset-paginated: follow next_cursor until it is null.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    docs, more = await search_entries(q, user_id, start, end, limit, after, sort)
+    terms = query_terms(q)
+    results = [
+        {
+            "_id": str(doc["_id"]),
+            "user_id": doc.get("user_id"),
+            "created_at": doc.get("created_at"),
+            "score": round(doc["score"], 4),
+            "snippet": snippet(doc.get("content", ""), terms),
+        }
+        for doc in docs
+    ]
+    next_cursor = None
+    if more and docs:
+        last = docs[-1]
+        next_cursor = encode_cursor(last["score"] if sort == "relevance" else last.get("created_at"), last["_id"])
+    page = {"results": results, "next_cursor": next_cursor}
+    if settings.trust_db_output:
+        return ORJSONResponse(page)
+    return page
 
 # GET one
 @router.get("/{entry_id}", response_model=JournalEntryModel)
-async def read_entry(entry_id: str):
+async def read_entry(entry_id: str, request: Request, response: Response):
+    rev = await entry_revision(entry_id)
+    if rev is not None and etag_matches(request, document_etag(entry_id, rev)):
+        return not_modified(document_etag(entry_id, rev))
     entry = await get_entry(entry_id)
     if not entry:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Entry not found")
+    etag = document_etag(entry_id, entry["_rev"]) if "_rev" in entry else content_etag(entry)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return entry
 
 # PUT
 @router.put("/{entry_id}", response_model=JournalEntryModel)
 async def update_journal_entry(entry_id: str, entry: JournalEntryUpdate):
-    updated = await update_entry(entry_id, entry)
+    updated = await update_entry(entry_id, entry.model_dump(exclude_unset=True))
     if not updated:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Entry not found or no changes made")
     return updated
@@ -0,0 +1,50 @@
+# File: app/routers/reps.py
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Query
+from app.responses import ORJSONResponse
+from app.config import settings
+from app.crud import list_reps, rep_trend
+from app.models import RepPoint, RepTrendBucket
+from app.timerange import resolve_range
+
+router = APIRouter(prefix="/reps", tags=["reps"])
+
+DEFAULT_RANGE = timedelta(days=30)
+
+@router.get("/{user_id}", response_model=List[RepPoint])
+async def user_reps(
+    user_id: str,
+    start: Optional[datetime] = Query(None, description="Inclusive, defaults to 30 days before end"),
+    end: Optional[datetime] = Query(None, description="Exclusive, defaults to now"),
+    exercise: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10_000),
+):
+    """
+    Individual reps for a user in a time range, oldest first.
+    """
+    start, end = resolve_range(start, end, DEFAULT_RANGE)
+    reps = await list_reps(user_id, start, end, exercise, limit)
+    if settings.trust_db_output:
+        return ORJSONResponse(reps)
+    return reps
+
+@router.get("/{user_id}/trend", response_model=List[RepTrendBucket])
+async def user_rep_trend(
+    user_id: str,
+    start: Optional[datetime] = Query(None, description="Inclusive, defaults to 30 days before end"),
+    end: Optional[datetime] = Query(None, description="Exclusive, defaults to now"),
+    bucket: str = Query("day", pattern="^(day|week|month)$"),
+    exercise: Optional[str] = None,
+):
+    """
+    Rep counts and form metrics per day, week or month, aggregated
+    server-side so long ranges return one row per period.
+    """
+    start, end = resolve_range(start, end, DEFAULT_RANGE)
+    trend = await rep_trend(user_id, start, end, bucket, exercise)
+    if settings.trust_db_output:
+        return ORJSONResponse(trend)
+    return trend
@@ -1,7 +1,12 @@
 # File: app/routers/sessions.py
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from app.responses import ORJSONResponse
 from typing import List
+from app.config import settings
+from app.conditional import (
+    collection_etag, content_etag, document_etag, etag_matches, not_modified, set_etag,
+)
 from app.models import SessionEntryCreate, SessionEntry, SessionEntryUpdate
 from app.crud import (
     create_session,
@@ -9,6 +14,8 @@ from app.crud import (
     get_session,
     update_session,
     delete_session,
+    collection_version,
+    session_revision,
 )
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
@@ -36,17 +43,34 @@ async def start_session(session: Session):
         )
 
 @router.get("/", response_model=List[SessionEntry])
-async def all_sessions(limit: int = 50):
+async def all_sessions(request: Request, response: Response, limit: int = 50):
     """
-    List recent workout sessions.
+    List recent workout sessions. Send the ETag back in If-None-Match to
+    get 304 Not Modified while no session has been written.
     """
-    return await list_sessions(limit)
+    # Read the version before the page so a concurrent write can only make the tag stale, never wrong
+    etag = collection_etag("sessions", await collection_version("sessions"), limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    sessions = await list_sessions(limit)
+    if settings.trust_db_output:
+        # Already JSON-ready from the CRUD layer: skip response_model re-validation
+        return set_etag(ORJSONResponse(sessions), etag)
+    set_etag(response, etag)
+    return sessions
 
 @router.get("/{session_id}", response_model=SessionEntry)
-async def one_session(session_id: str):
+async def one_session(session_id: str, request: Request, response: Response):
+    rev = await session_revision(session_id)
+    if rev is not None and etag_matches(request, document_etag(session_id, rev)):
+        return not_modified(document_etag(session_id, rev))
     sess = await get_session(session_id)
     if not sess:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Session not found")
+    etag = document_etag(session_id, sess["_rev"]) if "_rev" in sess else content_etag(sess)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return sess
 
 @router.put("/{session_id}", response_model=SessionEntry)
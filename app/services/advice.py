@@ -1,18 +1,48 @@
 # File: app/services/advice_service.py
 
+import asyncio
 import os
+import time
 from typing import List
 from datetime import datetime
 from app.database import db
 from app.config import settings
+from app.services.prompt import PromptMetrics, build_advice_prompt, exercise_rollup, form_rollup
+from app.services.rules import RuleStats, timed_rule_advice
+from app.services.throttle import RateLimiter, SingleFlight
 from google import genai
 
 # Initialize the Gemini client
 client = genai.Client(api_key=settings.gemini_api_key)
 
+# Concurrent requests for the same (user_id, limit) share one generation
+advice_flight = SingleFlight()
+advice_limiter = RateLimiter(
+    key_rate=settings.advice_user_per_minute / 60,
+    key_burst=settings.advice_user_burst,
+    global_rate=settings.advice_global_per_minute / 60,
+    global_burst=settings.advice_global_burst,
+)
+prompt_metrics = PromptMetrics()
+rule_stats = RuleStats()
+
+def advice_stats() -> dict:
+    return {
+        "coalescing": advice_flight.stats(),
+        "rate_limit": advice_limiter.stats(),
+        "prompt": prompt_metrics.stats(),
+        "rules": rule_stats.stats(),
+    }
+
+async def get_advice_shared(user_id: str, limit: int = 5) -> str:
+    """generate_advice, joined with any identical request already in flight."""
+    return await advice_flight.do((user_id, limit), lambda: generate_advice(user_id, limit))
+
 async def generate_advice(user_id: str, limit: int = 5) -> str:
     """
     Generate advice based on both workout history and posture analysis.
+    Clear-cut cases are answered by the local rules (see rules.py); the
+    rest go to the LLM.
     """
     # 1. Retrieve recent workout sessions
     workout_sessions = []
@@ -26,49 +56,20 @@ async def generate_advice(user_id: str, limit: int = 5) -> str:
     async for doc in cursor:
         posture_sessions.append(doc)
 
-    # 3. Build workout history summary
-    workout_summary = []
-    for s in workout_sessions:
-        workout_lines = [f"Session on {s.get('finished_at', '')}:"]
-        for w in s['workouts']:
-            sets_info = [f"{st['reps']} reps @ {st['weight']} lbs" for st in w['sets']]
-            workout_lines.append(f"  - {w['name']}: {', '.join(sets_info)}")
-        workout_summary.extend(workout_lines)
-
-    # 4. Build posture analysis summary
-    form_issues = []
-    for p in posture_sessions:
-        for set_data in p.get('sets', []):
-            metrics = set_data.get('form_metrics', {})
-            if metrics.get('elbow_flare', 0) > 15:
-                form_issues.append("excessive elbow flare")
-            if metrics.get('torso_lean', 0) > 10:
-                form_issues.append("significant torso lean")
-            if metrics.get('rom_percentage', 0) < 80:
-                form_issues.append("incomplete range of motion")
-            if metrics.get('shoulder_elevation', 0) > 0.1:
-                form_issues.append("shoulder shrugging")
-
-    # 5. Create enhanced prompt for Gemini
-    prompt = f"""
-Based on the user's workout history and form analysis:
-
-Recent Workout History:
-{chr(10).join(workout_summary)}
-
-Form Analysis Issues:
-- {', '.join(form_issues) if form_issues else 'No major form issues detected'}
-
-Please provide specific advice addressing:
-1. Exercise progression and weight selection
-2. Form corrections needed based on the analysis
-3. Injury prevention recommendations
-4. Suggested modifications to improve technique
+    # 3. Aggregate both, and answer locally when a rule is confident
+    workouts = exercise_rollup(workout_sessions)
+    form = form_rollup(posture_sessions)
+    if settings.advice_rules:
+        advice = timed_rule_advice(workouts, form, rule_stats)
+        if advice is not None:
+            return advice
 
-Keep the response focused and actionable and as brief as possible no more than 1 line.
-"""
+    # 4. Otherwise build a prompt within the token budget
+    prompt, prompt_stats = build_advice_prompt(workouts, form, settings.advice_prompt_token_budget)
 
-    # 6. Call Gemini chat API
+    # 5. Call Gemini chat API (blocking client, so keep it off the event loop)
     chat = client.chats.create(model="gemini-2.0-flash-001")
-    response = chat.send_message(prompt)
+    start = time.perf_counter()
+    response = await asyncio.to_thread(chat.send_message, prompt)
+    prompt_metrics.record(prompt_stats, time.perf_counter() - start)
     return response.text
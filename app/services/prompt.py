@@ -0,0 +1,220 @@
+# File: app/services/prompt.py
+
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# ——— Form checks ———
+# (metric, threshold, issue) — a set has the issue when the metric is past
+# the threshold: above it, except rom_percentage which must reach it.
+FORM_CHECKS = (
+    ("elbow_flare", 15, "excessive elbow flare"),
+    ("torso_lean", 10, "significant torso lean"),
+    ("rom_percentage", 80, "incomplete range of motion"),
+    ("shoulder_elevation", 0.1, "shoulder shrugging"),
+)
+TREND_MARGIN = 0.15   # change in the share of affected sets that counts as a trend
+
+# Characters per token for English prose; close enough for budgeting
+# without a round trip to the model's tokenizer
+CHARS_PER_TOKEN = 4
+
+PROMPT_HEADER = "Based on the user's workout history and form analysis:"
+PROMPT_INSTRUCTIONS = """Please provide specific advice addressing:
+1. Exercise progression and weight selection
+2. Form corrections needed based on the analysis
+3. Injury prevention recommendations
+4. Suggested modifications to improve technique
+
+Keep the response focused and actionable and as brief as possible no more than 1 line."""
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _has_issue(metric: str, value: float, threshold: float) -> bool:
+    return value < threshold if metric == "rom_percentage" else value > threshold
+
+
+def _share(hits: int, checked: int) -> float:
+    return hits / checked if checked else 0.0
+
+
+def form_rollup(posture_sessions: List[dict]) -> dict:
+    """
+    Per form check: sets that had the issue out of the sets checked, the
+    metric's average, and its trend (share of affected sets in the newer
+    half of the sessions against the older half: "improving", "worse",
+    "steady", or None with fewer than two sessions). Sessions come newest
+    first; sets without a metric are not checked for it.
+    """
+    ordered = list(reversed(posture_sessions))
+    middle = len(ordered) // 2
+    # metric -> [hits, checked, total] for all / older half / newer half
+    counts = {metric: {"all": [0, 0, 0.0], "old": [0, 0, 0.0], "new": [0, 0, 0.0]} for metric, _, _ in FORM_CHECKS}
+    for i, session in enumerate(ordered):
+        half = "old" if i < middle else "new"
+        for set_data in session.get("sets", []):
+            metrics = set_data.get("form_metrics") or {}
+            for metric, threshold, _ in FORM_CHECKS:
+                value = metrics.get(metric)
+                if value is None:
+                    continue
+                hit = _has_issue(metric, value, threshold)
+                for key in ("all", half):
+                    counts[metric][key][0] += hit
+                    counts[metric][key][1] += 1
+                    counts[metric][key][2] += value
+
+    checks = []
+    for metric, threshold, issue in FORM_CHECKS:
+        hits, checked, total = counts[metric]["all"]
+        trend = None
+        if middle:
+            change = _share(*counts[metric]["new"][:2]) - _share(*counts[metric]["old"][:2])
+            trend = "improving" if change <= -TREND_MARGIN else "worse" if change >= TREND_MARGIN else "steady"
+        checks.append({
+            "metric": metric,
+            "issue": issue,
+            "threshold": threshold,
+            "hits": hits,
+            "checked": checked,
+            "share": _share(hits, checked),
+            "average": total / checked if checked else None,
+            "trend": trend,
+        })
+    return {"sessions": len(posture_sessions), "checks": checks}
+
+
+def exercise_rollup(workout_sessions: List[dict]) -> dict:
+    """
+    Per exercise across the sessions (newest first): sessions trained, sets,
+    reps of every set, and the top set weight of each session, oldest first.
+    Most trained exercises first.
+    """
+    exercises: Dict[str, dict] = defaultdict(lambda: {"sessions": 0, "sets": 0, "reps": [], "top": []})
+    for session in reversed(workout_sessions):
+        for workout in session.get("workouts", []):
+            sets = workout.get("sets") or []
+            if not sets:
+                continue
+            summary = exercises[workout["name"]]
+            summary["sessions"] += 1
+            summary["sets"] += len(sets)
+            summary["reps"].extend(s["reps"] for s in sets)
+            summary["top"].append(max(s["weight"] for s in sets))
+    ordered = sorted(exercises.items(), key=lambda item: (-item[1]["sessions"], item[0]))
+    return {
+        "sessions": len(workout_sessions),
+        "exercises": [dict(summary, name=name) for name, summary in ordered],
+    }
+
+
+def form_lines(form: dict) -> List[str]:
+    """One line per form issue found, most frequent first."""
+    found = sorted((c for c in form["checks"] if c["hits"]), key=lambda c: -c["share"])
+    lines = []
+    for check in found:
+        line = (f"{check['issue']}: {check['hits']}/{check['checked']} sets "
+                f"(avg {check['metric']} {check['average']:.3g}, threshold {check['threshold']})")
+        if check["trend"]:
+            line += ", getting worse" if check["trend"] == "worse" else f", {check['trend']}"
+        lines.append(line)
+    return lines
+
+
+def exercise_lines(workouts: dict) -> List[str]:
+    """One line per exercise, most trained first."""
+    lines = []
+    for summary in workouts["exercises"]:
+        reps = summary["reps"]
+        rep_range = f"{min(reps)}-{max(reps)}" if min(reps) != max(reps) else f"{reps[0]}"
+        top = summary["top"]
+        weight = f"top set {top[0]:g} -> {top[-1]:g} lbs" if len(top) > 1 else f"top set {top[0]:g} lbs"
+        lines.append(f"{summary['name']}: {summary['sessions']} sessions, {summary['sets']} sets of {rep_range} reps, {weight}")
+    return lines
+
+
+def build_advice_prompt(workouts: dict, form: dict, token_budget: Optional[int] = None) -> Tuple[str, dict]:
+    """
+    The advice prompt from exercise_rollup / form_rollup summaries, within
+    `token_budget` (estimated) tokens when given. Form issues are kept
+    before exercises, and the least trained exercises are dropped first.
+    Returns the prompt and its size stats.
+    """
+    workout_lines = exercise_lines(workouts)
+    issue_lines = form_lines(form)
+
+    def render(kept_workouts, kept_issues, omitted):
+        history = [f"- {line}" for line in kept_workouts]
+        if omitted:
+            history.append(f"- ({omitted} less frequent exercises omitted)")
+        history = history or ["- No recent workouts logged"]
+        issues = [f"- {line}" for line in kept_issues] or ["- No major form issues detected"]
+        return "\n\n".join((
+            PROMPT_HEADER,
+            f"Recent Workout History ({workouts['sessions']} sessions):\n" + "\n".join(history),
+            f"Form Analysis Issues ({form['sessions']} sessions):\n" + "\n".join(issues),
+            PROMPT_INSTRUCTIONS,
+        ))
+
+    kept_issues, kept_workouts = list(issue_lines), list(workout_lines)
+    prompt = render(kept_workouts, kept_issues, 0)
+    if token_budget:
+        # Drop from the end: exercises first, then the rarest form issues
+        while estimate_tokens(prompt) > token_budget and (kept_workouts or kept_issues):
+            if kept_workouts:
+                kept_workouts.pop()
+            else:
+                kept_issues.pop()
+            prompt = render(kept_workouts, kept_issues, len(workout_lines) - len(kept_workouts))
+
+    dropped = len(workout_lines) - len(kept_workouts) + len(issue_lines) - len(kept_issues)
+    return prompt, {
+        "chars": len(prompt),
+        "tokens": estimate_tokens(prompt),
+        "lines_dropped": dropped,
+        "truncated": dropped > 0,
+    }
+
+
+class PromptMetrics:
+    """Prompt sizes of advice generations and their latency, by prompt size."""
+
+    SIZE_BUCKETS = (250, 500, 1000, 2000, math.inf)   # upper bounds, estimated tokens
+
+    def __init__(self):
+        self.prompts = 0
+        self.truncated = 0
+        self.tokens_total = 0
+        self.tokens_max = 0
+        self.last_tokens = 0
+        self.buckets = {bound: [0, 0.0] for bound in self.SIZE_BUCKETS}   # bound -> [count, seconds]
+
+    def record(self, stats: dict, latency: float):
+        tokens = stats["tokens"]
+        self.prompts += 1
+        self.truncated += stats["truncated"]
+        self.tokens_total += tokens
+        self.tokens_max = max(self.tokens_max, tokens)
+        self.last_tokens = tokens
+        bucket = self.buckets[next(b for b in self.SIZE_BUCKETS if tokens <= b)]
+        bucket[0] += 1
+        bucket[1] += latency
+
+    def stats(self) -> dict:
+        return {
+            "prompts": self.prompts,
+            "truncated": self.truncated,
+            "avg_tokens": round(self.tokens_total / self.prompts, 1) if self.prompts else 0,
+            "max_tokens": self.tokens_max,
+            "last_tokens": self.last_tokens,
+            "latency_by_tokens": {
+                f"<={bound}" if bound != math.inf else "more": {
+                    "count": count,
+                    "avg_ms": round(seconds / count * 1000, 1),
+                }
+                for bound, (count, seconds) in self.buckets.items() if count
+            },
+        }
@@ -0,0 +1,116 @@
+# File: app/services/rules.py
+
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+# ——— Deterministic advice ———
+# Rules over the exercise_rollup / form_rollup summaries (see prompt.py).
+# Each answers only when the data points one way; anything mixed (several
+# form issues, a moderate issue, regressing or too little history) returns
+# None and goes to the LLM.
+
+CLEAN_SHARE = 0.1       # a check with at most this share of affected sets is clean
+DOMINANT_SHARE = 0.5    # an issue in at least this share of sets is the clear priority
+MIN_SESSIONS = 3        # sessions of an exercise before judging its progression
+WEIGHT_STEP = 5         # lbs
+
+FORM_CUES = {
+    "elbow_flare": "keep your elbows pinned to your sides",
+    "torso_lean": "brace your core and stop swinging your torso",
+    "rom_percentage": "lower the weight all the way to full extension on every rep",
+    "shoulder_elevation": "keep your shoulders down and back instead of shrugging",
+}
+
+
+def _progression(summary: dict) -> Optional[str]:
+    """'progressing', 'stalled' or 'regressing' from the top set of each session."""
+    top = summary["top"]
+    if len(top) < MIN_SESSIONS:
+        return None
+    recent = top[-MIN_SESSIONS:]
+    if recent[-1] > recent[0]:
+        return "progressing"
+    if recent[-1] < recent[0]:
+        return "regressing"
+    return "stalled"
+
+
+def _rep_ceiling(summary: dict) -> int:
+    return max(summary["reps"])
+
+
+def rule_advice(workouts: dict, form: dict) -> Tuple[Optional[str], str]:
+    """
+    (advice, rule) when a rule is confident, else (None, reason) for the LLM.
+    `rule` names the rule that answered, for the hit-rate stats.
+    """
+    exercises = workouts["exercises"]
+    checked = [c for c in form["checks"] if c["checked"]]
+    if not exercises and not checked:
+        return ("Log a few workouts and record a set with the posture tracker so your advice "
+                "can be based on your own training.", "no_history")
+
+    issues = [c for c in checked if c["share"] > CLEAN_SHARE]
+    if len(issues) > 1:
+        return None, "several_form_issues"
+    if issues:
+        issue = issues[0]
+        if issue["share"] < DOMINANT_SHARE or issue["trend"] == "improving":
+            return None, "moderate_form_issue"
+        return (f"Fix your {issue['issue']} first ({issue['hits']} of {issue['checked']} sets): "
+                f"{FORM_CUES[issue['metric']]}, and drop the weight about 10% until it is gone.",
+                "dominant_form_issue")
+
+    if not exercises:
+        return ("Your form is clean across your recent sets; log your workouts so your "
+                "progression can be tracked too.", "clean_form_no_workouts")
+
+    # Exercises without enough history are left out of the judgement
+    trends = {s["name"]: _progression(s) for s in exercises}
+    judged = [s for s in exercises if trends[s["name"]] is not None]
+    if not judged or "regressing" in trends.values():
+        return None, "unclear_progression"
+    form_note = "Your form is clean" if checked else "No form issues recorded"
+    stalled = [s for s in judged if trends[s["name"]] == "stalled"]
+    if stalled:
+        main = stalled[0]
+        return (f"{form_note}, but {main['name']} has stalled at {main['top'][-1]:g} lbs: add a rep "
+                f"each session until you reach {_rep_ceiling(main)}, then add {WEIGHT_STEP} lbs.",
+                "stalled")
+    main = judged[0]
+    return (f"{form_note} and {main['name']} is moving up ({main['top'][-MIN_SESSIONS]:g} -> "
+            f"{main['top'][-1]:g} lbs): keep adding {WEIGHT_STEP} lbs whenever you hit "
+            f"{_rep_ceiling(main)} reps on every set.", "progressing")
+
+
+class RuleStats:
+    """How often the rules answer instead of the LLM, and why they don't."""
+
+    def __init__(self):
+        self.hits = Counter()        # rule -> answers
+        self.misses = Counter()      # reason -> escalations
+        self.seconds = 0.0
+
+    def record(self, advice: Optional[str], rule: str, seconds: float):
+        (self.hits if advice is not None else self.misses)[rule] += 1
+        self.seconds += seconds
+
+    def stats(self) -> dict:
+        hits = sum(self.hits.values())
+        total = hits + sum(self.misses.values())
+        return {
+            "requests": total,
+            "fast_path": hits,
+            "hit_rate": round(hits / total, 3) if total else 0,
+            "avg_rule_us": round(self.seconds / total * 1e6, 1) if total else 0,
+            "rules": dict(self.hits),
+            "escalations": dict(self.misses),
+        }
+
+
+def timed_rule_advice(workouts: dict, form: dict, stats: RuleStats) -> Optional[str]:
+    start = time.perf_counter()
+    advice, rule = rule_advice(workouts, form)
+    stats.record(advice, rule, time.perf_counter() - start)
+    return advice
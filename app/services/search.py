@@ -0,0 +1,89 @@
+# File: app/services/search.py
+
+import base64
+import html
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+
+SNIPPET_CHARS = 160
+MARK_OPEN, MARK_CLOSE = "<mark>", "</mark>"
+
+# ——— Keyset cursors ———
+# A cursor is the sort key of the last hit on a page: (score or created_at, _id).
+# The next page asks for keys strictly after it, so paging costs the same at
+# page 1 and page 1000, and inserts between requests never shift results.
+
+def encode_cursor(sort_value, doc_id: ObjectId) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = {"t": sort_value.isoformat()}
+    raw = orjson.dumps([sort_value, str(doc_id)])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[object, ObjectId]:
+    """Inverse of encode_cursor; ValueError for anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, doc_id = orjson.loads(raw)
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value["t"])
+        elif not isinstance(sort_value, (int, float)):
+            raise ValueError("bad sort key")
+        return sort_value, ObjectId(doc_id)
+    except (ValueError, TypeError, KeyError, InvalidId, orjson.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from None
+
+# ——— Snippets ———
+
+def query_terms(q: str) -> List[str]:
+    """
+    Words and quoted phrases that should be highlighted, following $text
+    syntax: "-word" excludes a word, so it is never highlighted.
+    """
+    phrases = re.findall(r'"([^"]+)"', q)
+    words = [w for w in re.sub(r'"[^"]*"', " ", q).split() if not w.startswith("-")]
+    terms = [p.strip() for p in phrases if p.strip()] + [w.strip(".,;:!?'") for w in words]
+    return [t for t in terms if t]
+
+def _term_pattern(terms: List[str]) -> Optional[re.Pattern]:
+    if not terms:
+        return None
+    # $text matches stemmed words ("hurt" finds "hurts"), so match word
+    # prefixes rather than exact words; longest first so phrases win
+    alternatives = sorted((re.escape(t) for t in terms), key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")\w*", re.IGNORECASE)
+
+def snippet(content: str, terms: List[str], width: int = SNIPPET_CHARS) -> str:
+    """
+    A window of about `width` characters around the first match, HTML
+    escaped, with every match wrapped in <mark> tags.
+    """
+    pattern = _term_pattern(terms)
+    first = pattern.search(content) if pattern else None
+    start = 0
+    if first and len(content) > width:
+        start = max(0, min(first.start() - width // 3, len(content) - width))
+        # Don't cut a word in half at the start of the window
+        if start:
+            space = content.find(" ", start)
+            start = space + 1 if 0 <= space < first.start() else start
+    window = content[start:start + width]
+    end = start + len(window)
+
+    out, last = [], 0
+    if pattern:
+        for match in pattern.finditer(window):
+            out.append(html.escape(window[last:match.start()]))
+            out.append(MARK_OPEN + html.escape(match.group(0)) + MARK_CLOSE)
+            last = match.end()
+    out.append(html.escape(window[last:]))
+    text = "".join(out)
+    if start > 0:
+        text = "…" + text
+    if end < len(content):
+        text += "…"
+    return text
@@ -0,0 +1,113 @@
+# File: app/services/throttle.py
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 if one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self):
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class RateLimiter:
+    """
+    A token bucket per key (e.g. user) plus one global bucket. A request
+    passes only if both have a token, and only then are both charged, so a
+    request refused by one bucket never drains the other.
+    """
+
+    MAX_KEYS = 10_000   # idle (full) per-key buckets are dropped beyond this
+
+    def __init__(self, key_rate: float, key_burst: float, global_rate: float, global_burst: float):
+        self.key_rate = key_rate
+        self.key_burst = key_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.buckets: Dict[Hashable, TokenBucket] = {}
+        self.allowed = 0
+        self.limited = 0
+
+    def acquire(self, key: Hashable) -> float:
+        """Charge one request for key. Returns 0 if allowed, else seconds to wait."""
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.MAX_KEYS:
+                self._prune(now)
+            bucket = self.buckets[key] = TokenBucket(self.key_rate, self.key_burst)
+
+        wait = max(bucket.wait_time(now), self.global_bucket.wait_time(now))
+        if wait > 0:
+            self.limited += 1
+            return wait
+        bucket.take()
+        self.global_bucket.take()
+        self.allowed += 1
+        return 0.0
+
+    def _prune(self, now: float):
+        for key in [k for k, b in self.buckets.items() if b.full(now)]:
+            del self.buckets[key]
+
+    def stats(self) -> dict:
+        return {"allowed": self.allowed, "limited": self.limited, "tracked_keys": len(self.buckets)}
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts
+    the work, everyone who arrives while it is running awaits the same
+    result (or exception). A caller that goes away does not cancel the
+    work for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._done(key, f))
+            self.started += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future):
+        self._calls.pop(key, None)
+        # Mark the exception retrieved even if every waiter went away
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> dict:
+        return {"started": self.started, "shared": self.shared, "in_flight": len(self._calls)}
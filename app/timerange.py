@@ -0,0 +1,27 @@
+# File: app/timerange.py
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Query parameters with an offset (e.g. "...Z") parse as aware datetimes;
+    the rest of the API works in naive UTC (datetime.utcnow()), as Motor
+    returns it. Aware values are converted so the two can be compared.
+    """
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def resolve_range(start: Optional[datetime], end: Optional[datetime],
+                  default: timedelta) -> Tuple[datetime, datetime]:
+    """(start, end) in naive UTC; end defaults to now, start to `default` before end."""
+    end = naive_utc(end) or datetime.utcnow()
+    start = naive_utc(start) or end - default
+    if start >= end:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+    return start, end
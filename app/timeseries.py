@@ -0,0 +1,173 @@
+# File: app/timeseries.py
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from pymongo.errors import CollectionInvalid, OperationFailure
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ——— Per-rep time series ———
+# One small document per rep in a MongoDB time-series collection. The server
+# groups reps sharing the same meta (user, exercise, arm) into compressed
+# buckets, so months of reps stay compact and a range query for one user
+# only opens that user's buckets.
+
+TIME_FIELD = "ts"
+META_FIELD = "meta"
+# Reps arrive seconds apart within a session and hours or days apart
+# between sessions; "minutes" gives one bucket per series per day
+GRANULARITY = "minutes"
+
+REP_METRICS = ("elbow_flare", "torso_lean", "shoulder_elevation", "rom_percentage")
+
+WRITE_QUEUE = 64   # finished sets waiting for the background writer
+RETENTION_INDEX = "ts_ttl"   # TTL index standing in for expireAfterSeconds on plain collections
+
+_ready = False
+_ready_lock = threading.Lock()
+
+def rep_documents(session_data: dict, set_data: dict) -> List[dict]:
+    """Flatten one finished set of an ExerciseSession into rep documents."""
+    user_id = session_data.get("userContext", {}).get("user_id")
+    exercise = set_data.get("exercise") or session_data.get("exercise")
+    docs = []
+    for rep in set_data.get("repsData", []):
+        metrics = rep.get("metrics", {})
+        timing = rep.get("timing", {})
+        meta = {"user_id": user_id, "exercise": exercise}
+        if rep.get("side"):
+            meta["side"] = rep["side"]
+        doc = {
+            TIME_FIELD: datetime.fromtimestamp(rep["timestamp"], timezone.utc),
+            META_FIELD: meta,
+            # Per-rep values stay out of meta so they don't split buckets
+            "session_id": session_data.get("sessionId"),
+            "set_number": set_data.get("setNumber"),
+            "rep_number": rep.get("repNumber"),
+            "weight": set_data.get("weight"),
+            "duration": timing.get("duration"),
+        }
+        for name in REP_METRICS:
+            if name in metrics:
+                doc[name] = metrics[name]
+        docs.append(doc)
+    return docs
+
+def period_start(date: str, unit: str) -> dict:
+    """
+    Start of the day/week/month containing `date` (UTC; weeks start on
+    Monday). Built from date parts rather than $dateTrunc, which needs
+    MongoDB 5.0; the rep trends and workout analytics only need 4.2.
+    """
+    if unit == "week":
+        return {"$dateFromParts": {"isoWeekYear": {"$isoWeekYear": date},
+                                   "isoWeek": {"$isoWeek": date}, "isoDayOfWeek": 1}}
+    return {"$dateFromParts": {"year": {"$year": date}, "month": {"$month": date},
+                               "day": {"$dayOfMonth": date} if unit == "day" else 1}}
+
+def _is_timeseries(db, name: str) -> bool:
+    info = next(iter(db.list_collections(filter={"name": name})), None)
+    return bool(info and "timeseries" in info.get("options", {}))
+
+def ensure_rep_collection(db):
+    """
+    Create the rep collection as a time-series collection (MongoDB 5.0+) on
+    first use, plus the (user, time) index the range queries use. Servers
+    without time-series support get a plain collection with the same index,
+    and rep_retention_days is enforced there by a TTL index on the time field.
+    """
+    global _ready
+    with _ready_lock:
+        if _ready:
+            return
+        name = settings.rep_collection
+        options = {"timeseries": {"timeField": TIME_FIELD, "metaField": META_FIELD,
+                                  "granularity": GRANULARITY}}
+        if settings.rep_retention_days:
+            options["expireAfterSeconds"] = settings.rep_retention_days * 86400
+        try:
+            db.create_collection(name, **options)
+            timeseries = True
+        except CollectionInvalid:
+            timeseries = _is_timeseries(db, name)   # already exists
+        except OperationFailure as e:
+            logger.warning(f"Time-series collections unavailable ({e}); storing reps in a plain collection")
+            timeseries = False
+        db[name].create_index([(f"{META_FIELD}.user_id", 1), (TIME_FIELD, 1)])
+        if not timeseries and settings.rep_retention_days:
+            try:
+                db[name].create_index(TIME_FIELD, name=RETENTION_INDEX,
+                                      expireAfterSeconds=settings.rep_retention_days * 86400)
+            except OperationFailure as e:
+                # e.g. the index exists with another retention; collMod changes it
+                logger.warning(f"Could not create the rep retention index: {e}")
+        _ready = True
+
+class RepWriter:
+    """
+    Writes finished sets' rep documents from one background thread, so the
+    capture loop that ends a set never waits on MongoDB (server selection
+    alone can take mongo_server_selection_timeout_ms). Sets arriving while
+    the queue is full are dropped and counted.
+    """
+
+    def __init__(self, get_db, maxsize: int = WRITE_QUEUE):
+        self._get_db = get_db
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._flush_registered = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, docs: List[dict]) -> bool:
+        """Queue one set's rep documents; False if they were dropped."""
+        if not docs:
+            return True
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="rep-writer", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(docs)
+        except queue.Full:
+            self.dropped += len(docs)
+            logger.warning(f"Rep writer queue full, dropped {len(docs)} reps")
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            docs = self._queue.get()
+            try:
+                db = self._get_db()
+                if not self._flush_registered:
+                    # Registered after the client's own atexit close, so it runs before it
+                    atexit.register(self.flush)
+                    self._flush_registered = True
+                ensure_rep_collection(db)
+                db[settings.rep_collection].insert_many(docs, ordered=False)
+                self.written += len(docs)
+            except Exception as e:
+                self.failed += len(docs)
+                logger.error(f"Error writing {len(docs)} reps: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0):
+        """Wait (up to timeout) for queued sets to be written, e.g. at exit."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "written": self.written,
+                "dropped": self.dropped, "failed": self.failed}
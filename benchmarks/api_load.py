@@ -0,0 +1,304 @@
+# File: benchmarks/api_load.py
+"""
+Load test for the FastAPI app in app/main.py.
+
+Starts the API under uvicorn in a separate process, backed by an in-memory
+Motor stand-in (or a real mongod with --mongo-uri) and a fake Gemini
+client with configurable latency. It then drives mixed traffic at
+increasing concurrency and reports throughput and p50/p95/p99 latency per
+route. Rate-limited answers (429) are reported apart from errors:
+
+    python benchmarks/api_load.py
+    python benchmarks/api_load.py --levels 1,16,64 --duration 20 --llm-latency 1.5
+    python benchmarks/api_load.py --mongo-uri mongodb://localhost:27017
+
+Results go to benchmarks/results/api_load.json (overwritten on purpose) so
+a capacity change shows up as a diff in review.
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing as mp
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+RESULTS_PATH = ROOT / 'benchmarks' / 'results' / 'api_load.json'
+
+# ——— Traffic model ———
+# route label -> relative weight
+TRAFFIC_MIX = {
+    'GET /entries/': 35,
+    'GET /sessions/': 25,
+    'POST /sessions/': 20,
+    'GET /advice/{user_id}': 10,
+    'POST /entries/': 10,
+}
+USERS = [f"user_{i:03d}" for i in range(20)]
+EXERCISES = ["Bicep Curl", "Bench Press", "Squat", "Shoulder Press", "Deadlift"]
+SEED_ENTRIES = 200
+SEED_SESSIONS = 200
+WARMUP_SECONDS = 1.0
+# /advice token buckets for the served app, so the run measures capacity
+# rather than the production limits (which admit ~2 requests/s overall).
+# Already-set environment variables win, to load-test the limits themselves.
+ADVICE_LIMITS = {
+    'ADVICE_USER_PER_MINUTE': '6000',
+    'ADVICE_USER_BURST': '1000',
+    'ADVICE_GLOBAL_PER_MINUTE': '60000',
+    'ADVICE_GLOBAL_BURST': '1000',
+}
+
+
+def random_session(rng, user_id):
+    return {
+        "user_id": user_id,
+        "workouts": [
+            {
+                "name": rng.choice(EXERCISES),
+                "sets": [{"reps": rng.randint(5, 12), "weight": float(rng.randrange(20, 225, 5))}
+                         for _ in range(rng.randint(2, 5))],
+            }
+            for _ in range(rng.randint(1, 3))
+        ],
+        "notes": "load test",
+    }
+
+
+def random_entry(rng, user_id):
+    return {"content": f"Felt {rng.choice(['strong', 'tired', 'sore', 'great'])} today", "user_id": user_id}
+
+
+def build_request(route, rng):
+    user_id = rng.choice(USERS)
+    if route == 'GET /entries/':
+        return 'GET', '/entries/', {'params': {'limit': 100}}
+    if route == 'GET /sessions/':
+        return 'GET', '/sessions/', {'params': {'limit': 50}}
+    if route == 'POST /sessions/':
+        return 'POST', '/sessions/', {'json': random_session(rng, user_id)}
+    if route == 'GET /advice/{user_id}':
+        return 'GET', f'/advice/{user_id}', {'params': {'limit': 5}}
+    if route == 'POST /entries/':
+        return 'POST', '/entries/', {'json': random_entry(rng, user_id)}
+    raise ValueError(f"Unknown route: {route}")
+
+
+# ——— Server side (runs in a child process) ———
+
+class FakeChat:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def send_message(self, prompt):
+        # The real client call is synchronous, so this blocks the event
+        # loop exactly as long as a real Gemini round trip would.
+        time.sleep(self.latency)
+        return SimpleNamespace(text="Add 5 lbs next session and keep your elbows pinned.")
+
+
+class FakeGenAIClient:
+    def __init__(self, latency):
+        self.chats = SimpleNamespace(create=lambda model=None, **kwargs: FakeChat(latency))
+
+
+async def seed(db):
+    rng = random.Random(0)
+    await db.entries.insert_many([random_entry(rng, rng.choice(USERS)) for _ in range(SEED_ENTRIES)])
+    await db.sessions.insert_many([random_session(rng, rng.choice(USERS)) for _ in range(SEED_SESSIONS)])
+
+
+def serve(port, mongo_uri, db_latency, llm_latency):
+    """Child process: patch the app's dependencies, seed data and run uvicorn."""
+    os.environ.setdefault('GEMINI_API_KEY', 'load-test')
+    os.environ['DB_NAME'] = 'fitform_loadtest'
+    os.environ['MONGODB_URI'] = mongo_uri or 'mongodb://localhost:27017'
+    # Seeded by the API's own models, so served as deployments that opt in would
+    os.environ.setdefault('TRUST_DB_OUTPUT', 'true')
+    for name, value in ADVICE_LIMITS.items():
+        os.environ.setdefault(name, value)
+
+    import uvicorn
+    import app.crud
+    import app.database
+    import app.main
+    import app.services.advice
+
+    if mongo_uri:
+        db = app.database.db
+    else:
+        from fake_motor import FakeDatabase
+        db = FakeDatabase('fitform_loadtest', latency=db_latency)
+        for module in (app.database, app.crud, app.main, app.services.advice):
+            if hasattr(module, 'db'):
+                module.db = db
+    app.services.advice.client = FakeGenAIClient(llm_latency)
+
+    async def main():
+        if mongo_uri:
+            for name in ('entries', 'sessions'):
+                await db[name].delete_many({})
+        await seed(db)
+        # Failed requests are counted by the client; keep tracebacks out of the report
+        config = uvicorn.Config(app.main.app, host='127.0.0.1', port=port, log_level='critical')
+        await uvicorn.Server(config).serve()
+
+    asyncio.run(main())
+
+
+# ——— Client side ———
+
+async def wait_ready(base_url, timeout=30.0):
+    deadline = time.time() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.time() < deadline:
+            try:
+                if (await client.get('/health')).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit("API did not come up")
+
+
+async def run_level(base_url, concurrency, duration, mix, seed_value):
+    routes = list(mix)
+    weights = [mix[r] for r in routes]
+    samples = {route: [] for route in routes}
+    errors = {route: collections.Counter() for route in routes}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        start = time.perf_counter()
+        measure_from = start + WARMUP_SECONDS
+        deadline = measure_from + duration
+
+        async def user(index):
+            rng = random.Random(seed_value * 1000 + index)
+            while True:
+                route = rng.choices(routes, weights)[0]
+                method, url, kwargs = build_request(route, rng)
+                sent = time.perf_counter()
+                if sent >= deadline:
+                    return
+                try:
+                    response = await client.request(method, url, **kwargs)
+                    error = str(response.status_code) if response.status_code >= 400 else None
+                except httpx.HTTPError as e:
+                    error = type(e).__name__
+                done = time.perf_counter()
+                if sent >= measure_from and done <= deadline:
+                    samples[route].append(done - sent)
+                    if error:
+                        errors[route][error] += 1
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+
+    report = {}
+    for route in routes:
+        latencies = np.array(samples[route]) * 1000
+        report[route] = summarize(latencies, errors[route], duration)
+    everything = np.concatenate([np.array(samples[r]) for r in routes]) * 1000
+    report['ALL'] = summarize(everything, sum(errors.values(), collections.Counter()), duration)
+    return report
+
+
+def summarize(latencies_ms, errors, duration):
+    """errors: Counter of HTTP status codes / transport exception names; 429s count as rejected"""
+    rejected = errors.get('429', 0)
+    failed = {kind: count for kind, count in errors.items() if kind != '429'}
+    if len(latencies_ms) == 0:
+        return {'requests': 0, 'errors': 0, 'error_kinds': {}, 'rejected': 0, 'rps': 0.0,
+                'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        'requests': int(len(latencies_ms)),
+        'errors': int(sum(failed.values())),
+        'error_kinds': failed,
+        'rejected': int(rejected),
+        'rps': round(len(latencies_ms) / duration, 1),
+        'p50_ms': round(float(p50), 1),
+        'p95_ms': round(float(p95), 1),
+        'p99_ms': round(float(p99), 1),
+    }
+
+
+def print_level(concurrency, report):
+    print(f"\nconcurrency {concurrency}")
+    print(f"  {'route':<24} {'req':>6} {'err':>5} {'429':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in report.items():
+        print(f"  {route:<24} {r['requests']:>6} {r['errors']:>5} {r['rejected']:>5} {r['rps']:>8} "
+              f"{r['p50_ms']!s:>8} {r['p95_ms']!s:>8} {r['p99_ms']!s:>8}")
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--levels', default='1,8,32,64', help="Comma-separated concurrency levels")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measured seconds per level")
+    parser.add_argument('--llm-latency', type=float, default=0.8, help="Seconds per fake Gemini call")
+    parser.add_argument('--db-latency', type=float, default=0.0005,
+                        help="Simulated seconds per in-memory database call")
+    parser.add_argument('--mongo-uri', help="Use this mongod instead of the in-memory stand-in")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', default=str(RESULTS_PATH))
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(',')]
+    ctx = mp.get_context('spawn')
+    server = ctx.Process(target=serve, args=(args.port, args.mongo_uri, args.db_latency, args.llm_latency),
+                         daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    results = []
+    try:
+        asyncio.run(wait_ready(base_url))
+        for i, concurrency in enumerate(levels):
+            report = asyncio.run(run_level(base_url, concurrency, args.duration, TRAFFIC_MIX, i))
+            print_level(concurrency, report)
+            results.append({'concurrency': concurrency, 'routes': report})
+    finally:
+        server.terminate()
+        server.join(5.0)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'backend': 'mongod' if args.mongo_uri else 'in-memory',
+            'cpu_count': os.cpu_count(),
+            'duration_s': args.duration,
+            'llm_latency_s': args.llm_latency,
+            'db_latency_s': None if args.mongo_uri else args.db_latency,
+            'mix': TRAFFIC_MIX,
+            'advice_limits': {name.lower(): os.environ.get(name, value) for name, value in ADVICE_LIMITS.items()},
+            'levels': results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+# File: benchmarks/fake_motor.py
+"""
+In-memory stand-in for the parts of Motor the API uses, so load tests can
+run without a mongod. Documents are copied in and out like a real driver
+would, and every call can add a simulated round-trip latency.
+"""
+
+import asyncio
+import copy
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+_OPERATORS = {
+    '$gt': lambda a, b: a is not None and a > b,
+    '$gte': lambda a, b: a is not None and a >= b,
+    '$lt': lambda a, b: a is not None and a < b,
+    '$lte': lambda a, b: a is not None and a <= b,
+    '$ne': lambda a, b: a != b,
+    '$in': lambda a, b: a in b,
+    '$exists': lambda a, b: (a is not None) == b,
+}
+
+
+def _get(doc, path):
+    for key in path.split('.'):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(key)
+    return doc
+
+
+def matches(doc, query):
+    """Equality, dotted paths, the comparison operators above and $and/$or."""
+    for key, cond in (query or {}).items():
+        if key == '$and':
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key == '$or':
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict) and cond and all(k.startswith('$') for k in cond):
+            value = _get(doc, key)
+            if not all(_OPERATORS[op](value, arg) for op, arg in cond.items()):
+                return False
+        elif _get(doc, key) != cond:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v}
+    if include:
+        out = {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+        if projection.get('_id', 1) and '_id' in doc:
+            out['_id'] = doc['_id']
+        return out
+    return {k: copy.deepcopy(v) for k, v in doc.items() if k not in projection}
+
+
+class FakeCursor:
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+        self._docs = None
+
+    def sort(self, key, direction=1):
+        self._sort = key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    async def _load(self):
+        await self._collection._round_trip()
+        docs = [d for d in self._collection._docs.values() if matches(d, self._query)]
+        for key, direction in reversed(self._sort):
+            present = [d for d in docs if _get(d, key) is not None]
+            missing = [d for d in docs if _get(d, key) is None]
+            present.sort(key=lambda d: _get(d, key), reverse=direction < 0)
+            # MongoDB orders missing values first ascending, last descending
+            docs = missing + present if direction > 0 else present + missing
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        self._docs = iter([_project(d, self._projection) for d in docs])
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._docs is None:
+            await self._load()
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        out = []
+        async for doc in self:
+            out.append(doc)
+            if length and len(out) >= length:
+                break
+        return out
+
+
+class FakeCollection:
+    def __init__(self, name, latency=0.0):
+        self.name = name
+        self.latency = latency
+        self._docs = {}
+
+    async def _round_trip(self):
+        await asyncio.sleep(self.latency)
+
+    async def insert_one(self, doc):
+        await self._round_trip()
+        doc.setdefault('_id', ObjectId())
+        self._docs[doc['_id']] = copy.deepcopy(doc)
+        return SimpleNamespace(inserted_id=doc['_id'], acknowledged=True)
+
+    async def insert_many(self, docs, ordered=True):
+        await self._round_trip()
+        ids = []
+        for doc in docs:
+            doc.setdefault('_id', ObjectId())
+            self._docs[doc['_id']] = copy.deepcopy(doc)
+            ids.append(doc['_id'])
+        return SimpleNamespace(inserted_ids=ids, acknowledged=True)
+
+    async def find_one(self, query=None, projection=None):
+        await self._round_trip()
+        for doc in self._docs.values():
+            if matches(doc, query):
+                return _project(doc, projection)
+        return None
+
+    def find(self, query=None, projection=None):
+        return FakeCursor(self, query, projection)
+
+    async def count_documents(self, query):
+        await self._round_trip()
+        return sum(1 for d in self._docs.values() if matches(d, query))
+
+    async def update_one(self, query, update, upsert=False):
+        await self._round_trip()
+        doc = next((d for d in self._docs.values() if matches(d, query)), None)
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+            # New document from the query's equality fields, then the update
+            doc = {k: copy.deepcopy(v) for k, v in query.items() if not k.startswith('$')
+                   and not (isinstance(v, dict) and any(op.startswith('$') for op in v))}
+            doc.setdefault('_id', ObjectId())
+            self._docs[doc['_id']] = doc
+            before = None
+        else:
+            before = copy.deepcopy(doc)
+        for key, value in update.get('$set', {}).items():
+            doc[key] = copy.deepcopy(value)
+        for key, value in update.get('$inc', {}).items():
+            doc[key] = doc.get(key, 0) + value
+        if before is None:
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc['_id'])
+        return SimpleNamespace(matched_count=1, modified_count=int(doc != before), upserted_id=None)
+
+    async def delete_one(self, query):
+        await self._round_trip()
+        for key, doc in self._docs.items():
+            if matches(doc, query):
+                del self._docs[key]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def create_indexes(self, indexes):
+        await self._round_trip()
+        return [index.document['name'] for index in indexes]
+
+    async def create_index(self, keys, **kwargs):
+        await self._round_trip()
+        keys = keys if isinstance(keys, list) else [(keys, 1)]
+        return kwargs.get('name') or '_'.join(f"{k}_{d}" for k, d in keys)
+
+
+class FakeDatabase:
+    """Collections are created on first access, as in MongoDB."""
+
+    def __init__(self, name='fitform', latency=0.0):
+        self.name = name
+        self.latency = latency
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name, self.latency)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    # Same lifecycle hooks as app.database.Database
+    def connect(self):
+        return self
+
+    def close(self):
+        pass
+
+    async def command(self, name, *args, **kwargs):
+        return {'ok': 1.0}
+
+    async def list_collection_names(self):
+        return list(self._collections)
+
@@ -0,0 +1,111 @@
+# File: benchmarks/pose_pool.py
+"""
+Aggregate pose-inference throughput of PosePool as workers scale from 1
+to the core count.
+
+    python benchmarks/pose_pool.py --video clips/curls.mp4 --seconds 10
+
+Each run feeds STREAMS_PER_WORKER streams per worker as fast as the rings
+accept frames and counts completed inferences per second. Without --video
+the frames are random noise, which keeps MediaPipe in its (slower)
+detection path on every frame.
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pose_pool import PosePool, FRAME_SHAPE  # noqa: E402
+
+STREAMS_PER_WORKER = 2
+WARMUP_SECONDS = 3.0
+
+
+def load_frames(video, count=120):
+    height, width = FRAME_SHAPE[:2]
+    if not video:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, FRAME_SHAPE, dtype=np.uint8) for _ in range(8)]
+    capture = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        success, frame = capture.read()
+        if not success:
+            break
+        frame = cv2.resize(frame, (width, height))
+        frames.append(cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB))
+    capture.release()
+    if not frames:
+        raise SystemExit(f"Could not read frames from {video}")
+    return frames
+
+
+def run(workers, frames, seconds):
+    pool = PosePool(workers=workers).start()
+    streams = [f"stream-{i}" for i in range(workers * STREAMS_PER_WORKER)]
+    latencies = []
+    i = 0
+    try:
+        measure_from = time.perf_counter() + WARMUP_SECONDS
+        deadline = measure_from + seconds
+        while time.perf_counter() < deadline:
+            if pool.submit(streams[i % len(streams)], frames[i % len(frames)]) is not None:
+                i += 1
+                continue
+            # This stream's ring is full: wait for a result to free a slot
+            try:
+                result = pool.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if time.perf_counter() >= measure_from:
+                latencies.append(result.latency)
+        stats = pool.stats()
+    finally:
+        pool.stop()
+
+    fps = round(len(latencies) / seconds, 1)
+    latencies = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        'workers': workers,
+        'streams': len(streams),
+        'fps': fps,
+        'latency_p50_ms': round(float(np.percentile(latencies, 50)), 1),
+        'latency_p95_ms': round(float(np.percentile(latencies, 95)), 1),
+        'avg_batch': stats['avg_batch'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', help="Video file to take frames from (default: noise)")
+    parser.add_argument('--seconds', type=float, default=10.0, help="Measured seconds per run")
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--json', metavar='PATH', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video)
+    results = []
+    print(f"{'workers':>7} {'streams':>7} {'fps':>8} {'speedup':>7} {'p50 ms':>8} {'p95 ms':>8} {'batch':>6}")
+    for workers in range(1, args.max_workers + 1):
+        result = run(workers, frames, args.seconds)
+        result['speedup'] = round(result['fps'] / results[0]['fps'], 2) if results and results[0]['fps'] else 1.0
+        results.append(result)
+        print(f"{result['workers']:>7} {result['streams']:>7} {result['fps']:>8} {result['speedup']:>7} "
+              f"{result['latency_p50_ms']:>8} {result['latency_p95_ms']:>8} {result['avg_batch']:>6}")
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'video': args.video, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# File: benchmarks/preprocess.py
+"""
+Per-frame cost of frame preprocessing up to FrameFeed.publish: the old
+allocate-per-step chain (resize, flip, cvtColor), FramePreprocessor's
+reused buffers with a copy taken on publish, and the same buffers handed
+to the feed as leased ring slots.
+
+    python benchmarks/preprocess.py
+    python benchmarks/preprocess.py --camera-size 1280x720 --frames 2000
+
+Reports time per frame and bytes allocated per frame (numpy allocations
+are visible to tracemalloc).
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from preprocess import FramePreprocessor, FRAME_SIZE  # noqa: E402
+from streaming import FrameFeed  # noqa: E402
+
+
+def old_path(feed):
+    def run(frame):
+        frame = cv2.resize(frame, FRAME_SIZE)
+        frame = cv2.flip(frame, 1)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        feed.publish(frame)
+        return rgb
+    return run
+
+
+def copying_path(preprocessor, feed):
+    def run(frame):
+        frame = preprocessor.fit(frame)
+        rgb = preprocessor.model_input(frame)
+        feed.publish(preprocessor.mirrored(frame).copy())
+        return rgb
+    return run
+
+
+def new_path(preprocessor, feed):
+    def run(frame):
+        frame = preprocessor.fit(frame)
+        rgb = preprocessor.model_input(frame)
+        feed.publish(preprocessor.mirrored(frame))
+        return rgb
+    return run
+
+
+def measure(fn, frames, count):
+    for frame in frames[:10]:
+        fn(frame)
+    start = time.perf_counter()
+    for i in range(count):
+        fn(frames[i % len(frames)])
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    allocated = 0
+    for i in range(200):
+        tracemalloc.reset_peak()
+        fn(frames[i % len(frames)])
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return seconds / count * 1e6, allocated / 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--camera-size', default='640x480', help="WIDTHxHEIGHT the camera delivers")
+    parser.add_argument('--frames', type=int, default=1000)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.camera_size.split('x'))
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(8)]
+
+    print(f"camera {width}x{height} -> {FRAME_SIZE[0]}x{FRAME_SIZE[1]}, {args.frames} frames")
+    paths = (
+        ("allocating", old_path(FrameFeed())),
+        ("copy publish", copying_path(FramePreprocessor(), FrameFeed())),
+        ("leased ring", new_path(FramePreprocessor(), FrameFeed())),
+    )
+    for name, fn in paths:
+        us, nbytes = measure(fn, frames, args.frames)
+        print(f"  {name:<13} {us:8.1f} us/frame  {nbytes / 1024:8.1f} KiB allocated/frame")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# File: benchmarks/serialization.py
+"""
+Cost of serving list pages from GET /entries/ and GET /sessions/ with and
+without the trusted fast path (settings.trust_db_output), per 1,000
+documents:
+
+    python benchmarks/serialization.py --docs 1000 --repeat 30
+
+Requests go through the real routers in-process (httpx ASGI transport)
+against the in-memory Motor stand-in, so the numbers are the API's own
+CPU cost: CRUD conversion, validation and JSON encoding.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+from bson import ObjectId
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ.setdefault('DB_NAME', 'fitform_benchmark')
+os.environ.setdefault('MONGODB_URI', 'mongodb://localhost:27017')
+
+from fake_motor import FakeDatabase  # noqa: E402
+import app.crud  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.main import app as api  # noqa: E402
+
+EXERCISES = ["Bicep Curl", "Bench Press", "Squat", "Shoulder Press", "Deadlift"]
+
+
+def make_documents(n):
+    rng = random.Random(0)
+    start = datetime(2025, 1, 1)
+    entries = [{
+        "_id": ObjectId(),
+        "content": "Felt strong today, kept my elbows pinned and added five pounds. " * 3,
+        "user_id": f"user_{rng.randrange(50):03d}",
+        "created_at": start + timedelta(minutes=i),
+    } for i in range(n)]
+    sessions = [{
+        "_id": ObjectId(),
+        "user_id": f"user_{rng.randrange(50):03d}",
+        "workouts": [{
+            "name": rng.choice(EXERCISES),
+            "sets": [{"reps": rng.randint(5, 12), "weight": float(rng.randrange(20, 225, 5))} for _ in range(4)],
+        } for _ in range(3)],
+        "notes": "Good session",
+        "finished_at": start + timedelta(hours=i),
+    } for i in range(n)]
+    return entries, sessions
+
+
+async def time_route(client, path, docs, repeat):
+    # One untimed request warms caches and checks the route works
+    response = await client.get(path, params={'limit': docs})
+    response.raise_for_status()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await client.get(path, params={'limit': docs})
+    return (time.perf_counter() - started) / repeat, response.json()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=1000, help="Documents per page")
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    db = FakeDatabase()
+    entries, sessions = make_documents(args.docs)
+    await db.entries.insert_many(entries)
+    await db.sessions.insert_many(sessions)
+    app.crud.db = db
+
+    per_thousand = 1000 / args.docs
+    transport = httpx.ASGITransport(app=api)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'route':<16} {'validated ms':>13} {'trusted ms':>11} {'speedup':>8}   (per 1,000 documents)")
+        for path in ('/entries/', '/sessions/'):
+            settings.trust_db_output = False
+            slow, slow_body = await time_route(client, path, args.docs, args.repeat)
+            settings.trust_db_output = True
+            fast, fast_body = await time_route(client, path, args.docs, args.repeat)
+            if json.dumps(slow_body, sort_keys=True) != json.dumps(fast_body, sort_keys=True):
+                raise SystemExit(f"{path}: fast path output differs from the validated path")
+            print(f"{path:<16} {slow * 1000 * per_thousand:>13.1f} {fast * 1000 * per_thousand:>11.1f} "
+                  f"{slow / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -5,6 +5,13 @@ import mediapipe as mp
 import numpy as np
 import logging
 from session_tracker import ExerciseSession
+from rep_counter import RepCounter, OneEuroFilter
+from pose_pool import POSE_OPTIONS
+from preprocess import FramePreprocessor, mirror_landmarks
+from landmark_archive import LandmarkRecorder, session_meta
+from set_recorder import SetRecorder
+from exercises import ExerciseBank, landmarks_to_array, joint_angles, X, Y, VIS
+import os
 import time
 from datetime import datetime
 
@@ -23,32 +30,72 @@ SHOULDER_ELEVATION_THRESHOLD = 0.1  # Threshold for shoulder shrugging
 ELBOW_FLARE_THRESHOLD = 15.0       # Degrees of acceptable elbow flare
 TORSO_LEAN_THRESHOLD = 10.0        # Degrees of acceptable torso lean
 
+# Rep detection smoothing (One Euro filter on the elbow angle)
+SMOOTH_ANGLE      = False
+SMOOTH_MIN_CUTOFF = 1.0    # Hz: lower = smoother when the arm is still
+SMOOTH_BETA       = 0.05   # higher = less lag on fast curls
+
 # Global variables for tracking exercise state
-counter = 0
-stage = "down"
-last_rep_time = None
-rep_start_time = None  # Track individual rep timing
+rep_counter = RepCounter(
+    flexion_threshold=FLEXION_ANGLE_THRESHOLD,
+    extension_threshold=EXTENSION_ANGLE_THRESHOLD,
+    tolerance=ANGLE_TOLERANCE,
+    smoothing=OneEuroFilter(SMOOTH_MIN_CUTOFF, SMOOTH_BETA) if SMOOTH_ANGLE else None,
+)
 current_set_start_time = None
 session_active = False
 current_session = None
 
+# Extra exercise analyzers run on the same landmarks (see exercises.py)
+exercise_bank = None
+
+# Per-frame landmark archive of each session (see landmark_archive.py)
+LANDMARK_ARCHIVE_DIR = None
+landmark_recorder = None
+
+# Annotated video of each set (see set_recorder.py)
+set_recorder = None
+
+# Bilateral mode: both arms tracked with independent rep counters
+ARM_SIDES = ("left", "right")
+bilateral_mode = False
+side_counters = {
+    side: RepCounter(
+        flexion_threshold=FLEXION_ANGLE_THRESHOLD,
+        extension_threshold=EXTENSION_ANGLE_THRESHOLD,
+        tolerance=ANGLE_TOLERANCE,
+        smoothing=OneEuroFilter(SMOOTH_MIN_CUTOFF, SMOOTH_BETA) if SMOOTH_ANGLE else None,
+    )
+    for side in ARM_SIDES
+}
+
 # ——— Setup MediaPipe Pose with better initialization ———
 try:
     mp_pose = mp.solutions.pose
     mp_drawing = mp.solutions.drawing_utils
-    pose = mp_pose.Pose(
-        static_image_mode=False,
-        model_complexity=0,  # Reduce to fastest model
-        enable_segmentation=False,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5,
-        smooth_landmarks=True  # Add smoothing
-    )
+    pose = mp_pose.Pose(**POSE_OPTIONS)
     logger.info("MediaPipe Pose initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize MediaPipe Pose: {e}")
     raise
 
+# Inference input size; frames are still processed and drawn at 640x480
+# (landmarks are normalized, so they map back unchanged)
+INPUT_SIZE = (640, 480)
+MODEL_COMPLEXITY = POSE_OPTIONS['model_complexity']
+pose_tuner = None      # pose_tuner.PoseTuner when auto-tuning is on
+# Reused frame buffers for the capture thread that calls process_frame
+preprocessor = FramePreprocessor()
+using_pose_pool = False
+
+# Rows: left, right arm. Columns: shoulder, elbow, wrist, hip
+ARM_LANDMARKS = np.array([
+    [mp_pose.PoseLandmark.LEFT_SHOULDER.value, mp_pose.PoseLandmark.LEFT_ELBOW.value,
+     mp_pose.PoseLandmark.LEFT_WRIST.value, mp_pose.PoseLandmark.LEFT_HIP.value],
+    [mp_pose.PoseLandmark.RIGHT_SHOULDER.value, mp_pose.PoseLandmark.RIGHT_ELBOW.value,
+     mp_pose.PoseLandmark.RIGHT_WRIST.value, mp_pose.PoseLandmark.RIGHT_HIP.value],
+])
+
 # ——— Helper: calculate angle between three points ———
 def calculate_angle(a, b, c):
     # Convert landmarks to numpy arrays if they're NormalizedLandmark objects
@@ -89,32 +136,151 @@ def check_visibility(landmarks):
     
     return missing_parts
 
+def calculate_arm_metrics(lm_arr):
+    """
+    Elbow angle and form metrics for both arms at once from a (33, 4)
+    landmark array. Every value is a length-2 array (left, right) computed
+    with the same formulas as the single-arm helpers above.
+    """
+    shoulder, elbow, wrist, hip = ARM_LANDMARKS.T
+    angle = joint_angles(lm_arr, shoulder, elbow, wrist)
+    torso = lm_arr[shoulder, :2] - lm_arr[hip, :2]
+    return {
+        'angle': angle,
+        'shoulder_elevation': np.abs(torso[:, 1]),
+        'elbow_flare': angle,
+        'torso_lean': np.abs(np.degrees(np.arctan2(torso[:, 0], torso[:, 1]))),
+        'rom_percentage': angle / EXTENSION_ANGLE_THRESHOLD * 100,
+        'visible': np.all(lm_arr[ARM_LANDMARKS, VIS] >= BICEP_VISIBILITY_THRESH, axis=1),
+    }
+
+def build_rep_data(rep_number, form_metrics, current_time, rep_duration, time_since_last, side=None):
+    """Rep record in the format session_tracker expects."""
+    rep_data = {
+        "repNumber": rep_number,
+        "timestamp": current_time,
+        "metrics": {
+            "elbow_flare": form_metrics['elbow_flare'],
+            "torso_lean": form_metrics['torso_lean'],
+            "shoulder_elevation": form_metrics['shoulder_elevation'],
+            "rom_percentage": form_metrics['rom_percentage'],
+        },
+        "timing": {
+            "duration": rep_duration,
+            "time_since_last_rep": time_since_last,
+            "time_in_set": current_time - current_set_start_time if current_set_start_time else 0
+        }
+    }
+    if side is not None:
+        rep_data["side"] = side
+    return rep_data
+
+def set_exercises(keys):
+    """
+    Run the given exercise analyzers (keys of exercises.EXERCISES) on every
+    processed frame, reusing the curl pose inference. Pass None to disable.
+    """
+    global exercise_bank
+    exercise_bank = ExerciseBank(keys) if keys else None
+    logger.info(f"Exercise analyzers: {list(keys) if keys else 'disabled'}")
+
+def finish_exercise_set():
+    """The analyzers' summary of the set just ended (None without them); resets them for the next set."""
+    if exercise_bank is None:
+        return None
+    summary = exercise_bank.summary()
+    exercise_bank.reset()
+    return summary
+
+def set_landmark_archive(directory):
+    """Archive every session's per-frame landmarks under directory (None to stop)."""
+    global LANDMARK_ARCHIVE_DIR
+    LANDMARK_ARCHIVE_DIR = directory
+    logger.info(f"Landmark archive: {directory or 'disabled'}")
+
+def set_recording(directory, fps):
+    """Record an annotated video of every set under directory, at fps processed frames per second."""
+    global set_recorder
+    if set_recorder is not None:
+        set_recorder.close()
+    set_recorder = SetRecorder(directory, fps) if directory else None
+    logger.info(f"Set recordings: {directory or 'disabled'}")
+
+def recording_active():
+    """True while a set is being recorded, so frames must be annotated."""
+    return set_recorder is not None and set_recorder.recording
+
+def record_frame(frame):
+    """Hand a processed frame to the set recorder; never blocks."""
+    if set_recorder is not None:
+        set_recorder.submit(frame)
+
+def use_pose_pool(pool, stream_id='default'):
+    """
+    Run this process's pose inference on a pose_pool.PosePool instead of
+    the inline model, so it happens outside the GIL of the serving process.
+    """
+    global pose, using_pose_pool
+    pose = pool.client(stream_id)
+    using_pose_pool = True
+    logger.info(f"Pose inference moved to pool stream '{stream_id}'")
+
+def configure_pose(model_complexity=None, input_size=None):
+    """Swap the inline model for one with another complexity and/or input size."""
+    global pose, INPUT_SIZE, MODEL_COMPLEXITY
+    if using_pose_pool:
+        # Pool workers own their models and take fixed-size frames
+        logger.warning("configure_pose ignored: inference runs on a pose pool")
+        return
+    if input_size is not None:
+        INPUT_SIZE = tuple(input_size)
+    if model_complexity is not None and model_complexity != MODEL_COMPLEXITY:
+        previous = pose
+        pose = mp_pose.Pose(**dict(POSE_OPTIONS, model_complexity=model_complexity))
+        MODEL_COMPLEXITY = model_complexity
+        previous.close()
+
+def use_pose_tuner(tuner):
+    """Report inference latency to tuner and let it switch profiles at runtime."""
+    global pose_tuner
+    tuner.apply = lambda profile: configure_pose(profile['model_complexity'], profile['input_size'])
+    if tuner.profile is not None:
+        tuner.apply(tuner.profile)
+    pose_tuner = tuner
+
 def end_set():
     """End current set and store final metrics."""
-    global last_rep_time, rep_start_time, counter
     # Store final metrics if needed
     final_metrics = {
-        'total_reps': counter,
+        'total_reps': rep_counter.reps,
         'last_angle': 0  # Default to 0 since latest_data is not defined
     }
-    # Reset timing variables and counter
-    last_rep_time = None
-    rep_start_time = None
-    counter = 0  # Reset counter when set ends
+    if bilateral_mode:
+        final_metrics['reps_by_side'] = {side: c.reps for side, c in side_counters.items()}
+        final_metrics['total_reps'] = sum(final_metrics['reps_by_side'].values())
+    # Reset timing variables and counter, keeping the arm's current stage
+    rep_counter.reset(stage=rep_counter.stage)
+    for c in side_counters.values():
+        c.reset(stage=c.stage)
+    final_metrics['exercises'] = finish_exercise_set()
     logger.info(f"Set ended with {final_metrics['total_reps']} reps, timers and counter reset")
     return final_metrics
 
-def init_session(session):
-    global current_session, session_active, counter, current_set_start_time
+def init_session(session, bilateral=False):
+    global current_session, session_active, current_set_start_time, bilateral_mode, landmark_recorder
     current_session = session
     session_active = True
-    counter = 0
+    bilateral_mode = bilateral
+    landmark_recorder = LandmarkRecorder() if LANDMARK_ARCHIVE_DIR else None
+    rep_counter.reset(stage=rep_counter.stage)
+    for c in side_counters.values():
+        c.reset(stage=c.stage)
     current_set_start_time = time.time()
     logger.info("Session initialized")
 
 def end_current_session(session_data=None):
     """End the current session and save data"""
-    global current_session, session_active, counter, stage
+    global current_session, session_active, landmark_recorder, exercise_bank
     try:
         if current_session:
             if session_data and "feedback" in session_data:
@@ -125,11 +291,18 @@ def end_current_session(session_data=None):
                 if "rir" in feedback:
                     feedback["rir"] = int(feedback["rir"])
                 current_session.update_session_feedback(feedback)
+            current_session.finish_recording()
+            if landmark_recorder is not None:
+                save_landmark_archive(current_session, landmark_recorder)
+                landmark_recorder = None
             current_session.save_session()
             current_session = None
             session_active = False
-            counter = 0
-            stage = "down"
+            rep_counter.reset()
+            for c in side_counters.values():
+                c.reset()
+            # Analyzers are chosen per session (set_exercises in start_session)
+            exercise_bank = None
             logger.info("Session ended successfully")
             return True
         return False
@@ -137,12 +310,34 @@ def end_current_session(session_data=None):
         logger.error(f"Error in end_current_session: {e}")
         return False
 
+def save_landmark_archive(session, recorder):
+    """Write the session's landmark archive and link it from the session data"""
+    try:
+        directory = os.path.join(LANDMARK_ARCHIVE_DIR, session.session_data["sessionId"])
+        session.session_data["landmarkArchive"] = recorder.save(directory, session_meta(session.session_data))
+        logger.info(f"Archived {recorder.count} frames of landmarks to {directory}")
+    except Exception as e:
+        logger.error(f"Error saving landmark archive: {e}")
+
+def compact_landmarks(lm_arr):
+    """
+    Flat [x, y, visibility] * 33 list in normalized coordinates of the
+    (mirrored) output frame, rounded for a small JSON payload. Browsers
+    draw the skeleton from this instead of receiving an annotated image.
+    """
+    return np.round(lm_arr[:, (X, Y, VIS)], 3).ravel().tolist()
+
 # Add this new function to process single frames
-def process_frame(frame):
-    global counter, stage, current_session, last_rep_time, rep_start_time, session_active
+def process_frame(frame, annotate=True):
+    """
+    Runs pose analysis on one camera frame and returns (frame, data).
+    With annotate=False the skeleton and text overlays are not drawn;
+    data['landmarks'] still carries everything a client needs to draw them.
+    """
+    global current_session, session_active
     
-    # Resize frame for faster processing
-    frame = cv2.resize(frame, (640, 480))
+    # Resize frame for faster processing (into a reused buffer; no-op at 640x480)
+    frame = preprocessor.fit(frame)
     
     # Initialize default data structure
     default_metrics = {
@@ -154,7 +349,7 @@ def process_frame(frame):
     }
     
     data = {
-        'reps': counter,
+        'reps': rep_counter.reps,
         'angle': 0,
         'feedback': "Press 'Start Session' to begin" if not session_active else "Initializing...",
         'form_metrics': default_metrics,
@@ -162,9 +357,16 @@ def process_frame(frame):
     }
 
     try:
-        frame = cv2.flip(frame, 1)
-        img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # The model sees the camera image as is; the mirrored view is only
+        # for display, so its landmarks are mirrored instead of the pixels
+        img_rgb = preprocessor.model_input(frame, INPUT_SIZE)
+        inference_start = time.perf_counter()
         results = pose.process(img_rgb)
+        if pose_tuner is not None:
+            pose_tuner.record(time.perf_counter() - inference_start)
+        frame = preprocessor.mirrored(frame)
+        if results and results.pose_landmarks:
+            mirror_landmarks(results.pose_landmarks)
 
         if not results or not results.pose_landmarks:
             data.update({
@@ -172,19 +374,32 @@ def process_frame(frame):
                 'status': 'no_detection',
                 'missing_parts': []
             })
-            cv2.putText(frame, data['feedback'],
-                        (50,50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,255), 2)
+            if annotate:
+                cv2.putText(frame, data['feedback'],
+                            (50,50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,255), 2)
             return frame, data
 
         lm = results.pose_landmarks.landmark
         # Draw all landmarks & connections
-        mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+        if annotate:
+            mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+
+        lm_arr = landmarks_to_array(lm)
+        if landmark_recorder is not None and session_active:
+            # Rest between sets is archived as set 0
+            in_set = current_session is not None and current_session.in_set
+            landmark_recorder.append(lm_arr, time.time(), current_session.current_set if in_set else 0)
+        landmarks = compact_landmarks(lm_arr)
+        data['landmarks'] = landmarks
+        if bilateral_mode:
+            return process_bilateral(frame, lm_arr, data, annotate)
 
         # Check bicep/elbow landmark visibility
         elbow_landmark = lm[mp_pose.PoseLandmark.LEFT_ELBOW.value]
         if elbow_landmark.visibility < BICEP_VISIBILITY_THRESH:
-            cv2.putText(frame, "Please bring your bicep into view",
-                        (50,80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,165,255), 2)
+            if annotate:
+                cv2.putText(frame, "Please bring your bicep into view",
+                            (50,80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,165,255), 2)
             data['feedback'] = "Please bring your bicep into view"
             return frame, data
 
@@ -210,51 +425,26 @@ def process_frame(frame):
             'rom_percentage': round(float(rom_percentage), 2)
         }
 
-        # Curl logic: detect rep up/down transitions
-        # When arm straight (angle > extension threshold) → stage = "down"
-        if angle > EXTENSION_ANGLE_THRESHOLD - ANGLE_TOLERANCE:
-            stage = "down"
-            if rep_start_time is None:
-                rep_start_time = time.time()
-        # When arm flexed (angle < flexion threshold) AND previously down → count a rep
-        if session_active and stage == "down" and angle < FLEXION_ANGLE_THRESHOLD + ANGLE_TOLERANCE:
-            stage   = "up"
-            counter += 1
-            current_time = time.time()
-            
+        # Curl logic: RepCounter tracks the up/down transitions with hysteresis
+        current_time = time.time()
+        last_rep_time = rep_counter.last_rep_ts
+        if session_active and rep_counter.update(angle, current_time):
             # Calculate rep timing
-            rep_duration = current_time - rep_start_time if rep_start_time else 0
+            rep_duration = rep_counter.last_rep_duration
             time_since_last = current_time - last_rep_time if last_rep_time else 0
             
             # Record detailed rep data
             if current_session:
-                # Make sure rep data structure matches what session_tracker expects
-                rep_data = {
-                    "repNumber": counter,
-                    "timestamp": current_time,
-                    "metrics": {
-                        "elbow_flare": form_metrics['elbow_flare'],
-                        "torso_lean": form_metrics['torso_lean'],
-                        "shoulder_elevation": form_metrics['shoulder_elevation'],
-                        "rom_percentage": form_metrics['rom_percentage'],
-                    },
-                    "timing": {
-                        "duration": rep_duration,
-                        "time_since_last_rep": time_since_last,
-                        "time_in_set": current_time - current_set_start_time if current_set_start_time else 0
-                    }
-                }
-                current_session.add_rep_data(rep_data)
-            
-            last_rep_time = current_time
-            rep_start_time = None  # Reset for next rep
+                current_session.add_rep_data(build_rep_data(
+                    rep_counter.reps, form_metrics, current_time, rep_duration, time_since_last))
 
         # End set if specific conditions are met (e.g., long pause)
+        last_rep_time = rep_counter.last_rep_ts
         if last_rep_time and time.time() - last_rep_time > 10:  # Changed from 5 to 10 seconds
             if current_session and len(current_session.rep_data) > 0:
-                current_session.end_set()
+                current_session.end_set(exercises=finish_exercise_set())
                 current_session.start_set()
-                last_rep_time = None
+                rep_counter.last_rep_ts = None
 
         # Real-time form feedback
         if abs(angle - FLEXION_ANGLE_THRESHOLD) <= ANGLE_TOLERANCE:
@@ -285,7 +475,8 @@ def process_frame(frame):
                     'status': 'low_visibility',
                     'missing_parts': missing_parts
                 })
-                cv2.putText(frame, msg, (50,80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,165,255), 2)
+                if annotate:
+                    cv2.putText(frame, msg, (50,80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,165,255), 2)
                 return frame, data
 
             # Calculate metrics with safety checks
@@ -313,26 +504,35 @@ def process_frame(frame):
 
         # Update the data dictionary to include form metrics
         data = {
-            'reps': counter,
+            'reps': rep_counter.reps,
             'angle': int(angle) if 'angle' in locals() else 0,
             'feedback': "; ".join(form_issues) if form_issues else form_msg,
-            'form_metrics': form_metrics
+            'form_metrics': form_metrics,
+            'landmarks': landmarks
         }
+
+        # Additional exercise analyzers share this frame's landmarks
+        if exercise_bank is not None:
+            data['exercises'] = exercise_bank.update(lm_arr, current_time)
+            data['detected_exercise'] = exercise_bank.detected
+        if current_session:
+            data['set_summary'] = current_session.live_set_summary()
         
-        # Visualize form issues on frame
-        y_offset = 160
-        for issue in form_issues:
-            cv2.putText(frame, issue, (30, y_offset), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 1)
-            y_offset += 30
-
-        # Overlay rep count and form feedback
-        cv2.putText(frame, f"Reps: {counter}",
-                    (30,40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255,255,255), 2)
-        cv2.putText(frame, f"Angle: {int(angle)} deg",
-                    (30,80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,255), 2)
-        cv2.putText(frame, form_msg,
-                    (30,120), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+        if annotate:
+            # Visualize form issues on frame
+            y_offset = 160
+            for issue in form_issues:
+                cv2.putText(frame, issue, (30, y_offset), 
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 1)
+                y_offset += 30
+
+            # Overlay rep count and form feedback
+            cv2.putText(frame, f"Reps: {rep_counter.reps}",
+                        (30,40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255,255,255), 2)
+            cv2.putText(frame, f"Angle: {int(angle)} deg",
+                        (30,80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,255), 2)
+            cv2.putText(frame, form_msg,
+                        (30,120), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
 
         # Instead of just returning frame, return a tuple with frame and data
         return frame, data
@@ -342,12 +542,88 @@ def process_frame(frame):
         data.update({
             'feedback': "Processing error - please try again",
             'status': 'critical_error',
-            'reps': counter,
+            'reps': rep_counter.reps,
             'angle': 0,
             'form_metrics': {}
         })
         return frame, data
 
+def process_bilateral(frame, lm_arr, data, annotate=True):
+    """
+    Both-arm variant of process_frame's analysis. Metrics for the two arms
+    come from one vectorized pass over the landmark array; each visible arm
+    drives its own RepCounter and its reps are recorded with a "side" tag.
+    """
+    metrics = calculate_arm_metrics(lm_arr)
+    visible = metrics['visible']
+    if not visible.any():
+        msg = "Please bring your arms into view"
+        data.update({'feedback': msg, 'status': 'low_visibility'})
+        if annotate:
+            cv2.putText(frame, msg, (50,80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,165,255), 2)
+        return frame, data
+
+    current_time = time.time()
+    sides = {}
+    for i, side in enumerate(ARM_SIDES):
+        counter = side_counters[side]
+        angle = float(metrics['angle'][i])
+        form_metrics = {
+            'shoulder_elevation': round(float(metrics['shoulder_elevation'][i]), 2),
+            'elbow_flare': round(float(metrics['elbow_flare'][i]), 2),
+            'torso_lean': round(float(metrics['torso_lean'][i]), 2),
+            'rom_angle': round(angle, 2),
+            'rom_percentage': round(float(metrics['rom_percentage'][i]), 2)
+        }
+        sides[side] = {
+            'reps': counter.reps,
+            'angle': int(angle),
+            'visible': bool(visible[i]),
+            'form_metrics': form_metrics
+        }
+        if not visible[i]:
+            continue
+
+        last_rep_time = counter.last_rep_ts
+        if session_active and counter.update(angle, current_time):
+            sides[side]['reps'] = counter.reps
+            time_since_last = current_time - last_rep_time if last_rep_time else 0
+            if current_session:
+                current_session.add_rep_data(build_rep_data(
+                    counter.reps, form_metrics, current_time,
+                    counter.last_rep_duration, time_since_last, side=side))
+
+    # End set after a long pause on both arms
+    last_rep_times = [c.last_rep_ts for c in side_counters.values() if c.last_rep_ts]
+    if last_rep_times and current_time - max(last_rep_times) > 10:
+        if current_session and len(current_session.rep_data) > 0:
+            current_session.end_set(exercises=finish_exercise_set())
+            current_session.start_set()
+            for c in side_counters.values():
+                c.last_rep_ts = None
+
+    primary = sides['left'] if visible[0] else sides['right']
+    data = {
+        'reps': sides['left']['reps'] + sides['right']['reps'],
+        'angle': primary['angle'],
+        'feedback': "Tracking both arms",
+        'form_metrics': primary['form_metrics'],
+        'sides': sides,
+        'landmarks': data.get('landmarks')
+    }
+    if exercise_bank is not None:
+        data['exercises'] = exercise_bank.update(lm_arr, current_time)
+        data['detected_exercise'] = exercise_bank.detected
+    if current_session:
+        data['set_summary'] = current_session.live_set_summary()
+
+    if annotate:
+        cv2.putText(frame, f"L: {sides['left']['reps']}  R: {sides['right']['reps']}",
+                    (30,40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255,255,255), 2)
+        cv2.putText(frame, f"Angle L: {sides['left']['angle']}  R: {sides['right']['angle']} deg",
+                    (30,80), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,255), 2)
+    return frame, data
+
 # Add cleanup on exit
 def cleanup():
     global current_session
@@ -382,19 +658,39 @@ def save_posture_data(session_data):
             }
             posture_data["sets"].append(set_metrics)
             
-        # Use synchronous insert
-        from pymongo import MongoClient
-        from app.config import settings
-        
-        client = MongoClient(settings.mongodb_uri)
-        db = client[settings.db_name]
-        db.posture_sessions.insert_one(posture_data)
-        client.close()
+        # Use synchronous insert on the process-wide pooled client
+        from app.database import get_sync_db
+
+        get_sync_db().posture_sessions.insert_one(posture_data)
         return True
     except Exception as e:
         print(f"Error saving posture data: {e}")
         return False
     
+rep_writer = None  # app.timeseries.RepWriter, created on the first set
+
+def save_rep_series(session_data, set_data):
+    """
+    Queue one finished set's reps for the per-rep time series
+    (ExerciseSession rep_sink). Runs on the capture thread when a set ends
+    automatically, so it never touches the database itself.
+    """
+    global rep_writer
+    try:
+        if not session_data.get("userContext", {}).get("user_id"):
+            return False
+
+        from app.database import get_sync_db
+        from app.timeseries import RepWriter, rep_documents
+
+        if rep_writer is None:
+            rep_writer = RepWriter(get_sync_db)
+        # Documents are built now, so later changes to the session don't leak in
+        return rep_writer.submit(rep_documents(session_data, set_data))
+    except Exception as e:
+        logger.error(f"Error saving rep series: {e}")
+        return False
+
 # Comment out or remove the original while loop when using as a module
 if __name__ == '__main__':
     # Keep the original while loop for standalone usage
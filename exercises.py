@@ -0,0 +1,349 @@
+# File: exercises.py
+
+from collections import Counter
+
+import numpy as np
+from rep_counter import RepCounter
+
+# ——— MediaPipe Pose landmark indices ———
+# Kept as plain data so definitions can be compiled and evaluated offline
+# without importing mediapipe.
+LANDMARK_NAMES = [
+    "NOSE", "LEFT_EYE_INNER", "LEFT_EYE", "LEFT_EYE_OUTER", "RIGHT_EYE_INNER",
+    "RIGHT_EYE", "RIGHT_EYE_OUTER", "LEFT_EAR", "RIGHT_EAR", "MOUTH_LEFT",
+    "MOUTH_RIGHT", "LEFT_SHOULDER", "RIGHT_SHOULDER", "LEFT_ELBOW",
+    "RIGHT_ELBOW", "LEFT_WRIST", "RIGHT_WRIST", "LEFT_PINKY", "RIGHT_PINKY",
+    "LEFT_INDEX", "RIGHT_INDEX", "LEFT_THUMB", "RIGHT_THUMB", "LEFT_HIP",
+    "RIGHT_HIP", "LEFT_KNEE", "RIGHT_KNEE", "LEFT_ANKLE", "RIGHT_ANKLE",
+    "LEFT_HEEL", "RIGHT_HEEL", "LEFT_FOOT_INDEX", "RIGHT_FOOT_INDEX",
+]
+LANDMARK_INDEX = {name: i for i, name in enumerate(LANDMARK_NAMES)}
+NUM_LANDMARKS = len(LANDMARK_NAMES)
+
+# Columns of a landmark array: x, y, z, visibility
+X, Y, Z, VIS = 0, 1, 2, 3
+
+VISIBILITY_THRESH = 0.5
+
+# ——— Exercise definitions ———
+# Each exercise is pure data:
+#   joints     — name -> (a, b, c) landmark triple; the angle is measured at b
+#   primary    — joint whose angle drives the rep phases
+#   phases     — flexion/extension angles and hysteresis tolerance (degrees)
+#   visibility — landmarks that must be visible for the analysis to count
+#   checks     — form metrics, each one of:
+#                  kind "angle":             points (a, b, c), angle at b
+#                  kind "lean":              points (upper, lower), degrees
+#                                            from vertical (reported as
+#                                            torso_incline: curl_detector's
+#                                            torso_lean is measured another way)
+#                  kind "vertical_distance": points (p, q), |p.y - q.y|
+#                with optional "max"/"min" limits and a "message" shown
+#                when a limit is broken.
+EXERCISES = {
+    "bicep_curl": {
+        "name": "Bicep Curl",
+        "joints": {"elbow": ("LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")},
+        "primary": "elbow",
+        "phases": {"flexion": 45, "extension": 170, "tolerance": 15},
+        "visibility": ["LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST", "LEFT_HIP"],
+        "checks": [
+            {"name": "elbow_flare", "kind": "angle",
+             "points": ("LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")},
+            {"name": "torso_incline", "kind": "lean",
+             "points": ("LEFT_SHOULDER", "LEFT_HIP"),
+             "max": 10.0, "message": "Keep your torso upright"},
+            {"name": "shoulder_elevation", "kind": "vertical_distance",
+             "points": ("LEFT_SHOULDER", "LEFT_HIP")},
+        ],
+    },
+    "squat": {
+        "name": "Squat",
+        "joints": {
+            "knee": ("LEFT_HIP", "LEFT_KNEE", "LEFT_ANKLE"),
+            "hip": ("LEFT_SHOULDER", "LEFT_HIP", "LEFT_KNEE"),
+        },
+        "primary": "knee",
+        "phases": {"flexion": 90, "extension": 170, "tolerance": 15},
+        "visibility": ["LEFT_SHOULDER", "LEFT_HIP", "LEFT_KNEE", "LEFT_ANKLE"],
+        "checks": [
+            {"name": "torso_incline", "kind": "lean",
+             "points": ("LEFT_SHOULDER", "LEFT_HIP"),
+             "max": 45.0, "message": "Keep your chest up"},
+            {"name": "hip_angle", "kind": "angle",
+             "points": ("LEFT_SHOULDER", "LEFT_HIP", "LEFT_KNEE"),
+             "min": 50.0, "message": "Don't fold forward at the hips"},
+        ],
+    },
+    "shoulder_press": {
+        "name": "Shoulder Press",
+        "joints": {"elbow": ("LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")},
+        "primary": "elbow",
+        "phases": {"flexion": 80, "extension": 165, "tolerance": 10},
+        "visibility": ["LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST", "LEFT_HIP"],
+        "checks": [
+            {"name": "torso_incline", "kind": "lean",
+             "points": ("LEFT_SHOULDER", "LEFT_HIP"),
+             "max": 15.0, "message": "Don't arch your lower back"},
+            {"name": "shoulder_elevation", "kind": "vertical_distance",
+             "points": ("LEFT_SHOULDER", "LEFT_HIP")},
+        ],
+    },
+}
+
+CHECK_KINDS = ("angle", "lean", "vertical_distance")
+
+
+def landmarks_to_array(landmarks, out=None):
+    """
+    Copy a MediaPipe landmark list into a (33, 4) float32 array of
+    x, y, z, visibility. Pass `out` to reuse a preallocated buffer.
+    """
+    if out is None:
+        out = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    for i, l in enumerate(landmarks):
+        row = out[i]
+        row[X] = l.x
+        row[Y] = l.y
+        row[Z] = l.z
+        row[VIS] = l.visibility
+    return out
+
+
+def joint_angles(lm, a, b, c):
+    """
+    Angles at b (degrees) for index arrays a, b, c over landmarks `lm`
+    shaped (..., 33, >=2). Same formula as curl_detector.calculate_angle.
+    """
+    pa = lm[..., a, :2]
+    pb = lm[..., b, :2]
+    pc = lm[..., c, :2]
+    ba = pa - pb
+    bc = pc - pb
+    dot = np.einsum("...i,...i->...", ba, bc)
+    norm = np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1) + 1e-8
+    return np.degrees(np.arccos(np.clip(dot / norm, -1.0, 1.0)))
+
+
+def lean_angles(lm, upper, lower):
+    """Angle of the lower->upper segment from vertical in degrees (0 = upright)."""
+    d = lm[..., upper, :2] - lm[..., lower, :2]
+    return np.degrees(np.arctan2(np.abs(d[..., 0]), np.abs(d[..., 1])))
+
+
+def vertical_distances(lm, p, q):
+    """|p.y - q.y| (calculate_shoulder_elevation)."""
+    return np.abs(lm[..., p, Y] - lm[..., q, Y])
+
+
+def _indices(names):
+    try:
+        return [LANDMARK_INDEX[n] for n in names]
+    except KeyError as e:
+        raise ValueError(f"Unknown landmark {e.args[0]}") from None
+
+
+class ExerciseBank:
+    """
+    Compiles a set of exercise definitions into one vectorized evaluator.
+
+    All joint triples, lean pairs and distance pairs from every exercise are
+    stacked into index arrays, so one evaluate() call computes every metric
+    for every exercise with a handful of NumPy operations on the same
+    landmark array — no matter how many exercises are loaded.
+    """
+
+    def __init__(self, keys=None, definitions=None, window=90):
+        """
+        keys:        exercise keys to load (default: all)
+        definitions: mapping of key -> definition (default: EXERCISES)
+        window:      frames of primary-angle history kept for detection
+        """
+        definitions = EXERCISES if definitions is None else definitions
+        self.keys = list(keys) if keys is not None else list(definitions)
+
+        triples = {k: [] for k in CHECK_KINDS}
+        self._specs = []
+        vis_rows = []
+        for key in self.keys:
+            if key not in definitions:
+                raise ValueError(f"Unknown exercise '{key}'")
+            d = definitions[key]
+            if d["primary"] not in d["joints"]:
+                raise ValueError(f"{key}: primary joint '{d['primary']}' is not defined")
+
+            joints = {}
+            for name, pts in d["joints"].items():
+                joints[name] = len(triples["angle"])
+                triples["angle"].append(_indices(pts))
+
+            checks = []
+            for check in d.get("checks", []):
+                kind = check["kind"]
+                if kind not in CHECK_KINDS:
+                    raise ValueError(f"{key}: unknown check kind '{kind}'")
+                checks.append((check, kind, len(triples[kind])))
+                triples[kind].append(_indices(check["points"]))
+
+            row = np.zeros(NUM_LANDMARKS, dtype=bool)
+            row[_indices(d.get("visibility", []))] = True
+            vis_rows.append(row)
+
+            phases = d["phases"]
+            self._specs.append({
+                "key": key,
+                "name": d["name"],
+                "joints": joints,
+                "primary": joints[d["primary"]],
+                "checks": checks,
+                "phases": phases,
+                "counter": RepCounter(
+                    flexion_threshold=phases["flexion"],
+                    extension_threshold=phases["extension"],
+                    tolerance=phases["tolerance"],
+                ),
+            })
+
+        self._angle_idx = np.array(triples["angle"], dtype=np.intp).reshape(-1, 3).T
+        self._lean_idx = np.array(triples["lean"], dtype=np.intp).reshape(-1, 2).T
+        self._dist_idx = np.array(triples["vertical_distance"], dtype=np.intp).reshape(-1, 2).T
+        self._vis_mask = np.array(vis_rows, dtype=bool).reshape(len(self.keys), NUM_LANDMARKS)
+        self._primary_idx = np.array([s["primary"] for s in self._specs], dtype=np.intp)
+        self._lower = np.array([s["counter"].lower for s in self._specs], dtype=np.float64)
+        self._upper = np.array([s["counter"].upper for s in self._specs], dtype=np.float64)
+
+        # Ring buffer of primary angles for auto-detection
+        self._history = np.full((window, len(self.keys)), np.nan)
+        self._cursor = 0
+        # Per-frame detections since the last reset, for summary()
+        self._detections = Counter()
+        self.detected = None   # detect() after the latest update()
+
+    def evaluate(self, lm):
+        """
+        Compute every metric for every exercise.
+
+        lm: landmark array shaped (33, 4) for one frame or (N, 33, 4) for a
+            batch. Returns a dict with arrays whose leading dims match lm:
+              angles (..., n_joints), lean (..., n_lean),
+              vertical_distance (..., n_dist), visible (..., n_exercises)
+        """
+        lm = np.asarray(lm)
+        a, b, c = self._angle_idx
+        u, l = self._lean_idx
+        p, q = self._dist_idx
+        vis = lm[..., VIS] >= VISIBILITY_THRESH
+        # visible if every required landmark passes the threshold
+        visible = ~np.any(self._vis_mask & ~vis[..., None, :], axis=-1)
+        return {
+            "angle": joint_angles(lm, a, b, c),
+            "lean": lean_angles(lm, u, l),
+            "vertical_distance": vertical_distances(lm, p, q),
+            "visible": visible,
+        }
+
+    def update(self, lm, ts):
+        """
+        Streaming step for one frame: evaluate all exercises once, advance
+        each exercise's RepCounter, refresh `detected` (one vote towards
+        summary()) and return per-exercise results.
+        """
+        values = self.evaluate(lm)
+        primary = values["angle"][self._primary_idx]
+        visible = values["visible"]
+
+        row = self._history[self._cursor % self._history.shape[0]]
+        row[:] = np.where(visible, primary, np.nan)
+        self._cursor += 1
+        self.detected = self.detect()
+        if self.detected is not None:
+            self._detections[self.detected] += 1
+
+        results = {}
+        for i, spec in enumerate(self._specs):
+            angle = float(primary[i])
+            counter = spec["counter"]
+            rep = bool(visible[i]) and counter.update(angle, ts)
+
+            metrics = {}
+            issues = []
+            for check, kind, j in spec["checks"]:
+                value = float(values[kind][j])
+                metrics[check["name"]] = round(value, 2)
+                if ("max" in check and value > check["max"]) or \
+                   ("min" in check and value < check["min"]):
+                    issues.append(check.get("message", check["name"]))
+
+            results[spec["key"]] = {
+                "name": spec["name"],
+                "angle": round(angle, 2),
+                "visible": bool(visible[i]),
+                "reps": counter.reps,
+                "rep_completed": rep,
+                "form_metrics": metrics,
+                "issues": issues,
+            }
+        return results
+
+    def detect(self, min_score=0.5):
+        """
+        Guess which exercise is being performed from the recent window:
+        the one whose primary joint covered the largest share of the band
+        between its rep thresholds. Ties go to the first loaded exercise.
+        Returns the exercise key, or None if nothing moves enough.
+        """
+        filled = min(self._cursor, self._history.shape[0])
+        if filled == 0:
+            return None
+        hist = self._history[:filled]
+        seen = ~np.all(np.isnan(hist), axis=0)
+        if not seen.any():
+            return None
+        lo = np.maximum(np.nanmin(hist[:, seen], axis=0), self._lower[seen])
+        hi = np.minimum(np.nanmax(hist[:, seen], axis=0), self._upper[seen])
+        scores = np.full(len(self.keys), -np.inf)
+        scores[seen] = np.clip((hi - lo) / (self._upper[seen] - self._lower[seen]), 0.0, 1.0)
+        best = int(np.argmax(scores))
+        return self.keys[best] if scores[best] >= min_score else None
+
+    def summary(self):
+        """
+        The set so far: the exercise detected most often (None if none was)
+        and every exercise's rep count.
+        """
+        detected = self._detections.most_common(1)
+        return {
+            "detectedExercise": detected[0][0] if detected else None,
+            "exerciseReps": {spec["key"]: spec["counter"].reps for spec in self._specs},
+        }
+
+    def reset(self):
+        """Reset rep counters and detection history, e.g. at a new set."""
+        for spec in self._specs:
+            spec["counter"].reset(stage=spec["counter"].stage)
+        self._history.fill(np.nan)
+        self._cursor = 0
+        self._detections.clear()
+        self.detected = None
+
+    def count(self, lm, timestamps=None):
+        """
+        Offline scoring: evaluate a (N, 33, 4) landmark series and segment
+        each exercise's primary angle into reps in one vectorized pass.
+        Frames where the exercise's landmarks are hidden are ignored.
+        """
+        values = self.evaluate(lm)
+        primary = values["angle"][:, self._primary_idx]
+        out = {}
+        for i, spec in enumerate(self._specs):
+            keep = values["visible"][:, i]
+            frames = np.flatnonzero(keep)
+            ts = frames.astype(np.float64) if timestamps is None else np.asarray(timestamps)[keep]
+            seg = spec["counter"].count(primary[keep, i], ts)
+            # map indices back to the full series
+            seg["end_index"] = frames[seg["end_index"]]
+            seg["start_index"] = np.where(
+                seg["start_index"] >= 0, frames[np.maximum(seg["start_index"], 0)], -1
+            )
+            out[spec["key"]] = seg
+        return out
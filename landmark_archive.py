@@ -0,0 +1,86 @@
+# File: landmark_archive.py
+
+import json
+import os
+
+import numpy as np
+from exercises import NUM_LANDMARKS
+
+# ——— Archive layout ———
+# One directory per session, one .npy file per column, so any column can be
+# memory-mapped on its own:
+#   landmarks.npy   (N, 33, 4) float16  x, y, z, visibility per frame
+#   timestamps.npy  (N,)       float64  seconds since the epoch
+#   sets.npy        (N,)       int16    set number the frame belongs to, 0 between sets
+#   meta.json                           session id, user, exercise, live results
+# float16 keeps normalized coordinates to ~0.0005, far below pose jitter,
+# at 264 bytes per frame.
+LANDMARK_DTYPE = np.float16
+COLUMNS = ("landmarks", "timestamps", "sets")
+
+
+class LandmarkRecorder:
+    """Collects every analyzed frame's landmarks for one session."""
+
+    def __init__(self, capacity=4096):
+        self.count = 0
+        self._landmarks = np.empty((capacity, NUM_LANDMARKS, 4), dtype=LANDMARK_DTYPE)
+        self._timestamps = np.empty(capacity, dtype=np.float64)
+        self._sets = np.empty(capacity, dtype=np.int16)
+
+    def _grow(self):
+        capacity = 2 * len(self._timestamps)
+        for name in ("_landmarks", "_timestamps", "_sets"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def append(self, lm_arr, ts, set_number):
+        if self.count == len(self._timestamps):
+            self._grow()
+        self._landmarks[self.count] = lm_arr
+        self._timestamps[self.count] = ts
+        self._sets[self.count] = set_number
+        self.count += 1
+
+    def save(self, directory, meta=None):
+        """Write the archive to `directory` (created if needed); returns its path."""
+        os.makedirs(directory, exist_ok=True)
+        n = self.count
+        np.save(os.path.join(directory, "landmarks.npy"), self._landmarks[:n])
+        np.save(os.path.join(directory, "timestamps.npy"), self._timestamps[:n])
+        np.save(os.path.join(directory, "sets.npy"), self._sets[:n])
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(dict(meta or {}, frames=n), f, indent=2)
+        return directory
+
+
+def open_archive(directory):
+    """Memory-map an archive's columns; nothing is read until it is used."""
+    archive = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+    with open(os.path.join(directory, "meta.json")) as f:
+        archive["meta"] = json.load(f)
+    archive["path"] = directory
+    return archive
+
+
+def find_archives(root):
+    """Archive directories under root (any depth)."""
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        if "meta.json" in filenames and "landmarks.npy" in filenames:
+            found.append(dirpath)
+    return sorted(found)
+
+
+def session_meta(session_data):
+    """What an archive records about its session (live results included for comparison)."""
+    return {
+        "sessionId": session_data.get("sessionId"),
+        "user_id": session_data.get("userContext", {}).get("user_id"),
+        "exercise": session_data.get("exercise"),
+        "bilateral": session_data.get("bilateral", False),
+        "dateTime": session_data.get("dateTime"),
+        "liveReps": {str(s.get("setNumber")): s.get("actualReps") for s in session_data.get("sets", [])},
+    }
@@ -0,0 +1,194 @@
+# File: live_socket.py
+
+import asyncio
+import json
+import logging
+import cv2
+from starlette.applications import Starlette
+from a2wsgi import WSGIMiddleware
+from starlette.routing import Mount, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+logger = logging.getLogger(__name__)
+
+# ——— Binary protocol: first byte of every server message ———
+MSG_FRAME   = 0x01  # JPEG image
+MSG_METRICS = 0x02  # UTF-8 JSON, same payload as the /metrics SSE stream
+MSG_REPLY   = 0x03  # UTF-8 JSON reply to a client command
+
+JPEG_QUALITY = 80
+
+# Client -> server messages are JSON text:
+#   {"id": 1, "cmd": "start_set", "args": {...}}
+# "cmd" is any SessionController command, or "subscribe" with
+# {"video": bool} to switch the frame stream on or off.
+
+
+def pack(msg_type, payload):
+    return bytes((msg_type,)) + payload
+
+
+class LiveClient:
+    """
+    One WebSocket viewer. It holds at most one pending frame and one pending
+    metrics message: anything newer replaces what the client has not taken
+    yet, so a slow connection drops frames instead of buffering them.
+    Command replies are never dropped.
+    """
+
+    def __init__(self, websocket, video=True):
+        self.websocket = websocket
+        self.video = video
+        self.pending_frame = None
+        self.pending_metrics = None
+        self.pending_replies = []
+        self.wakeup = asyncio.Event()
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    def offer(self, frame_msg, metrics_msg):
+        if frame_msg is not None and self.video:
+            if self.pending_frame is not None:
+                self.frames_dropped += 1
+            self.pending_frame = frame_msg
+        if metrics_msg is not None:
+            self.pending_metrics = metrics_msg
+        self.wakeup.set()
+
+    def reply(self, msg):
+        self.pending_replies.append(msg)
+        self.wakeup.set()
+
+    async def send_loop(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.pending_replies:
+                    await self.websocket.send_bytes(self.pending_replies.pop(0))
+                metrics, self.pending_metrics = self.pending_metrics, None
+                if metrics is not None:
+                    await self.websocket.send_bytes(metrics)
+                frame, self.pending_frame = self.pending_frame, None
+                if frame is not None:
+                    await self.websocket.send_bytes(frame)
+                    self.frames_sent += 1
+        except (WebSocketDisconnect, RuntimeError):
+            # Client went away; the receive side cleans up
+            pass
+
+
+class LiveHub:
+    """
+    Fans the shared capture state out to every WebSocket client from a
+    single asyncio task. Each new frame is JPEG-encoded once (in a worker
+    thread) no matter how many clients are connected.
+    """
+
+    def __init__(self, snapshot, start_capture, frame_rate=30, release=None):
+        """
+        snapshot:      callable returning (frame_id, frame, latest_data)
+        start_capture: callable that makes sure frames are being produced
+        release:       called with each snapshot's frame once it is encoded,
+                       to end a lease taken by snapshot
+        """
+        self.snapshot = snapshot
+        self.release = release
+        self.start_capture = start_capture
+        self.frame_rate = frame_rate
+        self.clients = set()
+        self._task = None
+
+    def add(self, client):
+        self.clients.add(client)
+        self.start_capture()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def remove(self, client):
+        self.clients.discard(client)
+
+    @staticmethod
+    def _encode(frame):
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        return pack(MSG_FRAME, buffer.tobytes()) if ret else None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        last_id = 0
+        last_data = None
+        while self.clients:
+            await asyncio.sleep(1.0 / self.frame_rate)
+            frame_id, frame, data = self.snapshot()
+
+            frame_msg = None
+            try:
+                if frame_id != last_id and frame is not None and any(c.video for c in self.clients):
+                    last_id = frame_id
+                    frame_msg = await loop.run_in_executor(None, self._encode, frame)
+            finally:
+                if self.release is not None:
+                    self.release(frame)
+
+            metrics_msg = None
+            if data and data is not last_data:
+                last_data = data
+                metrics_msg = pack(MSG_METRICS, json.dumps(data).encode())
+
+            for client in list(self.clients):
+                client.offer(frame_msg, metrics_msg)
+
+    def stats(self):
+        return [
+            {'video': c.video, 'frames_sent': c.frames_sent, 'frames_dropped': c.frames_dropped}
+            for c in list(self.clients)
+        ]
+
+
+def create_live_app(wsgi_app, hub, controller):
+    """
+    ASGI app serving /ws on asyncio and everything else from the Flask app.
+    Viewers on /ws cost an asyncio task each rather than a worker thread.
+    """
+
+    async def handle_command(client, message):
+        try:
+            msg = json.loads(message)
+            cmd = msg.get('cmd')
+            args = msg.get('args')
+        except (ValueError, AttributeError):
+            client.reply(pack(MSG_REPLY, json.dumps(
+                {"status": "error", "message": "Invalid command", "code": 400}).encode()))
+            return
+
+        if cmd == 'subscribe':
+            client.video = bool((args or {}).get('video', True))
+            body, status = {"status": "success", "video": client.video}, 200
+        else:
+            # Session commands touch files and shared state; keep them off the loop
+            body, status = await asyncio.to_thread(controller.dispatch, cmd, args)
+
+        client.reply(pack(MSG_REPLY, json.dumps(
+            {"id": msg.get('id'), "cmd": cmd, "code": status, **body}).encode()))
+
+    async def live_socket(websocket):
+        await websocket.accept()
+        client = LiveClient(websocket, video=websocket.query_params.get('video', '1') != '0')
+        hub.add(client)
+        sender = asyncio.create_task(client.send_loop())
+        try:
+            while True:
+                message = await websocket.receive_text()
+                await handle_command(client, message)
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f"Live socket error: {e}")
+        finally:
+            hub.remove(client)
+            sender.cancel()
+
+    return Starlette(routes=[
+        WebSocketRoute('/ws', live_socket),
+        Mount('/', app=WSGIMiddleware(wsgi_app)),
+    ])
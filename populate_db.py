@@ -1,108 +1,279 @@
+"""
+Synthetic data generator for development, benchmarks and capacity tests.
+
+    python populate_db.py                                  # small dev dataset
+    python populate_db.py --users 50000 --sessions 2000000 --posture 2000000 \
+        --entries 1000000 --concurrency 16 --report populate.json
+
+Documents are built in batches and written with concurrent insert_many
+calls. Each batch draws from its own RNG derived from --seed, so the same
+arguments always produce the same data regardless of concurrency. User
+activity is heavy-tailed (a few users log most sessions), and weights,
+reps and form metrics follow plausible distributions rather than uniform
+noise.
+"""
+
+import argparse
 import asyncio
+import json
+import math
 import random
+import time
 from datetime import datetime, timedelta
+from app import analytics
+from app.crud import bump_version
 from app.database import db
 
-# Test users and workout names
-USERS = ['user_1', 'user_2', 'user_3']
-WORKOUT_NAMES = ['Bench Press', 'Squat', 'Deadlift', 'Overhead Press', 'Pull-Up', 'Row']
-
-async def generate_workout_sessions():
-    """Generate workout session history"""
-    print("Generating workout sessions...")
-    await db.sessions.delete_many({})
-
-    for user in USERS:
-        for days_ago in range(1, 6):
-            date = datetime.utcnow() - timedelta(days=days_ago)
-            num_workouts = random.randint(1, 4)
-            workouts = []
-            
-            for _ in range(num_workouts):
-                name = random.choice(WORKOUT_NAMES)
-                num_sets = random.randint(2, 5)
-                sets = [
-                    {
-                        'reps': random.randint(5, 12),
-                        'weight': round(random.uniform(100, 300), 1)
-                    }
-                    for _ in range(num_sets)
-                ]
-                workouts.append({'name': name, 'sets': sets})
-
-            session_doc = {
-                'user_id': user,
-                'workouts': workouts,
-                'finished_at': date.isoformat()
-            }
-            res = await db.sessions.insert_one(session_doc)
-            print(f"Inserted workout session {res.inserted_id} for {user} on {date.date()}")
-
-async def generate_posture_data():
-    """Generate posture analysis history"""
-    print("\nGenerating posture analysis data...")
-    await db.posture_sessions.delete_many({})
-
-    for user in USERS:
-        for days_ago in range(1, 6):
-            date = datetime.utcnow() - timedelta(days=days_ago)
-            
-            # Generate 2-3 posture sessions per day
-            for session in range(random.randint(2, 3)):
-                num_sets = random.randint(3, 5)
-                sets = []
-                
-                for set_num in range(num_sets):
-                    # Generate random but realistic form metrics
-                    set_metrics = {
-                        "set_number": set_num + 1,
-                        "reps": random.randint(8, 12),
-                        "form_metrics": {
-                            "elbow_flare": round(random.uniform(5, 25), 2),
-                            "torso_lean": round(random.uniform(3, 15), 2),
-                            "shoulder_elevation": round(random.uniform(0.05, 0.2), 2),
-                            "rom_percentage": round(random.uniform(75, 100), 2)
-                        }
-                    }
-                    sets.append(set_metrics)
-
-                posture_doc = {
-                    "user_id": user,
-                    "timestamp": (date + timedelta(hours=session)).isoformat(),
-                    "exercise": "Bicep Curl",
-                    "sets": sets,
-                    "sessionSummary": {
-                        "totalReps": sum(s["reps"] for s in sets),
-                        "avgFormScore": round(random.uniform(6, 9), 1),
-                        "primaryIssues": random.sample([
-                            "elbow flare", 
-                            "shoulder elevation",
-                            "incomplete ROM",
-                            "torso swaying"
-                        ], k=random.randint(1, 2))
-                    }
-                }
-                
-                res = await db.posture_sessions.insert_one(posture_doc)
-                print(f"Inserted posture session {res.inserted_id} for {user} on {date.date()}")
-
-async def main():
-    """Populate both workout and posture data"""
-    try:
-        # Generate both types of data
-        await generate_workout_sessions()
-        await generate_posture_data()
-        
-        # Print final counts
-        workout_count = await db.sessions.count_documents({})
-        posture_count = await db.posture_sessions.count_documents({})
-        
-        print("\nPopulation complete!")
-        print(f"Total workout sessions: {workout_count}")
-        print(f"Total posture sessions: {posture_count}")
-        
-    except Exception as e:
-        print(f"Error populating database: {e}")
+WORKOUT_NAMES = ['Bench Press', 'Squat', 'Deadlift', 'Overhead Press', 'Pull-Up', 'Row', 'Bicep Curl']
+# Typical working weight relative to a user's bench press
+EXERCISE_FACTOR = {
+    'Bench Press': 1.0, 'Squat': 1.3, 'Deadlift': 1.5, 'Overhead Press': 0.65,
+    'Pull-Up': 0.4, 'Row': 0.85, 'Bicep Curl': 0.3,
+}
+JOURNAL_TEMPLATES = [
+    "Felt {feel} on {exercise} today, hit {reps} reps at {weight} lbs.",
+    "{exercise} was {feel}. My {body} was a bit sore after the last set.",
+    "Short session, {exercise} felt {feel}. Sleep was {sleep} last night.",
+    "New focus on form for {exercise}: keeping my elbows in. Felt {feel}.",
+    "Rest day tomorrow. {body} feels {feel} after {exercise}.",
+]
+FEELINGS = ["strong", "tired", "great", "heavy", "easy", "shaky", "solid", "sluggish"]
+BODY_PARTS = ["elbow", "shoulder", "lower back", "knee", "wrist", "hip"]
+SLEEP = ["great", "poor", "okay", "short"]
+
+
+# ——— Users ———
+
+class UserPool:
+    """
+    Synthetic users with a heavy-tailed activity weight (Pareto) and a
+    lognormal strength level, fixed by the seed.
+    """
+
+    def __init__(self, count, seed):
+        rng = random.Random(seed)
+        self.ids = [f"user_{i:06d}" for i in range(count)]
+        self.strength = [min(400.0, rng.lognormvariate(math.log(135), 0.35)) for _ in range(count)]
+        cumulative, total = [], 0.0
+        for _ in range(count):
+            total += rng.paretovariate(2.0)
+            cumulative.append(total)
+        self.cum_weights = cumulative
+
+    def pick(self, rng, k):
+        """k user indexes, weighted by activity"""
+        return rng.choices(range(len(self.ids)), cum_weights=self.cum_weights, k=k)
+
+
+def random_time(rng, now, days):
+    """A timestamp in the last `days` days, denser in the evenings"""
+    day = rng.randrange(1, days + 1)
+    hour = min(23, max(5, int(rng.gauss(18, 3))))
+    return now - timedelta(days=day, hours=now.hour - hour, minutes=rng.randrange(60))
+
+
+def round_weight(weight):
+    return max(5.0, 5.0 * round(weight / 5.0))
+
+
+# ——— Document builders (one batch each) ———
+
+def build_sessions(rng, users, count, now, days):
+    docs = []
+    for index in users.pick(rng, count):
+        workouts = []
+        for name in rng.sample(WORKOUT_NAMES, k=rng.randint(1, 4)):
+            working = users.strength[index] * EXERCISE_FACTOR[name]
+            sets = []
+            for _ in range(rng.randint(2, 5)):
+                reps = min(20, max(1, round(rng.triangular(3, 15, 8))))
+                sets.append({'reps': reps, 'weight': round_weight(working * rng.uniform(0.85, 1.05))})
+            workouts.append({'name': name, 'sets': sets})
+        docs.append({
+            'user_id': users.ids[index],
+            'workouts': workouts,
+            'notes': None,
+            'finished_at': random_time(rng, now, days),
+        })
+    return docs
+
+
+def clip(value, low, high):
+    return round(min(high, max(low, value)), 2)
+
+
+def build_posture(rng, users, count, now, days):
+    docs = []
+    for index in users.pick(rng, count):
+        # Users have consistent habits: a personal bias on each metric
+        flare_bias = (index % 7) - 3
+        sets = []
+        for set_num in range(rng.randint(3, 5)):
+            fatigue = set_num * 1.5
+            sets.append({
+                "set_number": set_num + 1,
+                "reps": rng.randint(8, 12),
+                "form_metrics": {
+                    "elbow_flare": clip(rng.gauss(11 + flare_bias + fatigue, 4), 0, 45),
+                    "torso_lean": clip(rng.gauss(6 + fatigue, 2.5), 0, 30),
+                    "shoulder_elevation": clip(rng.gauss(0.08, 0.035), 0, 0.4),
+                    "rom_percentage": clip(rng.gauss(90 - fatigue * 2, 6), 40, 100),
+                },
+            })
+        issues = [issue for issue, hit in (
+            ("elbow flare", any(s["form_metrics"]["elbow_flare"] > 15 for s in sets)),
+            ("torso swaying", any(s["form_metrics"]["torso_lean"] > 10 for s in sets)),
+            ("incomplete ROM", any(s["form_metrics"]["rom_percentage"] < 80 for s in sets)),
+            ("shoulder elevation", any(s["form_metrics"]["shoulder_elevation"] > 0.1 for s in sets)),
+        ) if hit]
+        docs.append({
+            "user_id": users.ids[index],
+            "timestamp": random_time(rng, now, days),
+            "exercise": "Bicep Curl",
+            "sets": sets,
+            "sessionSummary": {
+                "totalReps": sum(s["reps"] for s in sets),
+                "avgFormScore": clip(9.5 - 0.8 * len(issues) + rng.gauss(0, 0.4), 1, 10),
+                "primaryIssues": issues[:2],
+            },
+        })
+    return docs
+
+
+def build_entries(rng, users, count, now, days):
+    docs = []
+    for index in users.pick(rng, count):
+        exercise = rng.choice(WORKOUT_NAMES)
+        text = rng.choice(JOURNAL_TEMPLATES).format(
+            feel=rng.choice(FEELINGS), exercise=exercise, body=rng.choice(BODY_PARTS),
+            sleep=rng.choice(SLEEP), reps=rng.randint(3, 15),
+            weight=round_weight(users.strength[index] * EXERCISE_FACTOR[exercise]),
+        )
+        docs.append({
+            "content": text,
+            "user_id": users.ids[index],
+            "created_at": random_time(rng, now, days),
+        })
+    return docs
+
+
+# collection -> (builder, stream number used to derive per-batch seeds)
+GENERATORS = {
+    "sessions": (build_sessions, 1),
+    "posture_sessions": (build_posture, 2),
+    "entries": (build_entries, 3),
+}
+
+
+# ——— Loading ———
+
+async def load_collection(name, total, users, args, now):
+    """Generate `total` documents in batches and insert them concurrently."""
+    builder, stream = GENERATORS[name]
+    collection = db[name]
+    if not args.append:
+        # delete_many keeps the indexes, which a running API creates only once
+        await collection.delete_many({})
+    if total <= 0:
+        return {"collection": name, "documents": 0, "seconds": 0.0, "docs_per_s": 0.0}
+
+    batches = math.ceil(total / args.batch_size)
+    queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    inserted = 0
+    errors = []
+
+    async def writer():
+        nonlocal inserted
+        while True:
+            docs = await queue.get()
+            if docs is None:
+                return
+            if errors:
+                continue   # keep draining so the producer never blocks
+            try:
+                await collection.insert_many(docs, ordered=False)
+                inserted += len(docs)
+            except Exception as e:
+                errors.append(e)
+
+    start = time.perf_counter()
+    writers = [asyncio.create_task(writer()) for _ in range(args.concurrency)]
+    last_report = start
+    for batch in range(batches):
+        size = min(args.batch_size, total - batch * args.batch_size)
+        rng = random.Random((args.seed * 10 + stream) * 1_000_003 + batch)
+        await queue.put(builder(rng, users, size, now, args.days))
+        if time.perf_counter() - last_report >= 5:
+            last_report = time.perf_counter()
+            print(f"  {name}: {inserted:,}/{total:,} ({inserted / (last_report - start):,.0f} docs/s)")
+    for _ in writers:
+        await queue.put(None)
+    await asyncio.gather(*writers)
+    seconds = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(f"Inserting {name} failed after {inserted:,} documents: {errors[0]}")
+
+    result = {"collection": name, "documents": inserted, "seconds": round(seconds, 2),
+              "docs_per_s": round(inserted / seconds, 1) if seconds else 0.0}
+    print(f"Inserted {inserted:,} {name} in {seconds:.1f}s ({result['docs_per_s']:,.0f} docs/s)")
+    return result
+
+
+async def main(args):
+    """Populate workout sessions, posture sessions and journal entries"""
+    users = UserPool(args.users, args.seed)
+    # Fixed reference time so a given seed yields identical documents
+    now = datetime.fromisoformat(args.now) if args.now else datetime.utcnow().replace(microsecond=0)
+    print(f"Generating data for {args.users:,} users over {args.days} days "
+          f"(seed {args.seed}, batches of {args.batch_size}, {args.concurrency} concurrent writers)")
+
+    start = time.perf_counter()
+    results = [
+        await load_collection("sessions", args.sessions, users, args, now),
+        await load_collection("posture_sessions", args.posture, users, args, now),
+        await load_collection("entries", args.entries, users, args, now),
+    ]
+    seconds = time.perf_counter() - start
+    total = sum(r["documents"] for r in results)
+    # Invalidate the API's list ETags for the collections written here
+    for name in GENERATORS:
+        await bump_version(name)
+    # Sessions were inserted directly, so rebuild the workout analytics in one pass
+    started = time.perf_counter()
+    await analytics.rebuild(db)
+    print(f"Rebuilt workout analytics in {time.perf_counter() - started:.1f}s")
+
+    print("\nPopulation complete!")
+    for name in GENERATORS:
+        print(f"Total {name}: {await db[name].estimated_document_count():,}")
+    print(f"{total:,} documents in {seconds:.1f}s ({total / seconds:,.0f} docs/s overall)")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({
+                "seed": args.seed, "users": args.users, "days": args.days,
+                "batch_size": args.batch_size, "concurrency": args.concurrency,
+                "collections": results, "seconds": round(seconds, 2),
+                "docs_per_s": round(total / seconds, 1) if seconds else 0.0,
+            }, f, indent=2)
+        print(f"Report written to {args.report}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--sessions', type=int, default=20_000, help="Workout sessions to insert")
+    parser.add_argument('--posture', type=int, default=20_000, help="Posture sessions to insert")
+    parser.add_argument('--entries', type=int, default=10_000, help="Journal entries to insert")
+    parser.add_argument('--days', type=int, default=365, help="History length to spread documents over")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--now', help="Reference time (ISO 8601) for fully reproducible timestamps")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Documents per insert_many")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent insert_many calls")
+    parser.add_argument('--append', action='store_true', help="Keep existing documents instead of deleting them")
+    parser.add_argument('--report', help="Write throughput figures to this JSON file")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
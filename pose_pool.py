@@ -0,0 +1,299 @@
+# File: pose_pool.py
+
+import collections
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Same settings curl_detector uses for its inline model
+POSE_OPTIONS = dict(
+    static_image_mode=False,
+    model_complexity=0,  # Reduce to fastest model
+    enable_segmentation=False,
+    min_detection_confidence=0.5,
+    min_tracking_confidence=0.5,
+    smooth_landmarks=True  # Add smoothing
+)
+
+# ——— Pool parameters ———
+FRAME_SHAPE = (480, 640, 3)   # RGB frames as process_frame feeds them to the model
+RING_SLOTS = 4                # frames in flight per worker
+MAX_BATCH = 8                 # requests a worker drains from its queue per reply
+EWMA_ALPHA = 0.1
+RESPAWN_DELAY = 1.0           # seconds between restarts of a worker that keeps dying
+
+PoseResult = collections.namedtuple('PoseResult', 'stream_id seq pose_landmarks latency')
+PoseResult.__doc__ = """
+One inference result. pose_landmarks is a NormalizedLandmarkList (or None
+when no body was found), so a PoseResult can stand in for the object
+returned by mp_pose.Pose.process.
+"""
+
+
+def pose_worker(shm_name, slots, frame_shape, requests, results, pose_options):
+    """
+    Body of one inference process. Frames are read in place from this
+    worker's shared-memory ring; only slot numbers go in and serialized
+    landmarks come out. Each stream gets its own Pose instance so tracking
+    state never mixes between cameras.
+    """
+    import mediapipe as mp_
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray((slots,) + tuple(frame_shape), dtype=np.uint8, buffer=shm.buf)
+    poses = {}
+    try:
+        while True:
+            item = requests.get()
+            if item is None:
+                break
+            # Batch whatever else is already waiting into one reply
+            batch = [item]
+            while len(batch) < MAX_BATCH:
+                try:
+                    item = requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    requests.put(None)
+                    break
+                batch.append(item)
+
+            replies = []
+            for stream_id, slot, seq, submitted_at, generation in batch:
+                pose = poses.get(stream_id)
+                if pose is None:
+                    pose = poses[stream_id] = mp_.solutions.pose.Pose(**pose_options)
+                try:
+                    output = pose.process(ring[slot])
+                    landmarks = output.pose_landmarks.SerializeToString() if output and output.pose_landmarks else None
+                except Exception as e:
+                    logger.error(f"Pose inference failed for stream {stream_id}: {e}")
+                    landmarks = None
+                replies.append((stream_id, slot, seq, landmarks, submitted_at, generation))
+            results.put(replies)
+    finally:
+        for pose in poses.values():
+            pose.close()
+        del ring
+        shm.close()
+
+
+class PoseClient:
+    """Drop-in for an mp_pose.Pose object that runs one stream on a PosePool."""
+
+    def __init__(self, pool, stream_id, timeout=1.0):
+        self.pool = pool
+        self.stream_id = stream_id
+        self.timeout = timeout
+
+    def process(self, image):
+        return self.pool.process(self.stream_id, image, timeout=self.timeout)
+
+
+class PosePool:
+    """
+    Pose inference on a pool of worker processes, so frames from several
+    cameras run on several cores instead of queueing behind the GIL.
+
+    Each stream is pinned to one worker (pose tracking is stateful), new
+    streams go to the worker serving the fewest. Frames are copied into the
+    worker's shared-memory ring and never pickled; when a worker's ring is
+    full, submit() drops the frame rather than queueing it.
+
+    Results come back tagged with stream id and sequence number, either
+    from get() or, for synchronous callers, from process().
+
+    A worker found dead when a frame is submitted to it is respawned on the
+    same ring with every slot free; its streams stay pinned to it (with
+    fresh tracking state) and frames it had in flight are given up.
+    """
+
+    def __init__(self, workers=2, slots=RING_SLOTS, frame_shape=FRAME_SHAPE, pose_options=None):
+        self.ctx = mp.get_context('spawn')
+        self.num_workers = workers
+        self.slots = slots
+        self.frame_shape = tuple(frame_shape)
+        self.pose_options = pose_options or POSE_OPTIONS
+        self.output = queue.Queue()
+        self._lock = threading.Lock()
+        self._results = self.ctx.Queue()
+        self._workers = []
+        self._assignment = {}           # stream_id -> worker index
+        self._seq = collections.Counter()
+        self._waiters = {}              # (stream_id, seq) -> [Event, PoseResult], None once abandoned
+        self._collector = None
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+        self.frames_completed = 0
+        self.batches = 0
+        self.latency = 0.0
+
+    def _spawn(self, worker):
+        """(Re)start worker's process on its ring, with a new request queue and every slot free."""
+        index = self._workers.index(worker)
+        worker['requests'] = self.ctx.Queue()
+        worker['free'] = list(range(self.slots))
+        worker['generation'] += 1
+        worker['started_at'] = time.monotonic()
+        worker['process'] = self.ctx.Process(
+            target=pose_worker,
+            args=(worker['shm'].name, self.slots, self.frame_shape, worker['requests'],
+                  self._results, self.pose_options),
+            name=f"pose-worker-{index}",
+            daemon=True,
+        )
+        worker['process'].start()
+
+    def _respawn(self, index):
+        """Replace a dead worker; its in-flight frames are abandoned. Called with _lock held."""
+        worker = self._workers[index]
+        logger.error(f"Pose worker {index} died (exit code {worker['process'].exitcode}); restarting")
+        worker['process'].close()
+        worker['requests'].close()
+        # Wake process() callers waiting on this worker's streams
+        for key, waiter in self._waiters.items():
+            if waiter is not None and self._assignment.get(key[0]) == index:
+                waiter[0].set()
+                self._waiters[key] = None
+        worker['restarts'] += 1
+        self._spawn(worker)
+
+    def start(self):
+        for _ in range(self.num_workers):
+            shm = shared_memory.SharedMemory(create=True, size=self.slots * int(np.prod(self.frame_shape)))
+            worker = {
+                'shm': shm, 'ring': np.ndarray((self.slots,) + self.frame_shape, dtype=np.uint8, buffer=shm.buf),
+                'streams': 0, 'frames': 0, 'restarts': 0, 'generation': 0,
+            }
+            self._workers.append(worker)
+            self._spawn(worker)
+        self._collector = threading.Thread(target=self._collect, name="pose-pool-results", daemon=True)
+        self._collector.start()
+        logger.info(f"Pose pool started with {self.num_workers} workers")
+        return self
+
+    def _worker_for(self, stream_id):
+        index = self._assignment.get(stream_id)
+        if index is None:
+            index = min(range(len(self._workers)), key=lambda i: self._workers[i]['streams'])
+            self._assignment[stream_id] = index
+            self._workers[index]['streams'] += 1
+        return index
+
+    def submit(self, stream_id, frame, _waiter=None):
+        """
+        Queue an RGB frame of frame_shape for inference. Returns its sequence
+        number, or None if the stream's worker is busy and the frame was dropped.
+        """
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Expected frame of shape {self.frame_shape}, got {frame.shape}")
+        with self._lock:
+            index = self._worker_for(stream_id)
+            worker = self._workers[index]
+            if not worker['process'].is_alive():
+                if time.monotonic() - worker['started_at'] < RESPAWN_DELAY:
+                    self.frames_dropped += 1
+                    return None
+                self._respawn(index)
+            if not worker['free']:
+                self.frames_dropped += 1
+                return None
+            slot = worker['free'].pop()
+            generation = worker['generation']
+            requests = worker['requests']
+            self._seq[stream_id] += 1
+            seq = self._seq[stream_id]
+            self.frames_submitted += 1
+            if _waiter is not None:
+                self._waiters[(stream_id, seq)] = _waiter
+        worker['ring'][slot] = frame
+        requests.put((stream_id, slot, seq, time.perf_counter(), generation))
+        return seq
+
+    def _collect(self):
+        from mediapipe.framework.formats import landmark_pb2
+
+        while True:
+            replies = self._results.get()
+            if replies is None:
+                break
+            now = time.perf_counter()
+            self.batches += 1
+            for stream_id, slot, seq, landmarks, submitted_at, generation in replies:
+                if landmarks is not None:
+                    landmarks = landmark_pb2.NormalizedLandmarkList.FromString(landmarks)
+                result = PoseResult(stream_id, seq, landmarks, now - submitted_at)
+                with self._lock:
+                    worker = self._workers[self._assignment[stream_id]]
+                    # A reply sent just before its worker died: the slot was
+                    # already handed back when the worker was respawned
+                    if generation == worker['generation']:
+                        worker['free'].append(slot)
+                    worker['frames'] += 1
+                    self.frames_completed += 1
+                    self.latency += EWMA_ALPHA * (result.latency - self.latency)
+                    claimed = (stream_id, seq) in self._waiters
+                    waiter = self._waiters.pop((stream_id, seq), None)
+                if waiter is not None:
+                    waiter[1] = result
+                    waiter[0].set()
+                elif not claimed:
+                    self.output.put(result)
+
+    def get(self, timeout=None):
+        """Next result not claimed by process(); raises queue.Empty on timeout."""
+        return self.output.get(timeout=timeout)
+
+    def process(self, stream_id, frame, timeout=1.0):
+        """Synchronous inference for one frame; None if dropped or timed out."""
+        waiter = [threading.Event(), None]
+        seq = self.submit(stream_id, frame, _waiter=waiter)
+        if seq is None:
+            return None
+        if not waiter[0].wait(timeout):
+            with self._lock:
+                if (stream_id, seq) in self._waiters:
+                    # Late result: drop it rather than leave it in the output queue
+                    self._waiters[(stream_id, seq)] = None
+            return None
+        return waiter[1]
+
+    def client(self, stream_id, timeout=1.0):
+        return PoseClient(self, stream_id, timeout=timeout)
+
+    def stop(self):
+        for worker in self._workers:
+            worker['requests'].put(None)
+        for worker in self._workers:
+            worker['process'].join(5.0)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+        self._results.put(None)
+        if self._collector is not None:
+            self._collector.join()
+        for worker in self._workers:
+            del worker['ring']
+            worker['shm'].close()
+            worker['shm'].unlink()
+        self._workers = []
+
+    def stats(self):
+        return {
+            'workers': [
+                {'streams': w['streams'], 'frames': w['frames'], 'restarts': w['restarts'],
+                 'alive': w['process'].is_alive(), 'free_slots': len(w['free'])}
+                for w in self._workers
+            ],
+            'frames_submitted': self.frames_submitted,
+            'frames_completed': self.frames_completed,
+            'frames_dropped': self.frames_dropped,
+            'avg_batch': round(self.frames_completed / self.batches, 2) if self.batches else 0,
+            'latency_ms': round(self.latency * 1000, 2),
+        }
@@ -0,0 +1,190 @@
+# File: pose_tuner.py
+
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+from pose_pool import POSE_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+# ——— Candidate profiles ———
+# Most accurate first: model complexity matters more than input size,
+# since the landmark model always sees a 256x256 crop, but a larger input
+# gives the detector and the crop more pixels to work with.
+COMPLEXITIES = (2, 1, 0)
+INPUT_SIZES = ((640, 480), (480, 360), (320, 240))
+CANDIDATES = [
+    {"model_complexity": c, "input_size": size}
+    for c in COMPLEXITIES for size in INPUT_SIZES
+]
+
+# ——— Tuner parameters ———
+HEADROOM = 0.7          # share of the frame interval inference may use
+EWMA_ALPHA = 0.05       # smoothing of the measured inference latency
+DRIFT_TOLERANCE = 0.15  # step down when latency exceeds budget by this much
+STEP_UP_MARGIN = 0.8    # step up when the predicted latency is under budget * margin
+COOLDOWN_SECONDS = 30   # minimum time between profile switches
+MIN_SAMPLES = 30        # latency samples on a profile before judging it
+
+
+def profile_name(profile):
+    width, height = profile["input_size"]
+    return f"complexity {profile['model_complexity']} @ {width}x{height}"
+
+
+def benchmark_profile(profile, frames, seconds=1.5, warmup=5):
+    """
+    Median and p95 inference time (ms) of one profile on the given BGR
+    frames, run as process_frame would: mirrored, converted to RGB and
+    resized to the profile's input size.
+    """
+    import mediapipe as mp
+
+    width, height = profile["input_size"]
+    inputs = [cv2.resize(cv2.cvtColor(cv2.flip(f, 1), cv2.COLOR_BGR2RGB), (width, height),
+                         interpolation=cv2.INTER_AREA) for f in frames]
+    options = dict(POSE_OPTIONS, model_complexity=profile["model_complexity"])
+    with mp.solutions.pose.Pose(**options) as pose:
+        for i in range(warmup):
+            pose.process(inputs[i % len(inputs)])
+        samples = []
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            image = inputs[len(samples) % len(inputs)]
+            start = time.perf_counter()
+            pose.process(image)
+            samples.append(time.perf_counter() - start)
+    samples_ms = np.array(samples) * 1000
+    return {
+        "median_ms": round(float(np.median(samples_ms)), 2),
+        "p95_ms": round(float(np.percentile(samples_ms, 95)), 2),
+        "samples": len(samples),
+    }
+
+
+def sample_frames(capture, count=30):
+    """Frames for the startup benchmark: from the camera, or noise without one."""
+    frames = []
+    if capture is not None and capture.isOpened():
+        for _ in range(count):
+            success, frame = capture.read()
+            if success and frame is not None:
+                frames.append(cv2.resize(frame, (640, 480)))
+    if not frames:
+        # Noise keeps MediaPipe in its slower detection path: a pessimistic estimate
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(8)]
+    return frames
+
+
+class PoseTuner:
+    """
+    Picks the most accurate pose profile (model complexity + inference input
+    size) whose latency fits the frame budget on this machine.
+
+    calibrate() benchmarks every candidate at startup. At runtime record()
+    is fed the measured latency of each inference. When the smoothed latency
+    drifts over budget (thermal throttling, other load) the tuner steps
+    down to a faster profile. When there is room to spare, it steps back up
+    if the calibrated cost of the next profile, scaled by the drift now
+    observed, still fits. apply(profile) is called on every switch.
+    """
+
+    def __init__(self, target_fps, apply=None, candidates=None, headroom=HEADROOM):
+        self.target_fps = target_fps
+        self.budget_ms = 1000.0 / target_fps * headroom
+        self.apply = apply
+        self.candidates = list(candidates or CANDIDATES)
+        self.benchmarks = {}     # candidate index -> benchmark_profile result
+        self.usable = []         # candidate indexes that ran, most accurate first
+        self.current = None      # index into candidates
+        self.ewma_ms = None
+        self.samples = 0
+        self.last_switch = 0.0
+        self.switches = []
+        self._lock = threading.Lock()
+
+    @property
+    def profile(self):
+        return self.candidates[self.current] if self.current is not None else None
+
+    def calibrate(self, frames, seconds=1.5):
+        """Benchmark every candidate and switch to the best one that fits."""
+        for index, profile in enumerate(self.candidates):
+            try:
+                result = benchmark_profile(profile, frames, seconds)
+            except Exception as e:
+                # e.g. the heavy model can't be downloaded on an offline kiosk
+                logger.warning(f"Skipping pose profile {profile_name(profile)}: {e}")
+                continue
+            self.benchmarks[index] = result
+            self.usable.append(index)
+            logger.info(f"Pose profile {profile_name(profile)}: {result['median_ms']} ms median, "
+                        f"{result['p95_ms']} ms p95")
+        if not self.usable:
+            raise RuntimeError("No pose profile could be benchmarked")
+
+        fitting = [i for i in self.usable if self.benchmarks[i]["p95_ms"] <= self.budget_ms]
+        # Nothing fits: take the fastest so we get as close to the target as possible
+        best = fitting[0] if fitting else min(self.usable, key=lambda i: self.benchmarks[i]["median_ms"])
+        self._switch(best, "calibration")
+        return self.profile
+
+    def record(self, latency_s):
+        """Feed one inference latency (seconds); may switch profile."""
+        with self._lock:
+            if self.current is None:
+                return
+            ms = latency_s * 1000
+            self.ewma_ms = ms if self.ewma_ms is None else self.ewma_ms + EWMA_ALPHA * (ms - self.ewma_ms)
+            self.samples += 1
+            if self.samples < MIN_SAMPLES or time.time() - self.last_switch < COOLDOWN_SECONDS:
+                return
+            position = self.usable.index(self.current)
+            if self.ewma_ms > self.budget_ms * (1 + DRIFT_TOLERANCE) and position + 1 < len(self.usable):
+                self._switch(self.usable[position + 1], f"latency {self.ewma_ms:.1f} ms over budget")
+            elif position > 0:
+                up = self.usable[position - 1]
+                drift = self.ewma_ms / self.benchmarks[self.current]["median_ms"]
+                predicted = self.benchmarks[up]["median_ms"] * drift
+                if predicted < self.budget_ms * STEP_UP_MARGIN:
+                    self._switch(up, f"predicted {predicted:.1f} ms fits budget")
+
+    def _switch(self, index, reason):
+        previous = self.current
+        self.current = index
+        self.ewma_ms = None
+        self.samples = 0
+        self.last_switch = time.time()
+        self.switches.append({
+            "at": self.last_switch,
+            "from": profile_name(self.candidates[previous]) if previous is not None else None,
+            "to": profile_name(self.candidates[index]),
+            "reason": reason,
+        })
+        del self.switches[:-20]
+        logger.info(f"Pose profile -> {profile_name(self.candidates[index])} ({reason})")
+        if self.apply:
+            self.apply(self.candidates[index])
+
+    def stats(self):
+        with self._lock:
+            profile = self.profile
+            return {
+                "target_fps": self.target_fps,
+                "budget_ms": round(self.budget_ms, 2),
+                "profile": {
+                    "model_complexity": profile["model_complexity"],
+                    "input_size": list(profile["input_size"]),
+                    "name": profile_name(profile),
+                } if profile else None,
+                "measured_ms": round(self.ewma_ms, 2) if self.ewma_ms is not None else None,
+                "benchmarks": [
+                    dict(self.benchmarks[i], name=profile_name(self.candidates[i]))
+                    for i in self.usable
+                ],
+                "switches": list(self.switches),
+            }
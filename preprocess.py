@@ -0,0 +1,85 @@
+# File: preprocess.py
+
+import cv2
+import numpy as np
+from streaming import FrameRing
+
+# ——— Parameters ———
+FRAME_SIZE = (640, 480)   # (width, height) every frame is processed and streamed at
+OUTPUT_RING = 4           # mirrored output frames in circulation
+
+# Left/right landmark pairs of the 33-point pose model (nose, 0, has none)
+MIRROR_PAIRS = ((1, 4), (2, 5), (3, 6), (7, 8), (9, 10), (11, 12), (13, 14), (15, 16),
+                (17, 18), (19, 20), (21, 22), (23, 24), (25, 26), (27, 28), (29, 30), (31, 32))
+
+
+class FramePreprocessor:
+    """
+    Camera frame -> (display frame, model input) without per-frame
+    allocations. Every OpenCV step writes into a buffer allocated once:
+
+    - resize to FRAME_SIZE, skipped when the camera already delivers it
+    - BGR -> RGB for the model, from the unflipped image (plus a resize
+      when the model input size differs)
+    - a mirrored copy for display, written into the next free slot of a
+      FrameRing: published frames are handed to the FrameFeed, and a slot
+      is only reused once the feed and every viewer have let go of it
+
+    The model sees the unflipped image, so its landmarks are turned into
+    the mirrored view with mirror_landmarks().
+
+    One instance per capture thread; it is not thread-safe.
+    """
+
+    def __init__(self, frame_size=FRAME_SIZE, ring=OUTPUT_RING):
+        width, height = frame_size
+        self.frame_size = (width, height)
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        self._rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self._input = None   # model-sized RGB buffer, allocated per input size
+        self.ring = FrameRing((height, width, 3), ring)
+
+    def fit(self, frame):
+        """frame at FRAME_SIZE: the frame itself if it already is, else a reused buffer."""
+        height, width = frame.shape[:2]
+        if (width, height) == self.frame_size:
+            return frame
+        return cv2.resize(frame, self.frame_size, dst=self._resized)
+
+    def model_input(self, frame, input_size=None):
+        """RGB copy of a FRAME_SIZE frame for the pose model (not mirrored)."""
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        if input_size is None or tuple(input_size) == self.frame_size:
+            return rgb
+        width, height = input_size
+        if self._input is None or self._input.shape[:2] != (height, width):
+            self._input = np.empty((height, width, 3), dtype=np.uint8)
+        return cv2.resize(rgb, (width, height), dst=self._input, interpolation=cv2.INTER_AREA)
+
+    def mirrored(self, frame):
+        """Mirror image of a FRAME_SIZE frame in the next ring slot, for drawing and display."""
+        return cv2.flip(frame, 1, dst=self.ring.next())
+
+    def display(self, frame):
+        """Unprocessed frames: fitted and mirrored, as process_frame would show them."""
+        return self.mirrored(self.fit(frame))
+
+
+_swap = None
+
+def mirror_landmarks(landmark_list):
+    """
+    In place: landmarks found on the unflipped image -> the landmarks the
+    model would report on the mirrored one (x -> 1 - x, left <-> right).
+    """
+    global _swap
+    landmarks = landmark_list.landmark
+    for landmark in landmarks:
+        landmark.x = 1.0 - landmark.x
+    if _swap is None:
+        _swap = type(landmarks[0])()
+    for left, right in MIRROR_PAIRS:
+        _swap.CopyFrom(landmarks[left])
+        landmarks[left].CopyFrom(landmarks[right])
+        landmarks[right].CopyFrom(_swap)
+    return landmark_list
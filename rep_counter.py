@@ -0,0 +1,200 @@
+# File: rep_counter.py
+
+import copy
+import math
+import numpy as np
+
+# ——— Default thresholds (mirrors curl_detector) ———
+DEFAULT_FLEXION_THRESHOLD   = 45   # degrees: angle at top of curl
+DEFAULT_EXTENSION_THRESHOLD = 170  # degrees: angle at bottom
+DEFAULT_TOLERANCE           = 15   # degrees of hysteresis on each side
+
+
+class OneEuroFilter:
+    """
+    Scalar One Euro filter (Casiez et al.) for low-latency angle smoothing.
+    Slow movements are smoothed heavily, fast ones follow the signal closely.
+    """
+    __slots__ = ("min_cutoff", "beta", "d_cutoff", "_x", "_dx", "_t")
+
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._dx = 0.0
+        self._t = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2.0 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, t):
+        if self._x is None:
+            self._x = x
+            self._t = t
+            return x
+
+        dt = t - self._t
+        if dt <= 0:
+            return self._x
+        self._t = t
+
+        a_d = self._alpha(self.d_cutoff, dt)
+        self._dx = a_d * ((x - self._x) / dt) + (1.0 - a_d) * self._dx
+
+        cutoff = self.min_cutoff + self.beta * abs(self._dx)
+        a = self._alpha(cutoff, dt)
+        self._x = a * x + (1.0 - a) * self._x
+        return self._x
+
+
+class RepCounter:
+    """
+    Hysteresis state machine that turns a joint-angle signal into reps.
+
+    The joint is "down" (extended) once the angle rises above
+    `extension_threshold - tolerance`, and a rep is counted when a "down"
+    joint drops below `flexion_threshold + tolerance`. The band in between
+    is the hysteresis that keeps jitter from double counting.
+
+    Two APIs share the same thresholds:
+      * update(angle, ts) — streaming, O(1), keeps only scalar state
+      * count(angles, timestamps) — vectorized segmentation of a whole array
+    """
+    __slots__ = (
+        "flexion_threshold", "extension_threshold", "tolerance",
+        "filter", "stage", "reps", "rep_start_ts", "last_rep_ts",
+        "last_rep_duration", "last_angle",
+    )
+
+    def __init__(self,
+                 flexion_threshold=DEFAULT_FLEXION_THRESHOLD,
+                 extension_threshold=DEFAULT_EXTENSION_THRESHOLD,
+                 tolerance=DEFAULT_TOLERANCE,
+                 smoothing=None):
+        """
+        smoothing: optional OneEuroFilter (or any callable(x, t) -> x)
+                   applied to the angle before the threshold checks.
+        """
+        self.flexion_threshold = flexion_threshold
+        self.extension_threshold = extension_threshold
+        self.tolerance = tolerance
+        self.filter = smoothing
+        self.reset()
+
+    @property
+    def lower(self):
+        """Angle below which an extended joint counts a rep."""
+        return self.flexion_threshold + self.tolerance
+
+    @property
+    def upper(self):
+        """Angle above which the joint is considered extended."""
+        return self.extension_threshold - self.tolerance
+
+    def reset(self, stage="down"):
+        """Clear reps and timing, e.g. at the end of a set."""
+        self.stage = stage
+        self.reps = 0
+        self.rep_start_ts = None
+        self.last_rep_ts = None
+        self.last_rep_duration = 0
+        self.last_angle = 0.0
+        if self.filter is not None and hasattr(self.filter, "reset"):
+            self.filter.reset()
+
+    def update(self, angle, ts):
+        """
+        Feed one angle sample. Returns True when this sample completes a rep;
+        `last_rep_duration` and `last_rep_ts` are then valid for that rep.
+        """
+        if self.filter is not None:
+            angle = self.filter(angle, ts)
+        self.last_angle = angle
+
+        if angle > self.extension_threshold - self.tolerance:
+            self.stage = "down"
+            if self.rep_start_ts is None:
+                self.rep_start_ts = ts
+
+        if self.stage == "down" and angle < self.flexion_threshold + self.tolerance:
+            self.stage = "up"
+            self.reps += 1
+            self.last_rep_duration = ts - self.rep_start_ts if self.rep_start_ts is not None else 0
+            self.last_rep_ts = ts
+            self.rep_start_ts = None
+            return True
+        return False
+
+    def count(self, angles, timestamps=None):
+        """
+        Segment a whole angle series into reps in one vectorized pass.
+
+        Starts from a fresh "down" state (like a new set) and does not touch
+        the streaming state. When a smoothing filter is configured it is
+        recursive, so a fresh copy is run over the series first.
+
+        Returns a dict:
+            reps        — number of completed reps
+            start_index — index where each rep's extension began (-1 if the
+                          series started mid-rep)
+            end_index   — index of the sample that completed each rep
+            start_ts / end_ts / durations — same, in timestamp units
+                          (durations are 0 where start_index is -1)
+        """
+        angles = np.asarray(angles, dtype=np.float64)
+        n = angles.shape[0]
+        if timestamps is None:
+            timestamps = np.arange(n, dtype=np.float64)
+        else:
+            timestamps = np.asarray(timestamps, dtype=np.float64)
+
+        if self.filter is not None and n:
+            angles = self._smooth(angles, timestamps)
+
+        # +1 = extended (enter "down"), -1 = flexed (candidate rep), 0 = band
+        events = (angles > self.upper).astype(np.int8)
+        events -= angles < self.lower
+        idx = np.flatnonzero(events)
+        vals = events[idx]
+
+        # Seed with a virtual "down" at index -1 (a fresh counter starts down).
+        # It gets its own value so it never merges with a real extension run.
+        idx = np.concatenate(([-1], idx))
+        vals = np.concatenate(([2], vals))
+
+        ends = np.flatnonzero((vals[1:] == -1) & (vals[:-1] > 0)) + 1
+
+        # The rep started at the first extension of the run preceding its end
+        run_start = np.r_[True, vals[1:] != vals[:-1]]
+        first_of_run = np.maximum.accumulate(np.where(run_start, np.arange(vals.size), 0))
+        start_index = idx[first_of_run[ends - 1]]
+        end_index = idx[ends]
+
+        end_ts = timestamps[end_index]
+        has_start = start_index >= 0
+        start_ts = np.where(has_start, timestamps[np.maximum(start_index, 0)], np.nan)
+        durations = np.where(has_start, end_ts - np.nan_to_num(start_ts), 0.0)
+
+        return {
+            "reps": int(end_index.size),
+            "start_index": start_index,
+            "end_index": end_index,
+            "start_ts": start_ts,
+            "end_ts": end_ts,
+            "durations": durations,
+        }
+
+    def _smooth(self, angles, timestamps):
+        fresh = copy.copy(self.filter)
+        if hasattr(fresh, "reset"):
+            fresh.reset()
+        out = np.empty_like(angles)
+        for i in range(angles.shape[0]):
+            out[i] = fresh(float(angles[i]), float(timestamps[i]))
+        return out
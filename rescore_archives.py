@@ -0,0 +1,181 @@
+"""
+Recompute rep counts and form metrics for archived sessions with new
+thresholds, without re-running pose estimation.
+
+    python rescore_archives.py archives/
+    python rescore_archives.py archives/ --flexion 50 --tolerance 10 --workers 8 \
+        --output rescored.json
+
+Archives are written by curl_detector when the server runs with
+--archive-landmarks DIR (see landmark_archive.py). Each one is
+memory-mapped, so only the frames of each set are read (rest between sets
+is skipped), and archives are scored in parallel worker processes. Per-set results sit next
+to the rep counts the live session recorded.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from exercises import LANDMARK_INDEX, VIS, joint_angles
+from landmark_archive import find_archives, open_archive
+from rep_counter import (
+    RepCounter, DEFAULT_FLEXION_THRESHOLD, DEFAULT_EXTENSION_THRESHOLD, DEFAULT_TOLERANCE,
+)
+
+# ——— Defaults (mirror curl_detector) ———
+VISIBILITY_THRESH = 0.5
+ELBOW_FLARE_THRESHOLD = 15
+TORSO_LEAN_THRESHOLD = 10
+SHOULDER_ELEVATION_THRESHOLD = 0.1
+ROM_THRESHOLD = 80   # rom_percentage below this is a partial rep
+
+# shoulder, elbow, wrist, hip per side
+ARMS = {
+    side: [LANDMARK_INDEX[f"{side.upper()}_{part}"] for part in ("SHOULDER", "ELBOW", "WRIST", "HIP")]
+    for side in ("left", "right")
+}
+
+
+def arm_series(lm, arm, bilateral):
+    """
+    Per-frame angle, form metrics and visibility mask for one arm over an
+    (N, 33, 4) landmark block, using the live formulas. Single-arm sessions
+    gate on the elbow, bilateral ones on the whole arm, as curl_detector does.
+    """
+    lm = np.asarray(lm[:, arm], dtype=np.float32)   # float32 copy of just the four arm landmarks
+    angle = joint_angles(lm, 0, 1, 2)
+    torso = lm[:, 0, :2] - lm[:, 3, :2]
+    visible = np.all(lm[:, :, VIS] >= VISIBILITY_THRESH, axis=1) if bilateral else lm[:, 1, VIS] >= VISIBILITY_THRESH
+    return {
+        "angle": angle,
+        "elbow_flare": angle,
+        "torso_lean": np.abs(np.degrees(np.arctan2(torso[:, 0], torso[:, 1]))),
+        "shoulder_elevation": np.abs(torso[:, 1]),
+        "visible": visible,
+    }
+
+
+def score_set(lm, timestamps, arm, config, bilateral):
+    series = arm_series(lm, arm, bilateral)
+    visible = series["visible"]
+    angles = series["angle"][visible]
+    counter = RepCounter(config["flexion"], config["extension"], config["tolerance"])
+    result = counter.count(angles, timestamps[visible])
+
+    # Metrics at the frame that completed each rep, like the live tracker
+    at = result["end_index"]
+    metrics = {
+        "elbow_flare": series["elbow_flare"][visible][at],
+        "torso_lean": series["torso_lean"][visible][at],
+        "shoulder_elevation": series["shoulder_elevation"][visible][at],
+        "rom_percentage": angles[at] / config["extension"] * 100,
+    }
+    issues = {
+        "elbow_flare": int(np.sum(metrics["elbow_flare"] > config["elbow_flare_threshold"])),
+        "torso_lean": int(np.sum(metrics["torso_lean"] > config["torso_lean_threshold"])),
+        "shoulder_elevation": int(np.sum(metrics["shoulder_elevation"] > config["shoulder_elevation_threshold"])),
+        "partial_rom": int(np.sum(metrics["rom_percentage"] < config["rom_threshold"])),
+    }
+    return {
+        "reps": result["reps"],
+        "frames": int(visible.size),
+        "visible_frames": int(visible.sum()),
+        "durations": [round(float(d), 2) for d in result["durations"]],
+        "averages": {k: round(float(v.mean()), 2) if v.size else 0 for k, v in metrics.items()},
+        "issues": issues,
+    }
+
+
+def rescore_archive(path, config):
+    """Score every set of one archive; returns a JSON-serializable report."""
+    archive = open_archive(path)
+    meta = archive["meta"]
+    sets = np.asarray(archive["sets"])
+    timestamps = archive["timestamps"]
+    bilateral = bool(meta.get("bilateral"))
+    sides = ("left", "right") if bilateral else ("left",)
+
+    report = {
+        "path": path,
+        "sessionId": meta.get("sessionId"),
+        "user_id": meta.get("user_id"),
+        "frames": int(sets.size),
+        "sets": [],
+    }
+    # Set 0 is rest between sets
+    for number in np.unique(sets[sets > 0]):
+        rows = np.flatnonzero(sets == number)
+        lm = archive["landmarks"][rows]
+        ts = np.asarray(timestamps[rows])
+        entry = {
+            "setNumber": int(number),
+            "liveReps": meta.get("liveReps", {}).get(str(number)),
+        }
+        for side in sides:
+            scored = score_set(lm, ts, ARMS[side], config, bilateral)
+            if bilateral:
+                entry[side] = scored
+            else:
+                entry.update(scored)
+        if bilateral:
+            entry["reps"] = entry["left"]["reps"] + entry["right"]["reps"]
+        report["sets"].append(entry)
+    report["reps"] = sum(s["reps"] for s in report["sets"])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help="Archive directories, or roots to search for them")
+    parser.add_argument('--flexion', type=float, default=DEFAULT_FLEXION_THRESHOLD)
+    parser.add_argument('--extension', type=float, default=DEFAULT_EXTENSION_THRESHOLD)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--elbow-flare-threshold', type=float, default=ELBOW_FLARE_THRESHOLD)
+    parser.add_argument('--torso-lean-threshold', type=float, default=TORSO_LEAN_THRESHOLD)
+    parser.add_argument('--shoulder-elevation-threshold', type=float, default=SHOULDER_ELEVATION_THRESHOLD)
+    parser.add_argument('--rom-threshold', type=float, default=ROM_THRESHOLD)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--output', help="Write the full JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    config = {
+        "flexion": args.flexion,
+        "extension": args.extension,
+        "tolerance": args.tolerance,
+        "elbow_flare_threshold": args.elbow_flare_threshold,
+        "torso_lean_threshold": args.torso_lean_threshold,
+        "shoulder_elevation_threshold": args.shoulder_elevation_threshold,
+        "rom_threshold": args.rom_threshold,
+    }
+    paths = sorted({p for root in args.paths for p in find_archives(root)})
+    if not paths:
+        sys.exit("No landmark archives found")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        reports = list(pool.map(rescore_archive, paths, [config] * len(paths)))
+    seconds = time.perf_counter() - start
+
+    frames = sum(r["frames"] for r in reports)
+    summary = {
+        "config": config,
+        "archives": len(reports),
+        "frames": frames,
+        "seconds": round(seconds, 2),
+        "sessions": reports,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    else:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    print(f"Rescored {len(reports)} archives ({frames} frames) in {seconds:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+# File: session_control.py
+
+import logging
+import threading
+import curl_detector
+from exercises import EXERCISES
+from session_tracker import ExerciseSession
+
+logger = logging.getLogger(__name__)
+
+def rep_sink():
+    """Where finished sets' reps go, or None when the rep time series is off"""
+    try:
+        from app.config import settings
+    except Exception as e:
+        # No database configured (e.g. no .env): sessions still save to JSON
+        logger.warning(f"Rep time series disabled: {e}")
+        return None
+    return curl_detector.save_rep_series if settings.rep_timeseries else None
+
+# Exercise the live rep counter and form metrics track
+LIVE_EXERCISE = 'bicep_curl'
+
+# Add session state tracking
+SESSION_STATES = {
+    'INACTIVE': 0,
+    'SESSION_STARTED': 1,
+    'SET_IN_PROGRESS': 2,
+    'SET_COMPLETED': 3,
+    'FEEDBACK_REQUIRED': 4
+}
+
+
+class SessionController:
+    """
+    Session/set state machine behind the session-control endpoints.
+
+    Every command takes the request payload (a dict, or None) and returns
+    a (body, status_code) tuple, so the same logic serves the Flask routes
+    and commands arriving over the live WebSocket.
+    """
+
+    def __init__(self):
+        self.current_session = None
+        self.session_active = False
+        self.current_state = SESSION_STATES['INACTIVE']
+        self.last_set_metrics = {}
+        self.last_set_exercises = None
+        self._lock = threading.RLock()
+
+    def validate_state_transition(self, expected_state, next_state, operation):
+        """Validate if the requested operation is allowed in current state"""
+        if self.current_state != expected_state:
+            raise ValueError(f"Invalid operation: {operation}. Must complete previous steps first.")
+        self.current_state = next_state
+        return True
+
+    def _reset(self):
+        self.current_state = SESSION_STATES['INACTIVE']
+        self.current_session = None
+        self.session_active = False
+
+    def start_session(self, payload):
+        with self._lock:
+            payload = payload or {}
+            try:
+                if self.current_session is not None:
+                    raise ValueError("Session already in progress. End current session first.")
+
+                self.validate_state_transition(SESSION_STATES['INACTIVE'],
+                                               SESSION_STATES['SESSION_STARTED'],
+                                               'start_session')
+
+                weight = payload.get('weight', 0)
+                # Remove weight validation to allow 0
+
+                user_context = payload.get('userContext', {
+                    "goal": "Technique Improvement",
+                    "experienceLevel": "Beginner",
+                    "notes": None
+                })
+                equipment = {
+                    "type": "Dumbbells",
+                    "weight": float(weight),
+                    "unit": "lbs"
+                }
+
+                # Reps and form metrics come from the curl tracker; other exercises
+                # only run as analyzers, whose detections are stored per set
+                exercise = payload.get('exercise') or LIVE_EXERCISE
+                if exercise not in (LIVE_EXERCISE, EXERCISES[LIVE_EXERCISE]['name']):
+                    raise ValueError(f"Live tracking supports only {LIVE_EXERCISE}; "
+                                     f"add '{exercise}' to analyzers instead")
+                exercise = EXERCISES[LIVE_EXERCISE]['name']
+
+                # Optional extra analyzers (e.g. ["squat", "shoulder_press"]) that run
+                # on the same pose inference for auto-detection
+                analyzers = payload.get('analyzers') or None
+
+                # Track both arms with independent rep counters
+                bilateral = bool(payload.get('bilateral', False))
+
+                self.current_session = ExerciseSession(user_context=user_context, equipment=equipment,
+                                                       exercise=exercise, bilateral=bilateral,
+                                                       rep_sink=rep_sink(),
+                                                       recorder=curl_detector.set_recorder)
+                curl_detector.set_exercises(analyzers)
+                curl_detector.init_session(self.current_session, bilateral=bilateral)
+                self.session_active = True
+                logger.info(f"{exercise} session started with weight: {weight}lbs")
+
+                return {
+                    "status": "success",
+                    "state": "session_started",
+                    "message": f"Session started with {weight}lbs"
+                }, 200
+            except (ValueError, TypeError) as ve:
+                self._reset()
+                logger.error(f"Validation error in start_session: {ve}")
+                return {"status": "error", "message": str(ve)}, 400
+            except Exception as e:
+                self._reset()
+                logger.error(f"Error starting session: {e}")
+                return {"status": "error", "message": f"Failed to start session: {str(e)}"}, 500
+
+    def start_set(self, payload=None):
+        """Start a new set within the current session."""
+        with self._lock:
+            try:
+                self.validate_state_transition(SESSION_STATES['SESSION_STARTED'],
+                                               SESSION_STATES['SET_IN_PROGRESS'],
+                                               'start_set')
+
+                if self.current_session:
+                    self.current_session.start_set()
+                    return {"status": "success", "message": "Set started successfully"}, 200
+                return {"status": "error", "message": "No active session"}, 400
+            except ValueError as ve:
+                return {"status": "error", "message": str(ve)}, 400
+            except Exception as e:
+                logger.error(f"Error starting set: {e}")
+                return {"status": "error", "message": str(e)}, 500
+
+    def end_set(self, payload=None):
+        with self._lock:
+            try:
+                if self.current_state != SESSION_STATES['SET_IN_PROGRESS']:
+                    raise ValueError("No active set to end")
+                if not self.current_session:
+                    raise ValueError("No active session found")
+
+                # Call the end_set function from curl_detector to reset counters
+                final_metrics = curl_detector.end_set()
+                self.current_session.stop_set()
+
+                # Calculate aggregate metrics for the set
+                if hasattr(self.current_session, 'rep_data') and self.current_session.rep_data:
+                    set_metrics = self.current_session._calculate_set_metrics()
+                else:
+                    set_metrics = {}
+
+                # Update state
+                self.current_state = SESSION_STATES['FEEDBACK_REQUIRED']
+                self.last_set_metrics = set_metrics
+                self.last_set_exercises = final_metrics.get('exercises')
+
+                return {
+                    "status": "success",
+                    "message": "Set ended. Please provide feedback.",
+                    "state": "feedback_required",
+                    "metrics": set_metrics,  # Send aggregate metrics
+                    "total_reps": final_metrics.get('total_reps', 0)
+                }, 200
+            except ValueError as ve:
+                return {"status": "error", "message": str(ve)}, 400
+            except Exception as e:
+                logger.error(f"Error ending set: {e}")
+                return {"status": "error", "message": str(e)}, 500
+
+    def submit_set_feedback(self, payload):
+        with self._lock:
+            try:
+                if self.current_state != SESSION_STATES['FEEDBACK_REQUIRED']:
+                    raise ValueError("Cannot submit feedback - no set ended")
+
+                if payload is None:
+                    raise ValueError("Feedback must be provided")
+
+                # Extract feedback from request
+                feedback = {
+                    "rpe": payload.get('rpe'),
+                    "rir": payload.get('rir'),
+                    "fatiguePointReason": payload.get('fatigueReason'),
+                    "muscleFeelFocus": payload.get('muscleFocus', "Biceps"),
+                    "painFlag": payload.get('painFlag', False),
+                    "painLocation": payload.get('painLocation'),
+                    "notes": payload.get('notes'),
+                    "metrics": self.last_set_metrics  # Add metrics if available
+                }
+
+                # Validate required fields
+                if feedback['rpe'] is None or feedback['rir'] is None:
+                    raise ValueError("RPE and RIR are required feedback fields")
+
+                if self.current_session:
+                    self.current_session.end_set(subjective_feedback=feedback,
+                                                 exercises=self.last_set_exercises)
+                    self.current_state = SESSION_STATES['SESSION_STARTED']
+                    logger.info(f"Set feedback recorded successfully: RPE={feedback['rpe']}, RIR={feedback['rir']}")
+
+                    return {
+                        "status": "success",
+                        "message": "Feedback recorded successfully"
+                    }, 200
+
+                raise ValueError("No active session found")
+
+            except Exception as e:
+                logger.error(f"Error submitting feedback: {str(e)}")
+                return {"status": "error", "message": str(e)}, 500
+
+    def update_session_notes(self, payload):
+        with self._lock:
+            try:
+                if self.current_session and payload is not None:
+                    notes = payload.get('notes')
+                    self.current_session.update_notes(notes)
+                    return {"status": "success"}, 200
+                return {"status": "error", "message": "No active session"}, 400
+            except Exception as e:
+                logger.error(f"Error updating notes: {e}")
+                return {"status": "error", "message": str(e)}, 500
+
+    def end_session(self, payload):
+        with self._lock:
+            session_data = payload or {}
+            try:
+                # Ensure numeric fields are properly converted
+                if "feedback" in session_data:
+                    if "rpe" in session_data["feedback"]:
+                        session_data["feedback"]["rpe"] = float(session_data["feedback"]["rpe"])
+                    if "rir" in session_data["feedback"]:
+                        session_data["feedback"]["rir"] = int(session_data["feedback"]["rir"])
+                    if "totalSets" in session_data["feedback"]:
+                        session_data["feedback"]["totalSets"] = int(session_data["feedback"]["totalSets"])
+
+                result = curl_detector.end_current_session(session_data)
+                if result:
+                    self._reset()
+                    return {"status": "success", "message": "Session ended successfully"}, 200
+                return {"status": "error", "message": "Failed to end session"}, 200
+            except ValueError as ve:
+                logger.error(f"Error ending session: {ve}")
+                return {"status": "error", "message": str(ve)}, 400
+            except Exception as e:
+                logger.error(f"Error ending session: {e}")
+                return {"status": "error", "message": str(e)}, 500
+
+    # Commands available to non-HTTP transports (WebSocket, station workers)
+    COMMANDS = (
+        'start_session', 'start_set', 'end_set', 'submit_set_feedback',
+        'update_session_notes', 'end_session',
+    )
+
+    def dispatch(self, command, payload=None):
+        """Run a session command by name; unknown commands are a 400."""
+        if command not in self.COMMANDS:
+            return {"status": "error", "message": f"Unknown command: {command}"}, 400
+        return getattr(self, command)(payload)
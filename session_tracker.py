@@ -3,13 +3,16 @@ from datetime import datetime
 import uuid
 import statistics
 import time
+from set_stats import SetStats
 
 class ExerciseSession:
-    def __init__(self, user_context=None, equipment=None):
+    def __init__(self, user_context=None, equipment=None, exercise="Bicep Curl", bilateral=False,
+                 rep_sink=None, recorder=None):
         self.session_data = {
             "sessionId": str(uuid.uuid4()),
             "dateTime": datetime.utcnow().isoformat(),
-            "exercise": "Bicep Curl",
+            "exercise": exercise,
+            "bilateral": bilateral,
             "userContext": user_context or {
                 "goal": "Technique Improvement",
                 "experienceLevel": "Beginner",
@@ -37,14 +40,38 @@ class ExerciseSession:
         self.current_set = 1
         self.last_set_time = None
         self.rep_data = []
+        self.set_stats = SetStats(bilateral)  # updated per rep in add_rep_data
         self.set_start_time = None
+        self.in_set = False     # between start_set() and stop_set(); frames outside are rest
         self.start_time = time.time()
+        self.bilateral = bilateral
+        # Called as rep_sink(session_data, set_data) when a set is recorded
+        self.rep_sink = rep_sink
+        # SetRecorder writing one video file per set (see set_recorder.py)
+        self.recorder = recorder
+        self.recording = None
 
     def start_set(self):
         """Initialize a new set"""
         self.rep_data = []
+        self.set_stats = SetStats(self.bilateral)
         self.set_start_time = time.time()
+        self.in_set = True
         self.last_rep_time = None
+        self.recording = None
+        if self.recorder:
+            self.recorder.start_segment(f"{self.session_data['sessionId']}_set{self.current_set:02d}")
+
+    def stop_set(self):
+        """The set is over (feedback may still follow): stop tagging frames and its video"""
+        self.in_set = False
+        return self.finish_recording()
+
+    def finish_recording(self):
+        """Stop the set's video (e.g. when the set ends, before feedback is entered)"""
+        if self.recorder and self.recorder.recording:
+            self.recording = self.recorder.stop_segment()
+        return self.recording
 
     def add_rep_data(self, metrics):
         """Add data for a single rep with timing information"""
@@ -54,6 +81,7 @@ class ExerciseSession:
         if isinstance(metrics, dict) and "repNumber" in metrics and "metrics" in metrics:
             # It's already properly formatted
             self.rep_data.append(metrics)
+            self.set_stats.add(metrics)
             self.last_rep_time = current_time
             return
         
@@ -86,14 +114,26 @@ class ExerciseSession:
             })
             
             self.rep_data.append(rep_metrics)
+            self.set_stats.add(rep_metrics)
             self.last_rep_time = current_time
         except Exception as e:
             # Log error but don't crash
             print(f"Error adding rep data: {e}")
 
-    def end_set(self, subjective_feedback=None):
-        """End current set and calculate metrics"""
+    def end_set(self, subjective_feedback=None, exercises=None):
+        """
+        End current set and calculate metrics. `exercises` is the exercise
+        analyzers' summary of the set (ExerciseBank.summary()), if they ran;
+        it is stored alongside and does not change what the set counted.
+        A set without reps is not stored, but it uses up its number, so its
+        video stays linked from the session's emptySetRecordings instead of
+        being overwritten by the next set's.
+        """
+        recording = self.stop_set()
         if not self.rep_data:
+            if recording:
+                self.session_data.setdefault("emptySetRecordings", []).append(recording)
+            self.current_set += 1
             return
 
         # Update weight if changed
@@ -111,6 +151,7 @@ class ExerciseSession:
         # Prepare set data
         set_data = {
             "setNumber": self.current_set,
+            "exercise": self.session_data["exercise"],
             "weight": self.session_data["equipment"]["weight"],
             "targetReps": 10,
             "actualReps": len(self.rep_data),
@@ -120,76 +161,33 @@ class ExerciseSession:
             "subjectiveFeedback": subjective_feedback or self._default_feedback(),
             "repsData": self.rep_data  # Store individual rep data
         }
+        if recording:
+            set_data["recording"] = recording
+        if exercises:
+            set_data.update(exercises)
 
         self.session_data["sets"].append(set_data)
         self.current_set += 1
         self.last_set_time = time.time()
 
-    def _calculate_set_metrics(self):
-        """Calculate averaged and max metrics for the set"""
-        if not self.rep_data:
-            return {}
+        if self.rep_sink:
+            try:
+                self.rep_sink(self.session_data, set_data)
+            except Exception as e:
+                # Storage problems must not lose the set itself
+                print(f"Error storing rep data: {e}")
 
-        def safe_avg(values):
-            return statistics.mean(values) if values else 0
+    def _calculate_set_metrics(self):
+        """Averaged and max metrics for the set, from the running aggregates"""
+        return self.set_stats.summary()
 
-        def safe_max(values):
-            return max(values) if values else 0
+    def _calculate_asymmetry(self):
+        """Compare left and right arm reps in the current set (bilateral mode)"""
+        return self.set_stats.asymmetry()
 
-        try:
-            # Extract metrics from rep data
-            elbow_flares = []
-            torso_leans = []
-            rom_percentages = []
-            
-            for rep in self.rep_data:
-                if "metrics" in rep:
-                    metrics = rep["metrics"]
-                    if "elbow_flare" in metrics:
-                        elbow_flares.append(metrics["elbow_flare"])
-                    if "torso_lean" in metrics:
-                        torso_leans.append(metrics["torso_lean"])
-                    if "rom_percentage" in metrics:
-                        rom_percentages.append(metrics["rom_percentage"])
-            
-            # Calculate timing data if available
-            rep_durations = []
-            inter_rep_times = []
-            for rep in self.rep_data:
-                if "timing" in rep:
-                    timing = rep["timing"]
-                    if "duration" in timing:
-                        rep_durations.append(timing["duration"])
-                    if "time_since_last_rep" in timing:
-                        inter_rep_times.append(timing["time_since_last_rep"])
-            
-            return {
-                "avgElbowFlareOut": round(safe_avg(elbow_flares), 2),
-                "maxElbowFlareOut": round(safe_max(elbow_flares), 2) if elbow_flares else 0,
-                "avgTorsoLean": round(safe_avg(torso_leans), 2),
-                "maxTorsoLean": round(safe_max(torso_leans), 2) if torso_leans else 0,
-                "avgROMPercentage": round(safe_avg(rom_percentages), 2),
-                "minROMPercentage": round(min(rom_percentages), 2) if rom_percentages else 0,
-                "repTimings": {
-                    "avgRepDuration": round(safe_avg(rep_durations), 2) if rep_durations else 0,
-                    "avgTimeBetweenReps": round(safe_avg(inter_rep_times), 2) if inter_rep_times else 0
-                }
-            }
-        except Exception as e:
-            # Return empty metrics on error
-            print(f"Error calculating set metrics: {e}")
-            return {
-                "avgElbowFlareOut": 0,
-                "maxElbowFlareOut": 0,
-                "avgTorsoLean": 0,
-                "maxTorsoLean": 0,
-                "avgROMPercentage": 0,
-                "minROMPercentage": 0,
-                "repTimings": {
-                    "avgRepDuration": 0,
-                    "avgTimeBetweenReps": 0
-                }
-            }
+    def live_set_summary(self):
+        """Running summary of the set in progress, cheap enough for every frame"""
+        return self.set_stats.live()
 
     def _default_feedback(self):
         """Generate default subjective feedback structure"""
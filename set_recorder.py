@@ -0,0 +1,147 @@
+# File: set_recorder.py
+
+import logging
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# ——— Parameters ———
+QUEUE_SIZE = 30        # frames waiting for the encoder (~2 s at 15 fps, ~28 MB at 640x480)
+FOURCC = "mp4v"
+EXTENSION = ".mp4"
+IDLE_WAIT = 0.5        # seconds the encoder waits for a frame before closing a finished file
+
+
+class Segment:
+    """One set's video file. Counters are updated by the capture and encoder threads."""
+
+    def __init__(self, path, fps):
+        self.path = path
+        self.fps = fps
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.started = time.time()
+        self.stopped = False   # no more frames will be submitted
+        self.closed = False    # file finalized by the encoder
+
+    def info(self):
+        return {
+            "path": self.path,
+            "fps": self.fps,
+            "frames": self.submitted,
+            "droppedFrames": self.dropped,
+            "duration": round(time.time() - self.started, 2),
+        }
+
+
+class SetRecorder:
+    """
+    Records annotated frames to one video file per set without ever
+    blocking the caller. submit() copies the frame into a bounded queue, or
+    drops it when the queue is full; a single encoder thread owns the
+    VideoWriter and does all encoding and disk I/O.
+
+    start_segment/stop_segment are called from the session's start_set and
+    end_set; frames carry their segment, so a file is only written with
+    frames submitted while it was current.
+    """
+
+    def __init__(self, directory, fps, queue_size=QUEUE_SIZE, fourcc=FOURCC):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fps = fps
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._segment = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._encode, name="set-recorder", daemon=True)
+        self._thread.start()
+
+    @property
+    def recording(self):
+        return self._segment is not None
+
+    def start_segment(self, name):
+        """Start a new file (closing the current one); returns its path."""
+        self.stop_segment()
+        self._segment = Segment(os.path.join(self.directory, name + EXTENSION), self.fps)
+        return self._segment.path
+
+    def stop_segment(self):
+        """Stop feeding the current file; returns its info (or None)."""
+        segment, self._segment = self._segment, None
+        if segment is None:
+            return None
+        segment.stopped = True
+        return segment.info()
+
+    def submit(self, frame):
+        """Queue a copy of frame for the current file; False if not recording or dropped."""
+        segment = self._segment
+        if segment is None:
+            return False
+        # Check first so a full queue doesn't cost a copy
+        if self._queue.full():
+            segment.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait((segment, frame.copy()))
+        except queue.Full:
+            segment.dropped += 1
+            return False
+        segment.submitted += 1
+        return True
+
+    def close(self, timeout=5.0):
+        """Finish the current file, drain the queue and stop the encoder."""
+        self.stop_segment()
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _encode(self):
+        writer = None
+        current = None
+
+        def finish():
+            nonlocal writer, current
+            if writer is not None:
+                writer.release()
+                logger.info(f"Recorded {current.written} frames to {current.path} "
+                            f"({current.dropped} dropped)")
+            if current is not None:
+                current.closed = True
+            writer = current = None
+
+        while True:
+            try:
+                segment, frame = self._queue.get(timeout=IDLE_WAIT)
+            except queue.Empty:
+                if current is not None and current.stopped:
+                    finish()
+                if self._stop.is_set():
+                    break
+                continue
+
+            if segment is not current:
+                finish()
+                if segment.closed:
+                    continue   # submitted just as its file was finalized
+                current = segment
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(segment.path, self.fourcc, segment.fps, (width, height))
+                if not writer.isOpened():
+                    logger.error(f"Could not open {segment.path} for writing")
+            try:
+                writer.write(frame)
+                current.written += 1
+            except Exception as e:
+                logger.error(f"Error writing {current.path}: {e}")
+            if current.stopped and self._queue.empty():
+                finish()
+        finish()
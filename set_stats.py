@@ -0,0 +1,193 @@
+# File: set_stats.py
+
+import math
+from fractions import Fraction
+
+
+class RunningStat:
+    """
+    O(1)-per-sample summary of one metric over a set.
+
+    mean() keeps an exact (Fraction) running sum and converts it the way
+    statistics.mean does, so end-of-set averages match the old recomputation
+    bit for bit, including returning an int when every sample is an int and
+    the mean is whole. min/max keep the first extreme seen, as min()/max()
+    do. A Welford mean/variance gives the cheap float figures streamed live.
+    """
+
+    __slots__ = ('count', '_sum', '_all_int', 'min', 'max', '_w_mean', '_w_m2')
+
+    def __init__(self):
+        self.count = 0
+        self._sum = Fraction(0)
+        self._all_int = True
+        self.min = None
+        self.max = None
+        self._w_mean = 0.0
+        self._w_m2 = 0.0
+
+    def add(self, x):
+        # Validate before touching any state so a bad sample leaves it intact
+        exact = Fraction(x)
+        self.count += 1
+        self._sum += exact
+        if not isinstance(x, int):
+            self._all_int = False
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+        delta = x - self._w_mean
+        self._w_mean += delta / self.count
+        self._w_m2 += delta * (x - self._w_mean)
+
+    def mean(self):
+        """Same value and type as statistics.mean over the samples (0 if none)."""
+        if not self.count:
+            return 0
+        value = self._sum / self.count
+        if self._all_int and value.denominator == 1:
+            return int(value)
+        return float(value)
+
+    def std(self):
+        """Sample standard deviation (Welford)."""
+        return math.sqrt(self._w_m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def live(self):
+        if not self.count:
+            return None
+        return {
+            "mean": round(self._w_mean, 2),
+            "std": round(self.std(), 2),
+            "min": round(self.min, 2),
+            "max": round(self.max, 2),
+        }
+
+
+FALLBACK_METRICS = {
+    "avgElbowFlareOut": 0,
+    "maxElbowFlareOut": 0,
+    "avgTorsoLean": 0,
+    "maxTorsoLean": 0,
+    "avgROMPercentage": 0,
+    "minROMPercentage": 0,
+    "repTimings": {
+        "avgRepDuration": 0,
+        "avgTimeBetweenReps": 0
+    }
+}
+
+
+class SetStats:
+    """
+    Running aggregates for the set in progress, updated as each rep is
+    recorded. summary() yields exactly what ExerciseSession used to compute
+    by rescanning rep_data at the end of the set.
+    """
+
+    SIDES = ("left", "right")
+
+    def __init__(self, bilateral=False):
+        self.bilateral = bilateral
+        self.reps = 0
+        self.elbow_flare = RunningStat()
+        self.torso_lean = RunningStat()
+        self.rom_percentage = RunningStat()
+        self.rep_duration = RunningStat()
+        self.time_between_reps = RunningStat()
+        self.sides = {
+            side: {"reps": 0, "rom_percentage": RunningStat(),
+                   "elbow_flare": RunningStat(), "duration": RunningStat()}
+            for side in self.SIDES
+        }
+        # A rep the old computation would have choked on makes the whole
+        # summary fall back to zeros, as it did before
+        self.failed = False
+        self.side_failed = False
+
+    def add(self, rep):
+        self.reps += 1
+        try:
+            if "metrics" in rep:
+                metrics = rep["metrics"]
+                for key in ("elbow_flare", "torso_lean", "rom_percentage"):
+                    if key in metrics:
+                        getattr(self, key).add(metrics[key])
+            if "timing" in rep:
+                timing = rep["timing"]
+                if "duration" in timing:
+                    self.rep_duration.add(timing["duration"])
+                if "time_since_last_rep" in timing:
+                    self.time_between_reps.add(timing["time_since_last_rep"])
+        except (TypeError, ValueError):
+            self.failed = True
+
+        side = rep.get("side")
+        if side in self.sides:
+            stats = self.sides[side]
+            stats["reps"] += 1
+            try:
+                stats["rom_percentage"].add(rep["metrics"]["rom_percentage"])
+                stats["elbow_flare"].add(rep["metrics"]["elbow_flare"])
+                stats["duration"].add(rep["timing"]["duration"])
+            except (KeyError, TypeError, ValueError):
+                self.side_failed = True
+
+    def summary(self):
+        """Set metrics as stored in objectiveMetrics ({} before the first rep)."""
+        if not self.reps:
+            return {}
+        if self.failed or (self.bilateral and self.side_failed):
+            return {**FALLBACK_METRICS, "repTimings": dict(FALLBACK_METRICS["repTimings"])}
+
+        set_metrics = {
+            "avgElbowFlareOut": round(self.elbow_flare.mean(), 2),
+            "maxElbowFlareOut": round(self.elbow_flare.max, 2) if self.elbow_flare.count else 0,
+            "avgTorsoLean": round(self.torso_lean.mean(), 2),
+            "maxTorsoLean": round(self.torso_lean.max, 2) if self.torso_lean.count else 0,
+            "avgROMPercentage": round(self.rom_percentage.mean(), 2),
+            "minROMPercentage": round(self.rom_percentage.min, 2) if self.rom_percentage.count else 0,
+            "repTimings": {
+                "avgRepDuration": round(self.rep_duration.mean(), 2) if self.rep_duration.count else 0,
+                "avgTimeBetweenReps": round(self.time_between_reps.mean(), 2) if self.time_between_reps.count else 0
+            }
+        }
+        if self.bilateral:
+            set_metrics["asymmetry"] = self.asymmetry()
+        return set_metrics
+
+    def asymmetry(self):
+        """Left vs right comparison for bilateral sets."""
+        sides = {}
+        for side in self.SIDES:
+            stats = self.sides[side]
+            sides[side] = {
+                "reps": stats["reps"],
+                "avgROMPercentage": round(stats["rom_percentage"].mean(), 2),
+                "avgElbowFlareOut": round(stats["elbow_flare"].mean(), 2),
+                "avgRepDuration": round(stats["duration"].mean(), 2),
+            }
+
+        left, right = sides["left"], sides["right"]
+        return {
+            "left": left,
+            "right": right,
+            "repDifference": left["reps"] - right["reps"],
+            "romDifference": round(left["avgROMPercentage"] - right["avgROMPercentage"], 2),
+            "elbowFlareDifference": round(left["avgElbowFlareOut"] - right["avgElbowFlareOut"], 2),
+            "repDurationDifference": round(left["avgRepDuration"] - right["avgRepDuration"], 2),
+        }
+
+    def live(self):
+        """Compact running summary for the live /metrics stream."""
+        out = {
+            "reps": self.reps,
+            "elbowFlare": self.elbow_flare.live(),
+            "torsoLean": self.torso_lean.live(),
+            "romPercentage": self.rom_percentage.live(),
+            "repDuration": self.rep_duration.live(),
+        }
+        if self.bilateral:
+            out["repsBySide"] = {side: self.sides[side]["reps"] for side in self.SIDES}
+        return out
@@ -0,0 +1,367 @@
+# File: stations.py
+
+import json
+import logging
+import multiprocessing as mp
+import threading
+import time
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+from streaming import FrameFeed, FrameRing
+
+logger = logging.getLogger(__name__)
+
+# ——— Station parameters ———
+FRAME_SHAPE = (480, 640, 3)     # process_frame always outputs 640x480 BGR
+DEFAULT_FRAME_RATE = 30
+OUTPUT_RING = 4                 # parent-side frames per station in circulation
+SKIP_FRAMES = 2                 # process every nth frame for metrics
+HEARTBEAT_SECONDS = 1.0         # workers report in at least this often
+STALL_SECONDS = 15.0            # a worker silent this long is restarted
+RESTART_BACKOFF = [1, 2, 5, 10, 30]  # seconds before the nth consecutive restart
+STABLE_SECONDS = 60.0           # uptime after which the backoff starts over
+COMMAND_TIMEOUT = 10.0
+FRAME_LOCK_TIMEOUT = 1.0        # a lock held longer belongs to a killed worker
+
+# Worker → parent events
+EVENT_FRAME = 'frame'           # a new frame is in shared memory, with optional data
+EVENT_HEARTBEAT = 'heartbeat'
+
+# Parent → worker command that shuts the worker down cleanly
+STOP_COMMAND = '__stop__'
+
+
+def load_station_config(path):
+    """
+    Reads the station list from a JSON file:
+
+        {"stations": [
+            {"id": "rack1", "source": 0},
+            {"id": "rack2", "source": "/dev/video4"},
+            {"id": "demo",  "source": "clips/curls.mp4", "loop": true, "frame_rate": 30}
+        ]}
+
+    "source" is a camera index, a device path (e.g. a v4l2loopback device),
+    a video file or a stream URL. Video files loop by default.
+    "archive_landmarks" (a directory) archives the station's per-frame
+    landmarks for rescore_archives.py; "record_sets" (a directory) records
+    an annotated video of each set.
+    """
+    with open(path) as f:
+        config = json.load(f)
+
+    stations = config.get('stations', []) if isinstance(config, dict) else config
+    seen = set()
+    for station in stations:
+        if 'id' not in station or 'source' not in station:
+            raise ValueError(f"Station entry needs 'id' and 'source': {station}")
+        station['id'] = str(station['id'])
+        if station['id'] in seen:
+            raise ValueError(f"Duplicate station id: {station['id']}")
+        seen.add(station['id'])
+    return stations
+
+
+def open_source(source):
+    """cv2.VideoCapture for a camera index, device path, file or URL."""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+def station_worker(station, shm_name, frame_lock, annotate, cmd_conn, event_conn):
+    """
+    Body of one station's worker process. Owns the capture source, the
+    pose model and the curl_detector session state for this station, and
+    answers session commands arriving on cmd_conn.
+    """
+    # Imported here so each worker process gets its own pose model and
+    # module-level session state
+    import curl_detector
+    from session_control import SessionController
+
+    logging.basicConfig(level=logging.INFO)
+    station_id = station['id']
+    controller = SessionController()
+    if station.get('archive_landmarks'):
+        curl_detector.set_landmark_archive(station['archive_landmarks'])
+    if station.get('record_sets'):
+        curl_detector.set_recording(station['record_sets'],
+                                    station.get('frame_rate', DEFAULT_FRAME_RATE) / SKIP_FRAMES)
+    stop = threading.Event()
+
+    def serve_commands():
+        while not stop.is_set():
+            try:
+                command, payload = cmd_conn.recv()
+            except (EOFError, OSError):
+                stop.set()
+                break
+            if command == STOP_COMMAND:
+                stop.set()
+                cmd_conn.send(({"status": "success"}, 200))
+                break
+            try:
+                cmd_conn.send(controller.dispatch(command, payload))
+            except Exception as e:
+                logger.error(f"[{station_id}] Error running {command}: {e}")
+                cmd_conn.send(({"status": "error", "message": str(e)}, 500))
+
+    threading.Thread(target=serve_commands, name=f"{station_id}-commands", daemon=True).start()
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    shared_frame = np.ndarray(FRAME_SHAPE, dtype=np.uint8, buffer=shm.buf)
+    camera = open_source(station['source'])
+    loop_video = station.get('loop', True)
+    frame_rate = station.get('frame_rate', DEFAULT_FRAME_RATE)
+    frame_count = 0
+    last_time = 0.0
+    last_event = 0.0
+
+    try:
+        while not stop.is_set():
+            current_time = time.time()
+            if current_time - last_event > HEARTBEAT_SECONDS:
+                event_conn.send((EVENT_HEARTBEAT, None))
+                last_event = current_time
+
+            # Control frame rate (also paces video files at real time)
+            if (current_time - last_time) < 1.0/frame_rate:
+                time.sleep(max(0.0, 1.0/frame_rate - (current_time - last_time)))
+                continue
+            last_time = current_time
+
+            if not camera.isOpened():
+                logger.error(f"[{station_id}] Source not available: {station['source']}")
+                time.sleep(1.0)
+                camera = open_source(station['source'])
+                continue
+
+            success, frame = camera.read()
+            if not success or frame is None:
+                if loop_video and camera.get(cv2.CAP_PROP_FRAME_COUNT) > 0:
+                    # End of a video file: start it over
+                    camera.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                else:
+                    time.sleep(0.1)
+                continue
+
+            data = None
+            if frame_count % SKIP_FRAMES == 0:
+                frame, data = curl_detector.process_frame(
+                    frame, annotate=bool(annotate.value) or curl_detector.recording_active())
+                curl_detector.record_frame(frame)
+            else:
+                frame = curl_detector.preprocessor.display(frame)
+            frame_count += 1
+
+            with frame_lock:
+                shared_frame[:] = frame
+            event_conn.send((EVENT_FRAME, data))
+            last_event = current_time
+    except (BrokenPipeError, EOFError):
+        # Parent went away
+        pass
+    finally:
+        camera.release()
+        curl_detector.cleanup()
+        del shared_frame
+        shm.close()
+
+
+class Station:
+    """
+    Parent-side handle of one station: its worker process, the shared
+    frame buffer the worker writes into, and the FrameFeed viewers read.
+    """
+
+    def __init__(self, config, ctx):
+        self.id = config['id']
+        self.config = config
+        self.ctx = ctx
+        self.feed = FrameFeed()
+        self.ring = FrameRing(FRAME_SHAPE, OUTPUT_RING)
+        self.frame_lock = ctx.Lock()
+        self.annotate = ctx.Value('b', 0, lock=False)
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(FRAME_SHAPE)))
+        self.shared_frame = np.ndarray(FRAME_SHAPE, dtype=np.uint8, buffer=self.shm.buf)
+        self.process = None
+        self.cmd_conn = None
+        self._cmd_lock = threading.Lock()
+        self.started_at = 0.0
+        self.last_event = 0.0
+        self.restarts = 0
+        self.failures = 0        # consecutive restarts without a stable run
+        self.next_start = 0.0
+
+    def _release_worker(self):
+        """
+        Drop what belonged to the previous worker before a restart: its
+        command pipe and process handle, and the frame lock, which stays
+        held forever if the worker was terminated while writing a frame.
+        """
+        with self._cmd_lock:
+            if self.cmd_conn is not None:
+                self.cmd_conn.close()
+                self.cmd_conn = None
+        process, self.process = self.process, None
+        if process is not None:
+            if process.is_alive():
+                process.kill()
+            process.join(5.0)
+            process.close()
+        self.frame_lock = self.ctx.Lock()
+
+    def start(self):
+        if self.process is not None:
+            self._release_worker()
+        cmd_parent, cmd_child = self.ctx.Pipe()
+        event_recv, event_send = self.ctx.Pipe(duplex=False)
+        self.process = self.ctx.Process(
+            target=station_worker,
+            args=(self.config, self.shm.name, self.frame_lock, self.annotate, cmd_child, event_send),
+            name=f"station-{self.id}",
+            daemon=True,
+        )
+        self.process.start()
+        # The child holds its own copies of these ends
+        cmd_child.close()
+        event_send.close()
+        self.cmd_conn = cmd_parent
+        self.started_at = self.last_event = time.time()
+        threading.Thread(target=self._read_events, args=(event_recv, self.frame_lock),
+                         name=f"station-{self.id}-events", daemon=True).start()
+        logger.info(f"Station {self.id} started (pid {self.process.pid})")
+
+    def _read_events(self, conn, frame_lock):
+        """Publishes the worker's frames and data into the feed."""
+        while True:
+            try:
+                event, data = conn.recv()
+            except (EOFError, OSError):
+                break
+            self.last_event = time.time()
+            if event == EVENT_FRAME:
+                # Bounded, so a worker killed mid-write can't hang this thread
+                # before it sees the pipe close
+                if not frame_lock.acquire(timeout=FRAME_LOCK_TIMEOUT):
+                    continue
+                frame = self.ring.next()
+                try:
+                    np.copyto(frame, self.shared_frame)
+                finally:
+                    frame_lock.release()
+                self.feed.publish(frame, data)
+                self.annotate.value = self.feed.wants_annotation()
+        conn.close()
+
+    def alive(self):
+        process = self.process
+        return process is not None and process.is_alive()
+
+    def command(self, command, payload=None, timeout=COMMAND_TIMEOUT):
+        """Runs a SessionController command in the worker; returns (body, status)."""
+        with self._cmd_lock:
+            if not self.alive():
+                return {"status": "error", "message": f"Station {self.id} is restarting"}, 503
+            try:
+                self.cmd_conn.send((command, payload))
+                if not self.cmd_conn.poll(timeout):
+                    return {"status": "error", "message": f"Station {self.id} did not respond"}, 504
+                return self.cmd_conn.recv()
+            except (EOFError, OSError) as e:
+                logger.error(f"Station {self.id} command {command} failed: {e}")
+                return {"status": "error", "message": f"Station {self.id} is restarting"}, 503
+
+    def stop(self, timeout=5.0):
+        if self.alive():
+            self.command(STOP_COMMAND, timeout=timeout)
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout)
+        with self._cmd_lock:
+            if self.cmd_conn is not None:
+                self.cmd_conn.close()
+                self.cmd_conn = None
+
+    def close(self):
+        del self.shared_frame
+        self.shm.close()
+        self.shm.unlink()
+
+    def status(self):
+        return {
+            'id': self.id,
+            'source': self.config['source'],
+            'alive': self.alive(),
+            'pid': self.process.pid if self.process else None,
+            'uptime': round(time.time() - self.started_at, 1) if self.alive() else 0,
+            'restarts': self.restarts,
+            'viewers': len(self.feed.streamers),
+        }
+
+
+class StationManager:
+    """
+    Runs one worker process per configured station and supervises them:
+    a worker that exits or stops reporting in is restarted, with backoff
+    if it keeps failing. A restarted station starts with no session; the
+    session that was in progress is lost.
+    """
+
+    def __init__(self, stations):
+        # spawn: workers must not inherit the parent's camera, threads or locks
+        self.ctx = mp.get_context('spawn')
+        self.stations = {s['id']: Station(s, self.ctx) for s in stations}
+        self._supervisor = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_config(cls, path):
+        return cls(load_station_config(path))
+
+    def get(self, station_id):
+        return self.stations.get(station_id)
+
+    def start(self):
+        for station in self.stations.values():
+            station.start()
+        self._supervisor = threading.Thread(target=self.supervise, name="station-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def supervise(self):
+        while not self._stop.wait(1.0):
+            now = time.time()
+            for station in self.stations.values():
+                if station.alive():
+                    if now - station.last_event < STALL_SECONDS:
+                        if now - station.started_at > STABLE_SECONDS:
+                            station.failures = 0
+                        continue
+                    logger.error(f"Station {station.id} stalled; terminating worker")
+                    station.process.terminate()
+                    station.process.join(5.0)
+
+                if station.next_start == 0.0:
+                    delay = RESTART_BACKOFF[min(station.failures, len(RESTART_BACKOFF) - 1)]
+                    exitcode = station.process.exitcode if station.process else None
+                    logger.error(f"Station {station.id} worker exited ({exitcode}); restarting in {delay}s")
+                    station.next_start = now + delay
+                elif now >= station.next_start:
+                    station.next_start = 0.0
+                    station.failures += 1
+                    station.restarts += 1
+                    station.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._supervisor is not None:
+            self._supervisor.join()
+        for station in self.stations.values():
+            station.stop()
+            station.close()
+
+    def status(self):
+        return [s.status() for s in self.stations.values()]
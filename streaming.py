@@ -0,0 +1,259 @@
+# File: streaming.py
+
+import threading
+import time
+from contextlib import contextmanager
+import cv2
+import numpy as np
+
+# ——— Adaptive MJPEG parameters ———
+# (width, height, JPEG quality), best first
+QUALITY_LADDER = [
+    (640, 480, 80),
+    (640, 480, 65),
+    (480, 360, 60),
+    (320, 240, 50),
+    (320, 240, 35),
+]
+STEP_DOWN_RATIO = 1.0    # step down when a send takes longer than the frame budget
+STEP_UP_RATIO   = 0.35   # step up when sends stay well under the budget...
+STEP_UP_FRAMES  = 60     # ...for this many consecutive frames
+EWMA_ALPHA      = 0.2    # weight of the newest send-time sample
+
+# Unchanged-frame suppression
+THUMB_SIZE        = (64, 48)  # frames are compared at this size
+PIXEL_DELTA       = 12        # grey-level change that counts as "changed"
+MIN_CHANGED_CELLS = 2         # thumbnail cells that must change
+KEEPALIVE_SECONDS = 1.0       # resend an unchanged frame at least this often
+
+
+class FrameLeases:
+    """
+    Who still reads a published frame buffer: a FrameFeed holds its current
+    frame and every viewer holds the frame it is encoding. FrameRing only
+    hands a buffer back to its producer once nobody holds it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holders = {}   # id(buffer) -> holders
+
+    def hold(self, frame):
+        with self._lock:
+            self._holders[id(frame)] = self._holders.get(id(frame), 0) + 1
+
+    def release(self, frame):
+        with self._lock:
+            holders = self._holders[id(frame)] - 1
+            if holders:
+                self._holders[id(frame)] = holders
+            else:
+                del self._holders[id(frame)]
+
+    def busy(self, frame):
+        return id(frame) in self._holders
+
+
+frame_leases = FrameLeases()
+
+
+class FrameRing:
+    """
+    Preallocated output frames for one producer thread. next() returns the
+    next slot that no feed or viewer holds; only if every slot is still
+    being read does it fall back to a new buffer (counted in `overflows`).
+    """
+
+    def __init__(self, shape, slots, leases=frame_leases):
+        self._slots = [np.empty(shape, dtype=np.uint8) for _ in range(slots)]
+        self._next = 0
+        self.leases = leases
+        self.overflows = 0
+
+    def next(self):
+        for _ in range(len(self._slots)):
+            frame = self._slots[self._next]
+            self._next = (self._next + 1) % len(self._slots)
+            if not self.leases.busy(frame):
+                return frame
+        self.overflows += 1
+        return np.empty_like(self._slots[0])
+
+
+class FrameFeed:
+    """
+    Latest processed frame and metrics of one capture source, shared by
+    every viewer of that source. Producers call publish(); MJPEG, SSE and
+    WebSocket consumers wait on it for anything newer than what they have.
+
+    publish() takes ownership of the frame without copying it. The feed
+    holds a lease on its current frame and readers take their own while
+    they encode (reading(), or snapshot(hold=True) + release()), so a
+    FrameRing producer never rewrites a frame somebody is still reading.
+    """
+
+    def __init__(self, leases=frame_leases):
+        self.condition = threading.Condition()
+        self.leases = leases
+        self.frame = None
+        self.frame_id = 0
+        self.data = {}
+        self.streamers = set()   # AdaptiveStreamers of connected MJPEG clients
+
+    def publish(self, frame, data=None):
+        """Hand `frame` over: write to it again only once a FrameRing returns it."""
+        with self.condition:
+            if frame is not None:
+                self.leases.hold(frame)
+            if self.frame is not None:
+                self.leases.release(self.frame)
+            if data is not None:
+                self.data = data
+            self.frame = frame
+            self.frame_id += 1
+            self.condition.notify_all()
+
+    def release(self, frame):
+        """End a reader's lease from snapshot(hold=True)."""
+        if frame is not None:
+            self.leases.release(frame)
+
+    def snapshot(self, hold=False):
+        """(frame_id, frame, data); with hold, the frame stays leased until release(frame)."""
+        with self.condition:
+            if hold and self.frame is not None:
+                self.leases.hold(self.frame)
+            return self.frame_id, self.frame, self.data
+
+    @contextmanager
+    def reading(self, last_id, timeout=1.0):
+        """
+        (frame_id, frame) once a frame newer than last_id exists, or on
+        timeout; the frame is leased until the block exits.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame_id != last_id, timeout=timeout)
+            frame_id, frame = self.frame_id, self.frame
+            if frame is not None:
+                self.leases.hold(frame)
+        try:
+            yield frame_id, frame
+        finally:
+            self.release(frame)
+
+    def wait_data(self, last_data, timeout=1.0):
+        """The latest data once it is not last_data, or on timeout."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.data is not last_data, timeout=timeout)
+            return self.data
+
+    def wants_annotation(self):
+        """True if any MJPEG viewer expects the server-drawn overlay."""
+        return any(not s.raw for s in list(self.streamers))
+
+
+class AdaptiveStreamer:
+    """
+    Per-client MJPEG encoder. Measures how long each frame takes to reach
+    the client, walks down QUALITY_LADDER when the client falls behind and
+    back up once it keeps up, and skips frames that look the same as the
+    last one sent (rest periods) apart from a periodic keepalive.
+    """
+
+    def __init__(self, target_fps=30, ladder=QUALITY_LADDER, max_fps=None, raw=False):
+        """
+        max_fps: optional cap below target_fps, e.g. a low-rate background
+                 video under a client-drawn skeleton
+        raw:     the client draws its own overlay and wants unannotated frames
+        """
+        self.ladder = ladder
+        self.frame_budget = 1.0 / target_fps
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.raw = raw
+        self.level = 0
+        self.send_time = 0.0      # EWMA seconds per frame
+        self.throughput = 0.0     # EWMA bytes per second
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self._fast_streak = 0
+        self._last_sent_at = 0.0
+        self._thumb = np.zeros((THUMB_SIZE[1], THUMB_SIZE[0]), dtype=np.uint8)
+        self._small = np.zeros((THUMB_SIZE[1], THUMB_SIZE[0], 3), dtype=np.uint8)
+        self._prev_thumb = None
+
+    def _changed(self, frame):
+        """True if frame differs meaningfully from the last frame sent."""
+        cv2.resize(frame, THUMB_SIZE, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._thumb)
+        if self._prev_thumb is None:
+            return True
+        diff = cv2.absdiff(self._thumb, self._prev_thumb)
+        return np.count_nonzero(diff > PIXEL_DELTA) >= MIN_CHANGED_CELLS
+
+    def encode(self, frame):
+        """
+        JPEG bytes for this client at its current ladder level, or None if
+        the frame should be skipped because nothing visible changed.
+        """
+        now = time.perf_counter()
+        if now - self._last_sent_at < self.min_interval:
+            self.frames_skipped += 1
+            return None
+        if not self._changed(frame) and now - self._last_sent_at < KEEPALIVE_SECONDS:
+            self.frames_skipped += 1
+            return None
+
+        width, height, quality = self.ladder[self.level]
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ret:
+            return None
+
+        if self._prev_thumb is None:
+            self._prev_thumb = self._thumb.copy()
+        else:
+            self._prev_thumb[:] = self._thumb
+        self._last_sent_at = now
+        return buffer.tobytes()
+
+    def record_send(self, nbytes, seconds):
+        """Feed back how long the last encoded frame took to send."""
+        self.frames_sent += 1
+        if self.frames_sent == 1:
+            self.send_time = seconds
+        else:
+            self.send_time += EWMA_ALPHA * (seconds - self.send_time)
+        if seconds > 0:
+            self.throughput += EWMA_ALPHA * (nbytes / seconds - self.throughput)
+
+        if self.send_time > self.frame_budget * STEP_DOWN_RATIO:
+            self._fast_streak = 0
+            if self.level < len(self.ladder) - 1:
+                self._set_level(self.level + 1)
+        elif self.send_time < self.frame_budget * STEP_UP_RATIO:
+            self._fast_streak += 1
+            if self._fast_streak >= STEP_UP_FRAMES and self.level > 0:
+                self._set_level(self.level - 1)
+        else:
+            self._fast_streak = 0
+
+    def _set_level(self, level):
+        self.level = level
+        self._fast_streak = 0
+        # Start the new level from a neutral estimate so one slow frame at the
+        # old level does not immediately trigger another step.
+        self.send_time = self.frame_budget * (STEP_DOWN_RATIO + STEP_UP_RATIO) / 2
+
+    def stats(self):
+        width, height, quality = self.ladder[self.level]
+        return {
+            'level': self.level,
+            'resolution': f"{width}x{height}",
+            'quality': quality,
+            'raw': self.raw,
+            'send_ms': round(self.send_time * 1000, 2),
+            'throughput_kbps': round(self.throughput * 8 / 1000, 1),
+            'frames_sent': self.frames_sent,
+            'frames_skipped': self.frames_skipped,
+        }
@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parent.parent
+# Appended: benchmarks/ has scripts named after the modules they measure
+sys.path.append(str(ROOT / "benchmarks"))
+
+from fake_motor import FakeDatabase  # noqa: E402
+
+
+@pytest.fixture
+def db(monkeypatch):
+    import app.crud
+    import app.main
+    db = FakeDatabase("test")
+    monkeypatch.setattr(app.crud, "db", db)
+    monkeypatch.setattr(app.main, "db", db)
+    return db
+
+
+@pytest.fixture
+def client(db):
+    import app.main
+    with TestClient(app.main.app) as c:
+        yield c
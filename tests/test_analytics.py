@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.analytics import session_time, week_start
+
+
+def test_date_finished_at_is_used_as_is():
+    assert session_time({"finished_at": datetime(2025, 4, 27, 10)}) == datetime(2025, 4, 27, 10)
+
+
+def test_legacy_iso_string_is_parsed_to_naive_utc():
+    assert session_time({"finished_at": "2025-04-27T12:00:00+02:00"}) == datetime(2025, 4, 27, 10)
+    assert session_time({"finished_at": "2025-04-27T10:00:00"}) == datetime(2025, 4, 27, 10)
+
+
+def test_missing_finished_at_falls_back_to_object_id_time():
+    oid = ObjectId.from_datetime(datetime(2025, 4, 23, 8))
+    assert session_time({"_id": oid}) == datetime(2025, 4, 23, 8)
+    assert week_start(session_time({"_id": oid, "finished_at": "not a date"})) == datetime(2025, 4, 21)
+
+
+def test_undatable_session_is_skipped():
+    assert session_time({"_id": "20250427_user12345"}) is None
+
+
+class _Recorder:
+    """Collection stand-in that records aggregation pipelines."""
+
+    def __init__(self):
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return self
+
+    async def to_list(self, length=None):
+        return []
+
+    async def delete_many(self, query):
+        pass
+
+    async def bulk_write(self, requests, ordered=True):
+        pass
+
+
+class _RecordingDatabase(dict):
+    def __missing__(self, name):
+        self[name] = _Recorder()
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def test_week_refresh_selects_only_that_week_in_the_first_match():
+    import asyncio
+    from app.analytics import refresh_weeks, week_match
+
+    db = _RecordingDatabase()
+    start = datetime(2025, 4, 21)
+    asyncio.run(refresh_weeks(db, "u1", [start]))
+    first = db["sessions"].pipelines[0][0]["$match"]
+    assert first == week_match("u1", start, datetime(2025, 4, 28))
+    undated = first["$or"][2]
+    assert undated["_id"]["$gte"].generation_time.replace(tzinfo=None) == start
+    assert first["$or"][0]["finished_at"] == {"$gte": start, "$lt": datetime(2025, 4, 28)}
+
+
+def test_week_refresh_deletes_only_rows_it_did_not_produce(monkeypatch):
+    import asyncio
+    from app import analytics
+
+    week = datetime(2025, 4, 21)
+    produced = {"_id": {"user_id": "u1", "exercise": "Squat", "week": week}, "volume": 100}
+    db = _RecordingDatabase()
+    deletes, writes = [], []
+
+    async def to_list(length=None):
+        return [produced]
+
+    async def delete_many(query):
+        deletes.append(query)
+
+    async def bulk_write(requests, ordered=True):
+        writes.extend(requests)
+
+    monkeypatch.setattr(db["sessions"], "to_list", to_list)
+    cache = db[analytics.settings.analytics_collection]
+    monkeypatch.setattr(cache, "delete_many", delete_many)
+    monkeypatch.setattr(cache, "bulk_write", bulk_write)
+
+    asyncio.run(analytics.refresh_weeks(db, "u1", [week]))
+    assert "$merge" not in db["sessions"].pipelines[0][-1]
+    assert len(writes) == 1
+    # No timestamp comparison: a concurrent refresh's rows for this week keep their _ids
+    assert deletes == [{"user_id": "u1", "week": week, "_id": {"$nin": [produced["_id"]]}}]
+
+
+def test_pr_history_keeps_weeks_that_beat_the_running_best(client, db):
+    from app.config import settings
+
+    db["analytics_users"]._docs["u1"] = {"_id": "u1"}
+    cache = db[settings.analytics_collection]
+    for i, (exercise, week, e1rm) in enumerate([
+        ("Squat", datetime(2025, 1, 6), 100.0),
+        ("Squat", datetime(2025, 1, 13), 95.0),
+        ("Squat", datetime(2025, 1, 20), 110.0),
+        ("Bench", datetime(2025, 1, 6), 80.0),
+    ]):
+        cache._docs[i] = {"_id": i, "user_id": "u1", "exercise": exercise, "week": week,
+                          "best_e1rm": e1rm, "best_set": {"weight": e1rm, "reps": 1}}
+
+    records = client.get("/analytics/u1/prs").json()
+    assert [(r["exercise"], r["week"][:10], r["e1rm"], r["previous_e1rm"]) for r in records] == [
+        ("Bench", "2025-01-06", 80.0, None),
+        ("Squat", "2025-01-06", 100.0, None),
+        ("Squat", "2025-01-20", 110.0, 100.0),
+    ]
@@ -0,0 +1,24 @@
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings
+
+
+@pytest.mark.parametrize("field, value", [
+    ("advice_user_per_minute", 0),
+    ("advice_global_per_minute", -1),
+    ("advice_user_burst", 0),
+])
+def test_advice_limits_must_allow_requests(field, value):
+    with pytest.raises(ValidationError):
+        Settings(**{field: value})
+
+
+def test_db_output_is_validated_unless_trusted_explicitly():
+    assert Settings().trust_db_output is False
+    assert Settings(trust_db_output=True).trust_db_output is True
+
+
+def test_default_advice_limits_are_valid():
+    settings = Settings()
+    assert settings.advice_user_per_minute > 0 and settings.advice_global_burst >= 1
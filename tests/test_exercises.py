@@ -0,0 +1,65 @@
+import numpy as np
+
+from exercises import ExerciseBank, LANDMARK_INDEX, VIS
+from session_tracker import ExerciseSession
+
+
+def _curl_frame(angle):
+    """Landmarks with the left elbow bent to `angle` degrees, everything else still."""
+    lm = np.zeros((33, 4), dtype=np.float32)
+    lm[:, VIS] = 1.0
+    points = {
+        "LEFT_SHOULDER": (0.5, 0.3), "LEFT_ELBOW": (0.5, 0.5), "LEFT_HIP": (0.5, 0.7),
+        "LEFT_KNEE": (0.5, 0.85), "LEFT_ANKLE": (0.5, 1.0),
+    }
+    for name, xy in points.items():
+        lm[LANDMARK_INDEX[name], :2] = xy
+    theta = np.radians(angle)
+    # Upper arm points up from the elbow; the forearm is rotated by angle from it
+    lm[LANDMARK_INDEX["LEFT_WRIST"], :2] = (0.5 + 0.2 * np.sin(theta), 0.5 - 0.2 * np.cos(theta))
+    return lm
+
+
+def _curl_reps(bank, reps):
+    t = 0.0
+    for _ in range(reps):
+        for angle in list(np.linspace(175, 30, 15)) + list(np.linspace(30, 175, 15)):
+            bank.update(_curl_frame(angle), t)
+            t += 1 / 30
+
+
+def test_summary_reports_detected_exercise_and_reps():
+    bank = ExerciseBank(["squat", "bicep_curl"])
+    _curl_reps(bank, 3)
+    summary = bank.summary()
+    assert summary["detectedExercise"] == "bicep_curl"
+    assert summary["exerciseReps"] == {"squat": 0, "bicep_curl": 3}
+
+    bank.reset()
+    assert bank.summary()["detectedExercise"] is None
+
+
+def test_lean_check_is_not_reported_as_torso_lean():
+    bank = ExerciseBank(["bicep_curl"])
+    metrics = bank.update(_curl_frame(170), 0.0)["bicep_curl"]["form_metrics"]
+    assert "torso_lean" not in metrics
+    assert metrics["torso_incline"] == 0
+
+
+def test_detect_has_no_side_effects():
+    bank = ExerciseBank(["squat", "bicep_curl"])
+    _curl_reps(bank, 1)
+    votes = bank.summary()
+    assert bank.detected == bank.detect() == "bicep_curl"
+    assert bank.summary() == votes
+
+
+def test_set_keeps_its_exercise_next_to_the_detection():
+    session = ExerciseSession()
+    session.start_set()
+    session.add_rep_data({"repNumber": 1, "timestamp": 0.0, "metrics": {}, "timing": {}})
+    session.end_set(exercises={"detectedExercise": "squat", "exerciseReps": {"squat": 1}})
+    set_data = session.session_data["sets"][0]
+    assert set_data["exercise"] == "Bicep Curl"
+    assert set_data["detectedExercise"] == "squat"
+    assert set_data["exerciseReps"] == {"squat": 1}
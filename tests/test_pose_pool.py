@@ -0,0 +1,42 @@
+import os
+import time
+
+import numpy as np
+
+import pose_pool
+
+SHAPE = (4, 4, 3)
+
+
+def _echo_worker(shm_name, slots, frame_shape, requests, results, pose_options):
+    """Answers every frame without a model; the "crash" stream kills the worker."""
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        stream_id, slot, seq, submitted_at, generation = item
+        if stream_id == "crash":
+            os._exit(1)
+        results.put([(stream_id, slot, seq, None, submitted_at, generation)])
+
+
+def test_dead_worker_is_respawned_with_its_slots_free(monkeypatch):
+    monkeypatch.setattr(pose_pool, "pose_worker", _echo_worker)
+    monkeypatch.setattr(pose_pool, "RESPAWN_DELAY", 0.0)
+    pool = pose_pool.PosePool(workers=1, slots=2, frame_shape=SHAPE).start()
+    frame = np.zeros(SHAPE, dtype=np.uint8)
+    try:
+        assert pool.process("cam", frame, timeout=5.0) is not None
+
+        # Dies with a frame in flight: its slot would never come back
+        pool.submit("crash", frame)
+        pool._workers[0]['process'].join(5.0)
+        assert pool.stats()['workers'][0]['alive'] is False
+
+        result = pool.process("cam", frame, timeout=5.0)
+        assert result is not None and result.stream_id == "cam"
+        worker = pool.stats()['workers'][0]
+        assert worker['alive'] and worker['restarts'] == 1
+        assert worker['free_slots'] == 2
+    finally:
+        pool.stop()
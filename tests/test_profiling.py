@@ -0,0 +1,13 @@
+from app.profiling import admin_allowed
+
+
+def test_token_must_match_when_configured():
+    assert admin_allowed("secret", "203.0.113.5", "secret")
+    assert not admin_allowed("secreT", "127.0.0.1", "secret")
+    assert not admin_allowed(None, "127.0.0.1", "secret")
+
+
+def test_loopback_only_without_token():
+    assert admin_allowed(None, "127.0.0.1", None)
+    assert admin_allowed(None, "::1", None)
+    assert not admin_allowed("anything", "203.0.113.5", None)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from exercises import NUM_LANDMARKS
+from landmark_archive import LandmarkRecorder
+from rescore_archives import rescore_archive
+from rep_counter import DEFAULT_FLEXION_THRESHOLD, DEFAULT_EXTENSION_THRESHOLD, DEFAULT_TOLERANCE
+from session_tracker import ExerciseSession
+
+CONFIG = {
+    "flexion": DEFAULT_FLEXION_THRESHOLD,
+    "extension": DEFAULT_EXTENSION_THRESHOLD,
+    "tolerance": DEFAULT_TOLERANCE,
+    "elbow_flare_threshold": 15,
+    "torso_lean_threshold": 10,
+    "shoulder_elevation_threshold": 0.1,
+    "rom_threshold": 80,
+}
+
+
+def _record(recorder, session, frames):
+    lm = np.full((NUM_LANDMARKS, 4), 0.5, dtype=np.float32)
+    for _ in range(frames):
+        recorder.append(lm, 0.0, session.current_set if session.in_set else 0)
+
+
+def test_rest_frames_belong_to_no_set(tmp_path):
+    session = ExerciseSession()
+    recorder = LandmarkRecorder()
+    _record(recorder, session, 3)          # before the first set
+    session.start_set()
+    _record(recorder, session, 5)
+    session.stop_set()
+    _record(recorder, session, 4)          # feedback and rest
+    session.rep_data = [{"repNumber": 1, "metrics": {}}]
+    session.end_set()
+    _record(recorder, session, 2)          # after the last set
+
+    report = rescore_archive(recorder.save(str(tmp_path / "archive")), CONFIG)
+    assert [s["setNumber"] for s in report["sets"]] == [1]
+    assert report["sets"][0]["frames"] == 5
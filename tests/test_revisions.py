@@ -0,0 +1,20 @@
+def test_created_documents_do_not_expose_rev(client):
+    entry = client.post("/entries/", json={"content": "felt strong", "user_id": "u1"})
+    session = client.post("/sessions/", json={"user_id": "u1", "workouts": [], "notes": "legs"})
+    assert entry.status_code == session.status_code == 201
+    assert "_rev" not in entry.json()
+    assert "_rev" not in session.json()
+
+
+def test_identical_update_changes_nothing(client):
+    entry_id = client.post("/entries/", json={"content": "felt strong", "user_id": "u1"}).json()["_id"]
+    etag = client.get(f"/entries/{entry_id}").headers["etag"]
+
+    same = client.put(f"/entries/{entry_id}", json={"content": "felt strong"})
+    assert same.status_code == 404
+    assert client.get(f"/entries/{entry_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    changed = client.put(f"/entries/{entry_id}", json={"content": "felt tired"})
+    assert changed.status_code == 200
+    assert "_rev" not in changed.json()
+    assert client.get(f"/entries/{entry_id}", headers={"If-None-Match": etag}).status_code == 200
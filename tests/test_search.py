@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+
+import app.crud as crud
+
+
+class _Result:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class _Entries:
+    def __init__(self):
+        self.pipelines = []
+
+    async def create_indexes(self, indexes):
+        pass
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return _Result([])
+
+
+class _Database:
+    def __init__(self):
+        self.entries = _Entries()
+
+
+def _stages(pipeline):
+    return [next(iter(stage)) for stage in pipeline]
+
+
+def test_recent_search_fills_created_at_before_filtering_and_paging(monkeypatch):
+    db = _Database()
+    monkeypatch.setattr(crud, "db", db)
+    monkeypatch.setattr(crud, "_entry_indexes_ready", False)
+    after = (datetime(2025, 1, 2), "5f0000000000000000000000")
+    asyncio.run(crud.search_entries("curl", start=datetime(2025, 1, 1), after=after, sort="recent"))
+
+    pipeline = db.entries.pipelines[0]
+    assert _stages(pipeline) == ["$match", "$project", "$set", "$match", "$match", "$sort", "$limit"]
+    # Missing or null created_at falls back to the ObjectId time
+    assert pipeline[2]["$set"]["created_at"] == crud._time_or_id_time("created_at")
+    # The range already narrows the text hits; undated entries by their ObjectId
+    assert pipeline[0]["$match"]["$or"] == [
+        {"created_at": {"$gte": datetime(2025, 1, 1)}},
+        {"created_at": {"$gte": "2025-01-01T00:00:00"}},
+        {"created_at": None, "_id": {"$gte": ObjectId.from_datetime(datetime(2025, 1, 1))}},
+    ]
+    assert pipeline[3]["$match"] == {"created_at": {"$gte": datetime(2025, 1, 1)}}
+    assert pipeline[5]["$sort"] == {"created_at": -1, "_id": -1}
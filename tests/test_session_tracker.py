@@ -0,0 +1,24 @@
+from session_tracker import ExerciseSession
+
+
+class _Recorder:
+    def __init__(self):
+        self.recording = False
+
+    def start_segment(self, name):
+        self.recording = name
+
+    def stop_segment(self):
+        name, self.recording = self.recording, False
+        return f"recordings/{name}.mp4"
+
+
+def test_set_without_reps_keeps_its_video_linked():
+    session = ExerciseSession(recorder=_Recorder())
+    session.start_set()
+    session.end_set()
+    assert session.session_data["sets"] == []
+    session_id = session.session_data["sessionId"]
+    assert session.session_data["emptySetRecordings"] == [f"recordings/{session_id}_set01.mp4"]
+    # The next set gets its own number (and file)
+    assert session.current_set == 2
@@ -0,0 +1,42 @@
+import time
+
+import stations
+
+
+def _stuck_worker(station, shm_name, frame_lock, annotate, cmd_conn, event_conn):
+    """A worker that dies (here: hangs until terminated) while holding the frame lock."""
+    frame_lock.acquire()
+    event_conn.send((stations.EVENT_FRAME, None))
+    time.sleep(60)
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+def test_restart_replaces_pipes_and_frame_lock(monkeypatch):
+    monkeypatch.setattr(stations, "station_worker", _stuck_worker)
+    manager = stations.StationManager([{"id": "s1", "source": 0}])
+    station = manager.get("s1")
+    try:
+        station.start()
+        old_conn, old_lock = station.cmd_conn, station.frame_lock
+        assert _wait_for(lambda: station.last_event > station.started_at)
+        station.process.terminate()
+        station.process.join(5.0)
+
+        station.start()
+        assert old_conn.closed
+        assert station.cmd_conn is not old_conn
+        assert station.frame_lock is not old_lock
+        assert station.frame_lock.acquire(timeout=0.5)
+        station.frame_lock.release()
+    finally:
+        if station.process is not None:
+            station.process.terminate()
+            station.process.join(5.0)
+        station.stop(timeout=1.0)
+        station.close()
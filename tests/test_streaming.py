@@ -0,0 +1,51 @@
+import numpy as np
+
+from preprocess import FramePreprocessor
+from streaming import FrameFeed, FrameLeases, FrameRing
+
+
+def _frame(value):
+    return np.full((480, 640, 3), value, dtype=np.uint8)
+
+
+def test_leased_frame_survives_ring_reuse():
+    preprocessor = FramePreprocessor()
+    feed = FrameFeed()
+    feed.publish(preprocessor.display(_frame(1)))
+    _, held, _ = feed.snapshot(hold=True)
+    # The next frames cycle the ring many times while a viewer still encodes `held`
+    for value in range(2, 20):
+        feed.publish(preprocessor.display(_frame(value)))
+    assert np.all(held == 1)
+    feed.release(held)
+
+
+def test_published_frame_is_handed_over_not_copied():
+    preprocessor = FramePreprocessor()
+    feed = FrameFeed()
+    frame = preprocessor.display(_frame(3))
+    feed.publish(frame)
+    with feed.reading(0) as (_, read):
+        assert read is frame
+
+
+def test_ring_reuses_slots_once_released():
+    leases = FrameLeases()
+    ring = FrameRing((2, 2, 3), 2, leases=leases)
+    feed = FrameFeed(leases=leases)
+    for _ in range(10):
+        feed.publish(ring.next())
+    assert ring.overflows == 0
+
+
+def test_ring_allocates_only_when_every_slot_is_held():
+    leases = FrameLeases()
+    ring = FrameRing((2, 2, 3), 2, leases=leases)
+    first, second = ring.next(), ring.next()
+    leases.hold(first)
+    leases.hold(second)
+    extra = ring.next()
+    assert extra is not first and extra is not second
+    assert ring.overflows == 1
+    leases.release(first)
+    assert ring.next() is first
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.timerange import resolve_range
+
+
+def test_aware_start_is_compared_in_utc():
+    start, end = resolve_range(datetime.fromisoformat("2025-01-01T00:00:00+00:00"), None, timedelta(days=30))
+    assert start == datetime(2025, 1, 1)
+    assert start.tzinfo is None and end.tzinfo is None
+
+
+def test_offset_is_converted_to_utc():
+    start, end = resolve_range(None, datetime.fromisoformat("2025-01-01T02:00:00+02:00"), timedelta(days=1))
+    assert end == datetime(2025, 1, 1)
+    assert start == datetime(2024, 12, 31)
+
+
+def test_start_after_end_is_rejected():
+    with pytest.raises(HTTPException) as e:
+        resolve_range(datetime(2025, 2, 1), datetime.fromisoformat("2025-01-01T00:00:00Z"), timedelta(days=1))
+    assert e.value.status_code == 400
+
+
+def test_reps_accept_z_suffixed_start(client):
+    response = client.get("/reps/u1", params={"start": "2025-01-01T00:00:00Z"})
+    assert response.status_code == 200
+    response = client.get("/reps/u1", params={"start": "2999-01-01T00:00:00Z"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/analytics/u1/volume", "/analytics/u1/e1rm"])
+def test_analytics_reject_reversed_z_suffixed_range(client, path):
+    response = client.get(path, params={"start": "2999-01-01T00:00:00Z"})
+    assert response.status_code == 400
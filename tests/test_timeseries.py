@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from app import timeseries
+from app.config import settings
+
+
+class FakeCollection:
+    def __init__(self):
+        self.indexes = []
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+
+
+class FakeDatabase:
+    def __init__(self, error=None, options=None):
+        self.error = error
+        self.options = options or {}
+        self.collection = FakeCollection()
+
+    def create_collection(self, name, **options):
+        if self.error:
+            raise self.error
+
+    def list_collections(self, filter):
+        return [{"name": filter["name"], "options": self.options}]
+
+    def __getitem__(self, name):
+        return self.collection
+
+
+def _ensure(monkeypatch, db, retention=30):
+    monkeypatch.setattr(timeseries, "_ready", False)
+    monkeypatch.setattr(settings, "rep_retention_days", retention)
+    timeseries.ensure_rep_collection(db)
+    return [kwargs.get("expireAfterSeconds") for _, kwargs in db.collection.indexes]
+
+
+def test_plain_collection_fallback_gets_retention_index(monkeypatch):
+    ttl = _ensure(monkeypatch, FakeDatabase(OperationFailure("timeseries unsupported")))
+    assert ttl == [None, 30 * 86400]
+
+
+def test_existing_plain_collection_gets_retention_index(monkeypatch):
+    ttl = _ensure(monkeypatch, FakeDatabase(CollectionInvalid("exists")))
+    assert ttl == [None, 30 * 86400]
+
+
+def test_timeseries_collection_expires_by_itself(monkeypatch):
+    assert _ensure(monkeypatch, FakeDatabase()) == [None]
+    db = FakeDatabase(CollectionInvalid("exists"), {"timeseries": {"timeField": "ts"}})
+    assert _ensure(monkeypatch, db) == [None]
+
+
+def test_period_start_avoids_date_trunc():
+    for unit in ("day", "week", "month"):
+        assert "$dateFromParts" in timeseries.period_start("$ts", unit)
+    assert timeseries.period_start("$ts", "week")["$dateFromParts"]["isoDayOfWeek"] == 1
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+OID = ObjectId.from_datetime(datetime(2025, 4, 27, 2, 15))
+
+
+def _insert(db, collection, doc):
+    db[collection]._docs[doc["_id"]] = doc
+
+
+def test_entry_without_created_at_is_dated_by_object_id(client, db):
+    _insert(db, "entries", {"_id": OID, "content": "old entry", "_rev": 1})
+    first = client.get("/entries/")
+    second = client.get("/entries/")
+    assert first.json() == second.json()
+    assert first.json()[0]["created_at"].startswith("2025-04-27T02:15:00")
+
+    one = client.get(f"/entries/{OID}")
+    assert one.json()["created_at"].startswith("2025-04-27T02:15:00")
+
+
+def test_session_without_finished_at_or_object_id_has_no_date(client, db):
+    _insert(db, "sessions", {"_id": "20250427_user12345", "user_id": "user12345",
+                             "workouts": [], "_rev": 1})
+    first = client.get("/sessions/20250427_user12345")
+    assert first.status_code == 200
+    assert first.json()["finished_at"] is None
+    assert client.get("/sessions/").json()[0]["finished_at"] is None